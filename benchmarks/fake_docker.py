@@ -0,0 +1,511 @@
+"""A stub of the Docker Engine API on a Unix socket, for tests and benchmarks that need neither a daemon nor the
+network.
+
+It implements the calls the plugin makes, keeps networks and containers in memory, delays every response by a
+configurable latency and counts the calls by endpoint. Images exist once they are pulled, built or committed;
+builds succeed without running anything. Containers are running as soon as they start. A container
+created with a ``Healthcheck`` runs it every ``health_interval`` seconds and turns healthy ``health_delay`` seconds
+after it started. The output of a container is its ``LOG`` environment variable, written ``log_delay`` seconds after
+it started, and again after every restart. Commands run instantly; ``false`` exits with 1, everything else with 0.
+``/events`` streams the start, die and destroy events of the containers, the ``exec_create``, ``exec_start`` and
+``exec_die`` events of every command and health check, and the ``health_status`` events.
+Use it from a test or benchmark::
+
+    with FakeDocker("/tmp/docker.sock", latency=0.002) as docker:
+        ...  # run with DOCKER_HOST=unix:///tmp/docker.sock
+        print(docker.calls)
+
+or on its own: ``python benchmarks/fake_docker.py --socket /tmp/docker.sock --latency-ms 2``.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import datetime
+import io
+import itertools
+import json
+import os
+import queue
+import re
+import socketserver
+import struct
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Counter, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+API_VERSION = "1.43"
+
+#: Paths with ids replaced, so that calls are counted per endpoint, like :func:`.client.endpoint` does. Image names
+#: may contain slashes.
+_ID = re.compile(
+    r"/(containers|networks|exec)/(?!create|json|prune)[^/]+|/(images)/(?!create$|json$|prune$).+?(?=/json$|$)"
+)
+_IMAGE = re.compile(r"/images/(.+?)(/json)?$")
+
+
+class FakeDocker:
+    """The stub server, serving from a thread while used as context manager."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        latency: float = 0.0,
+        health_interval: float = 0.05,
+        health_delay: float = 0.2,
+        log_delay: float = 0.2,
+    ) -> None:
+        self.socket_path = socket_path
+        self.latency = latency
+        self.health_interval = health_interval
+        self.health_delay = health_delay
+        self.log_delay = log_delay
+        self.calls: Counter[str] = collections.Counter()
+        #: Connections clients opened.
+        self.connections = 0
+        self.networks: Dict[str, Dict[str, Any]] = {}
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.images: Dict[str, Dict[str, Any]] = {}
+        #: The archives put into every container: the target path and the names in the archive.
+        self.archives: Dict[str, List[Tuple[str, List[str]]]] = {}
+        self.execs: Dict[str, Dict[str, Any]] = {}
+        self.subscribers: List[Tuple[Any, "queue.Queue[Optional[Dict[str, Any]]]"]] = []
+        self._ids = itertools.count()
+        self._host_ports = itertools.count(32768)
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> FakeDocker:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        handler = type("Handler", (_Handler,), {"docker": self})
+        self._server = _Server(self.socket_path, handler)
+        self._stopped.clear()
+        threading.Thread(target=self._server.serve_forever, name="fake-docker", daemon=True).start()
+        threading.Thread(target=self._health_checks, name="fake-docker-health", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._server is not None
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        os.unlink(self.socket_path)
+
+    def reset(self) -> None:
+        """Forget the calls and everything created, and end the event streams."""
+        with self._lock:
+            self.calls.clear()
+            self.connections = 0
+            self.networks.clear()
+            self.containers.clear()
+            self.images.clear()
+            self.archives.clear()
+            self.execs.clear()
+            for _, events in self.subscribers:
+                events.put(None)
+            self.subscribers.clear()
+
+    def subscribe(self, filters: Any) -> "queue.Queue[Optional[Dict[str, Any]]]":
+        events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        with self._lock:
+            self.calls["GET /events"] += 1
+            self.subscribers.append((filters, events))
+        return events
+
+    def _emit(self, container: Dict[str, Any], action: str) -> None:
+        event = {
+            "Type": "container",
+            "Action": action,
+            "status": action,
+            "id": container["Id"],
+            "Actor": {"ID": container["Id"], "Attributes": container["Labels"]},
+            "time": int(time.time()),
+        }
+        for filters, events in self.subscribers:
+            if _labelled(container, filters):
+                events.put(event)
+
+    def new_id(self) -> str:
+        return f"{next(self._ids):064x}"
+
+    def _run(self, container: Dict[str, Any], command: List[str]) -> int:
+        """Run a command in the container, with the events the daemon sends; returns the exit code."""
+        line = " ".join(command)
+        self._emit(container, f"exec_create: {line}")
+        self._emit(container, f"exec_start: {line}")
+        self._emit(container, "exec_die")
+        return 1 if command[:1] == ["false"] else 0
+
+    def output(self, container_id: str, follow: bool, since: float = 0.0) -> Iterator[str]:
+        """The output lines of a container written at or after ``since``; when followed, until it is removed."""
+        with self._lock:
+            container = self.containers.get(container_id)
+        if container is None:
+            return
+        environment = dict(variable.partition("=")[::2] for variable in container["Config"].get("Env") or [])
+        lines = environment.get("LOG", "").splitlines()
+        sent = 0
+        while True:
+            # Every start writes the output again.
+            written = [started + self.log_delay for started in list(container["Starts"])]
+            due = [line for at in written if since <= at <= time.time() for line in lines]
+            yield from due[sent:]
+            sent = len(due)
+            if not follow or container_id not in self.containers or self._stopped.wait(0.05):
+                return
+
+    def _health_checks(self) -> None:
+        while not self._stopped.wait(self.health_interval):
+            with self._lock:
+                for container in self.containers.values():
+                    health = container.get("Health")
+                    if health is None or not container["Starts"]:
+                        continue
+                    self._run(container, container["Config"]["Healthcheck"].get("Test", [])[1:])
+                    if health["Status"] == "starting" and time.time() - container["Starts"][-1] >= self.health_delay:
+                        health["Status"] = "healthy"
+                        self._emit(container, "health_status: healthy")
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        """Answer a request with a status and a JSON document."""
+        path = re.sub(r"^/v[\d.]+", "", path)
+        with self._lock:
+            self.calls[f"{method} {_ID.sub(lambda match: f'/{match.group(1) or match.group(2)}/{{id}}', path)}"] += 1
+        time.sleep(self.latency)
+        parts = path.strip("/").split("/")
+        with self._lock:
+            if path == "/_ping":
+                return 200, "OK"
+            if path == "/version":
+                return 200, {"ApiVersion": API_VERSION, "MinAPIVersion": "1.24", "Version": "fake"}
+            if parts[0] == "networks":
+                return self._networks(method, parts[1:], body)
+            if parts[0] == "containers":
+                return self._containers(method, parts[1:], query, body)
+            if parts[0] == "exec":
+                return self._exec(method, parts[1:])
+            if parts[0] == "images":
+                return self._images(method, path, query)
+            if path == "/build":
+                self.add_image(query["t"])
+                return 200, {"stream": f"Successfully tagged {query['t']}\n"}
+            if path == "/commit":
+                container = self._find(self.containers, query["container"])
+                if container is None:
+                    return 404, {"message": f"No such container: {query['container']}"}
+                return 201, {"Id": self.add_image(f"{query['repo']}:{query.get('tag') or 'latest'}")["Id"]}
+        return 404, {"message": f"page not found: {method} {path}"}
+
+    def add_image(self, reference: str) -> Dict[str, Any]:
+        """Store the image ``reference``, as a pull, build or commit does."""
+        reference = _reference(reference)
+        image = self.images[reference] = {"Id": f"sha256:{self.new_id()}", "RepoTags": [reference], "RepoDigests": []}
+        return image
+
+    def _images(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/images/create":
+            self.add_image(f"{query['fromImage']}:{query.get('tag') or 'latest'}")
+            return 200, {"status": "Downloaded"}
+        if path == "/images/json":
+            references = json.loads(query.get("filters", "{}")).get("reference", [])
+            return 200, [image for image in self.images.values() if _matches(image, references)]
+        name = _IMAGE.match(path).group(1)  # type: ignore[union-attr]
+        image = self.images.get(_reference(name))
+        if image is None:
+            return 404, {"message": f"No such image: {name}"}
+        if method == "DELETE":
+            del self.images[_reference(name)]
+            return 200, [{"Untagged": _reference(name)}, {"Deleted": image["Id"]}]
+        return 200, {**image, "Config": {}}
+
+    def _networks(self, method: str, parts: list, body: Any) -> Tuple[int, Any]:
+        if parts == ["create"]:
+            network_id = self.new_id()
+            self.networks[network_id] = {"Id": network_id, "Name": body["Name"], "Labels": body.get("Labels") or {}}
+            return 201, {"Id": network_id}
+        if parts == ["prune"]:
+            labels = [] if body is None else body
+            deleted = [network["Name"] for network in self.networks.values() if _labelled(network, labels)]
+            self.networks = {key: value for key, value in self.networks.items() if value["Name"] not in deleted}
+            return 200, {"NetworksDeleted": deleted}
+        if not parts:
+            return 200, list(self.networks.values())
+        network = self._find(self.networks, parts[0])
+        if network is None:
+            return 404, {"message": f"network {parts[0]} not found"}
+        if method == "DELETE":
+            del self.networks[network["Id"]]
+            return 204, None
+        if parts[1:] == ["disconnect"]:
+            return 200, None
+        members = {key: {} for key, value in self.containers.items() if value["Network"] == network["Name"]}
+        return 200, {**network, "Containers": members}
+
+    def _exec(self, method: str, parts: list) -> Tuple[int, Any]:
+        process = self.execs.get(parts[0])
+        if process is None:
+            return 404, {"message": f"No such exec instance: {parts[0]}"}
+        if parts[1:] == ["start"]:
+            container = self.containers.get(process["ContainerID"])
+            if container is None:
+                return 409, {"message": f"Container {process['ContainerID']} is not running"}
+            process["ExitCode"] = self._run(container, process["Cmd"])
+            return 200, None
+        return 200, {"ID": parts[0], "Running": False, **process}
+
+    def _containers(self, method: str, parts: list, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        if parts == ["create"]:
+            if _reference(body["Image"]) not in self.images:
+                return 404, {"message": f"No such image: {body['Image']}"}
+            container_id = self.new_id()
+            self.containers[container_id] = {
+                "Id": container_id,
+                "Name": "/" + query.get("name", container_id[:12]),
+                "Labels": body.get("Labels") or {},
+                "Network": (body.get("HostConfig") or {}).get("NetworkMode", "default"),
+                "Config": {**body, "Tty": False},
+                "Starts": [],
+            }
+            if body.get("Healthcheck"):
+                self.containers[container_id]["Health"] = {"Status": "starting"}
+            return 201, {"Id": container_id, "Warnings": []}
+        if parts == ["json"]:
+            labels = json.loads(query.get("filters", "{}")).get("label", [])
+            listed = [container for container in self.containers.values() if _labelled(container, labels)]
+            return 200, [_summary(container) for container in listed]
+        container = self._find(self.containers, parts[0])
+        if container is None:
+            return 404, {"message": f"No such container: {parts[0]}"}
+        if method == "DELETE":
+            del self.containers[container["Id"]]
+            self._emit(container, "die")
+            self._emit(container, "destroy")
+            return 204, None
+        action = parts[1] if len(parts) > 1 else ""
+        if action in ("start", "restart"):
+            container["Starts"].append(time.time())
+            # Like the daemon, publish ports without a fixed host port on a new port at every start.
+            bindings = (container["Config"].get("HostConfig") or {}).get("PortBindings") or {}
+            container["Ports"] = {
+                port: [{"HostIp": "0.0.0.0", "HostPort": hosts[0].get("HostPort") or str(next(self._host_ports))}]
+                for port, hosts in bindings.items()
+            }
+            # A restart stops the container and starts it again, and says so.
+            for event in ["die", "stop", "start", "restart"] if action == "restart" else ["start"]:
+                self._emit(container, event)
+        if action == "json":
+            return 200, _inspect(container)
+        if action == "exec":
+            exec_id = self.new_id()
+            command = body["Cmd"] if isinstance(body["Cmd"], list) else body["Cmd"].split()
+            self.execs[exec_id] = {"ContainerID": container["Id"], "Cmd": command, "ExitCode": None}
+            return 201, {"Id": exec_id}
+        if action == "logs":
+            return 200, container["Id"]
+        if action == "archive" and method == "PUT":
+            self.archives.setdefault(container["Id"], []).append((query.get("path", ""), body))
+            return 200, None
+        return 204, None
+
+    @staticmethod
+    def _find(resources: Dict[str, Dict[str, Any]], key: str) -> Optional[Dict[str, Any]]:
+        return resources.get(key) or next(
+            (value for value in resources.values() if value.get("Name", "").lstrip("/") == key), None
+        )
+
+
+def _labelled(resource: Dict[str, Any], filters: Any) -> bool:
+    # Both the query of a list call ({"label": [...]}) and the body of a prune call are accepted.
+    labels = filters.get("label", []) if isinstance(filters, dict) else filters
+    if isinstance(labels, dict):
+        labels = [label for label, enabled in labels.items() if enabled]
+    for label in labels:
+        key, _, value = label.partition("=")
+        if key not in resource["Labels"] or (value and resource["Labels"][key] != value):
+            return False
+    return True
+
+
+def _reference(name: str) -> str:
+    # Like the daemon, store images of Docker Hub by their short name.
+    for prefix in ("docker.io/library/", "docker.io/"):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+def _matches(image: Dict[str, Any], references: List[str]) -> bool:
+    # The reference filter of the daemon: a name matches all tags of the repository.
+    return not references or any(
+        tag == _reference(reference) or tag.rsplit(":", 1)[0] == reference
+        for reference in references
+        for tag in image["RepoTags"]
+    )
+
+
+def _timestamp(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "0001-01-01T00:00:00Z"
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _summary(container: Dict[str, Any]) -> Dict[str, Any]:
+    state = "running" if container["Starts"] else "created"
+    return {"Id": container["Id"], "Names": [container["Name"]], "Labels": container["Labels"], "State": state}
+
+
+def _inspect(container: Dict[str, Any]) -> Dict[str, Any]:
+    started = container["Starts"][-1] if container["Starts"] else None
+    state: Dict[str, Any] = {"Status": "running", "Running": True, "ExitCode": 0, "StartedAt": _timestamp(started)}
+    if "Health" in container:
+        state["Health"] = dict(container["Health"])
+    return {
+        "Id": container["Id"],
+        "Name": container["Name"],
+        "State": state,
+        "Config": {"Image": container["Config"]["Image"], "Labels": container["Labels"], "Tty": False},
+        "HostConfig": container["Config"].get("HostConfig") or {},
+        "NetworkSettings": {
+            "Ports": container.get("Ports", {}),
+            "Networks": {container["Network"]: {"IPAddress": "172.30.0.2", "Aliases": []}},
+        },
+    }
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    # Clients open many connections at once: the default backlog of 5 makes connects fail with EAGAIN.
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    docker: FakeDocker
+
+    def setup(self) -> None:
+        super().setup()
+        with self.docker._lock:
+            self.docker.connections += 1
+
+    def _respond(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path.endswith("/events"):
+            self._events(json.loads(query.get("filters", "{}")))
+            return
+        raw = self._body()
+        if url.path.endswith(("/archive", "/build")):
+            # A tar archive: only its member names are kept, see FakeDocker.archives.
+            with tarfile.open(fileobj=io.BytesIO(raw)) as archive:
+                body = archive.getnames()
+        else:
+            body = json.loads(raw) if raw else None
+        if url.path.endswith("/networks/prune") and "filters" in query:
+            body = json.loads(query["filters"])
+        status, document = self.docker.handle(self.command, url.path, query, body)
+        if re.search(r"/exec/[^/]+/start$", url.path) and status == 200:
+            self._raw_stream()
+            return
+        if url.path.endswith("/logs") and status == 200:
+            follow = query.get("follow") in ("1", "true")
+            self._logs(self.docker.output(document, follow, float(query.get("since") or 0)))
+            return
+        data = b"" if document is None else (document if isinstance(document, str) else json.dumps(document)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain" if isinstance(document, str) else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _raw_stream(self) -> None:
+        # Like the daemon, the connection is hijacked for the output of the command: upgraded when the client asks
+        # for it, as the Docker SDK does, a plain response otherwise. The output ends with the connection; the
+        # plugin attaches no streams, so there is none.
+        if self.headers.get("Upgrade", "").lower() == "tcp":
+            self.send_response(101, "UPGRADED")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Upgrade", "tcp")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _logs(self, lines: Iterator[str]) -> None:
+        # Multiplexed, as the output of a container without a TTY: every line is a frame of stdout.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+        try:
+            for line in lines:
+                data = line.encode() + b"\n"
+                frame = struct.pack(">BxxxL", 1, len(data)) + data
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        self.close_connection = True
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if not size:
+                return b"".join(chunks)
+
+    def _events(self, filters: Dict[str, Any]) -> None:
+        events = self.docker.subscribe(filters)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                data = json.dumps(event).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        self.close_connection = True
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _respond
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/fake-docker.sock", help="path of the Unix socket")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay of every response")
+    args = parser.parse_args()
+    with FakeDocker(args.socket, args.latency_ms / 1000) as docker:
+        print(f"serving on unix://{args.socket}; interrupt to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            print(json.dumps(dict(docker.calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
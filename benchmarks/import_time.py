@@ -0,0 +1,66 @@
+"""Guard the import cost of the plugin against regressions.
+
+pytest imports the plugin on every run, including ``--collect-only`` and IDE test discovery. This script imports it
+with ``python -X importtime`` in fresh interpreters, after pytest itself, and fails when the import takes longer than
+the budget, or when it loads a module that only fixtures need, such as the Docker SDK::
+
+    python benchmarks/import_time.py --budget-ms 50
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+MODULE = "pytest_docker_network_fixtures.plugin"
+#: Modules only fixtures need; importing the plugin must not load them.
+HEAVY = ("docker", "requests", "urllib3", "filelock", "aiohttp", "http.client")
+
+
+def measure(python: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """Milliseconds to import the plugin after pytest, and the modules that import loaded with their own time."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import pytest; import {MODULE}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines are "import time: self [us] | cumulative | name", children before their parent; top level imports
+    # have a single space before the name. Everything after the top level pytest line was loaded by the plugin.
+    modules: List[Tuple[float, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if name == " pytest":
+            modules = []
+        elif name == f" {MODULE}":
+            return int(cumulative) / 1000, modules
+        else:
+            modules.append((int(own) / 1000, name.strip()))
+    raise RuntimeError(f"{MODULE} not found in -X importtime output:\n{result.stderr}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="maximum import time (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs; the fastest counts (default: %(default)s)")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to measure (default: this one)")
+    args = parser.parse_args()
+
+    milliseconds, modules = min((measure(args.python) for _ in range(args.repeat)), key=lambda run: run[0])
+    print(f"import {MODULE}: {milliseconds:.1f} ms (budget {args.budget_ms:.1f} ms)")
+    for own, name in sorted(modules, reverse=True)[:10]:
+        print(f"  {own:7.1f} ms  {name}")
+
+    failures = [f"heavy module imported: {name}" for _, name in modules if name.split(".")[0] in HEAVY or name in HEAVY]
+    if milliseconds > args.budget_ms:
+        failures.append(f"import takes {milliseconds:.1f} ms, more than the budget of {args.budget_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
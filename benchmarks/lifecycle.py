@@ -0,0 +1,193 @@
+"""Benchmark the fixture lifecycle against the stub Docker API of :mod:`fake_docker`.
+
+Every scenario is a small generated test project, run with pytest in a fresh interpreter against the stub on a
+Unix socket, so that neither a Docker daemon nor network access is needed. The stub delays every call by
+``--latency-ms``, which stands in for the daemon; the numbers then show what the plugin adds on top. Reported per
+scenario, as the median of ``--repeat`` runs:
+
+- the wall time of the pytest run, and that time minus the run of a test without fixtures,
+- setup and teardown time of the containers and networks, from ``--docker-fixtures-timings-json``,
+- the number of Docker API calls, in total and per container.
+
+Scenarios: the session network alone; 1, 10 and 100 container fixtures; and, when pytest-xdist is installed, one
+container shared by all workers against a container per worker, which shows the cost of the coordination::
+
+    python benchmarks/lifecycle.py --latency-ms 2 --json results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_docker import FakeDocker  # noqa: E402
+
+CONTAINER_COUNTS = (1, 10, 100)
+
+
+@dataclass
+class Scenario:
+    name: str
+    conftest: str
+    tests: str
+    arguments: Sequence[str] = ()
+    containers: int = 0
+
+
+@dataclass
+class Result:
+    name: str
+    seconds: float
+    overhead: float = 0.0
+    """Seconds more than the run without fixtures."""
+    setup: float = 0.0
+    teardown: float = 0.0
+    calls: int = 0
+    calls_per_container: Optional[float] = None
+    endpoints: Dict[str, int] = field(default_factory=dict)
+
+
+def scenarios(workers: int) -> List[Scenario]:
+    found = [
+        Scenario("baseline", "", "def test_nothing():\n    pass\n"),
+        Scenario("network", "", "def test_network(docker_network):\n    pass\n"),
+    ]
+    for count in CONTAINER_COUNTS:
+        found.append(
+            Scenario(
+                f"containers-{count}",
+                textwrap.dedent(
+                    f"""
+                    from pytest_docker_network_fixtures import container_fixture
+
+                    NAMES = [f"c{{i}}" for i in range({count})]
+                    for name in NAMES:
+                        globals()[name] = container_fixture(name, "bench/image:latest")
+                    """
+                ),
+                "import pytest\n\nfrom conftest import NAMES\n\n\n"
+                "@pytest.mark.usefixtures(*NAMES)\ndef test_containers():\n    pass\n",
+                containers=count,
+            )
+        )
+    if workers:
+        found.append(Scenario(f"xdist-{workers}-baseline", "", "def test_nothing():\n    pass\n", ("-n", str(workers))))
+        tests = "".join(f"def test_{i}(service):\n    pass\n\n\n" for i in range(workers * 4))
+        for shared in (False, True):
+            found.append(
+                Scenario(
+                    f"xdist-{workers}-{'shared' if shared else 'per-worker'}",
+                    "from pytest_docker_network_fixtures import container_fixture\n\n"
+                    f'service = container_fixture("service", "bench/image:latest", shared={shared})\n',
+                    tests,
+                    ("-n", str(workers)),
+                    containers=1 if shared else workers,
+                )
+            )
+    return found
+
+
+def run(python: str, scenario: Scenario, docker: FakeDocker, directory: Path) -> Result:
+    (directory / "conftest.py").write_text(scenario.conftest)
+    (directory / "test_scenario.py").write_text(scenario.tests)
+    timings = directory / "timings.json"
+    command = [
+        python, "-m", "pytest", "-q", "-p", "no:cacheprovider", f"--docker-fixtures-timings-json={timings}",
+        *scenario.arguments,
+    ]
+    environment = {**os.environ, "DOCKER_HOST": f"unix://{docker.socket_path}", "PYTHONDONTWRITEBYTECODE": "1"}
+    docker.reset()
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=directory, env=environment, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise SystemExit(f"{scenario.name} failed:\n{process.stdout}{process.stderr}")
+    resources = json.loads(timings.read_text())["resources"] if timings.exists() else []
+    phases = [resource["phases"] for resource in resources]
+    calls = sum(docker.calls.values())
+    return Result(
+        name=scenario.name,
+        seconds=seconds,
+        setup=sum(value for phase in phases for name, value in phase.items() if name != "remove"),
+        teardown=sum(phase.get("remove", 0.0) for phase in phases),
+        calls=calls,
+        endpoints=dict(docker.calls),
+    )
+
+
+def median(runs: List[Result]) -> Result:
+    result = runs[len(runs) // 2]
+    result.seconds = statistics.median(run.seconds for run in runs)
+    result.setup = statistics.median(run.setup for run in runs)
+    result.teardown = statistics.median(run.teardown for run in runs)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="delay of every stub API response")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the median is reported")
+    parser.add_argument("--workers", type=int, default=4, help="pytest-xdist workers (0: skip the xdist scenarios)")
+    parser.add_argument(
+        "--only", action="append", help="run only the scenarios whose name starts with this, and the baselines"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--python", default=sys.executable, help="interpreter with the plugin installed")
+    args = parser.parse_args()
+
+    workers = args.workers
+    if workers and subprocess.run([args.python, "-c", "import xdist"], capture_output=True).returncode != 0:
+        print("pytest-xdist is not installed; skipping the xdist scenarios")
+        workers = 0
+    selected = [
+        scenario
+        for scenario in scenarios(workers)
+        if not args.only or scenario.name.endswith("baseline") or scenario.name.startswith(tuple(args.only))
+    ]
+    results: Dict[str, Result] = {}
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = Path(temporary)
+        with FakeDocker(str(directory / "docker.sock"), args.latency_ms / 1000) as docker:
+            for scenario in selected:
+                result = results[scenario.name] = median(
+                    [run(args.python, scenario, docker, directory) for _ in range(args.repeat)]
+                )
+                baseline = results.get(f"xdist-{workers}-baseline" if scenario.arguments else "baseline")
+                if baseline is not None:
+                    result.overhead = result.seconds - baseline.seconds
+                if scenario.containers:
+                    # Not counting the calls for the network, which every scenario creates.
+                    network = results.get("network")
+                    calls = result.calls - (network.calls if network else 0)
+                    result.calls_per_container = calls / scenario.containers
+
+    print(f"latency {args.latency_ms} ms per API call, median of {args.repeat} runs")
+    print(
+        f"{'scenario':<24} {'run s':>8} {'extra s':>8} {'setup s':>8} {'teardown s':>10} {'calls':>6}"
+        f" {'/container':>10}"
+    )
+    for result in results.values():
+        per_container = "" if result.calls_per_container is None else f"{result.calls_per_container:.1f}"
+        print(
+            f"{result.name:<24} {result.seconds:>8.3f} {result.overhead:>8.3f} {result.setup:>8.3f}"
+            f" {result.teardown:>10.3f} {result.calls:>6} {per_container:>10}"
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            results_json = [asdict(result) for result in results.values()]
+            json.dump({"latency_ms": args.latency_ms, "results": results_json}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Create pytest fixtures for Docker containers in a separate bridge network."""
+from . import presets
+from .build import Build, ImageBuildError
+from .container import ContainerSpec, ContainerStartError, DockerContainer, NetworkInfo, container_fixture
+from .network import DockerNetwork, NetworkLeaseError
+from .pool import ContainerPool, pooled_container_fixture
+from .readiness import (
+    Backoff,
+    ExecProbe,
+    HealthcheckProbe,
+    HttpProbe,
+    LogProbe,
+    Probe,
+    ProbeTiming,
+    Readiness,
+    TcpProbe,
+)
+from .resources import Resources
+from .scheduler import DependencyError
+from .snapshot import Snapshot
+
+__all__ = [
+    "Backoff",
+    "Build",
+    "ContainerPool",
+    "ContainerSpec",
+    "ContainerStartError",
+    "DependencyError",
+    "DockerContainer",
+    "DockerNetwork",
+    "ExecProbe",
+    "HealthcheckProbe",
+    "HttpProbe",
+    "ImageBuildError",
+    "LogProbe",
+    "NetworkInfo",
+    "NetworkLeaseError",
+    "Probe",
+    "ProbeTiming",
+    "Readiness",
+    "Resources",
+    "Snapshot",
+    "TcpProbe",
+    "container_fixture",
+    "pooled_container_fixture",
+    "presets",
+]
@@ -0,0 +1,132 @@
+"""Admission control: containers only start while the resources they declare fit in the budget of the host.
+
+Container fixtures declare the memory and CPUs they need, see :class:`.resources.Resources`. All pytest processes on
+the host, pytest-xdist workers and other sessions alike, share one ledger of the resources of their containers: a JSON
+file, guarded by a file lock next to it. A container that does not fit waits in line, in order of arrival, until others
+are removed, instead of overcommitting the machine. Entries of processes that no longer run are dropped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from filelock import FileLock
+
+from .container import ContainerStartError
+from .paths import STATE_DIRECTORY
+from .resources import Resources
+from .teardown import gone, owner
+
+#: Longest interval between two looks at the ledger of a waiting container.
+POLL_INTERVAL = 0.25
+
+Entry = Dict[str, Any]
+
+
+class Admission:
+    """Admits containers within ``budget`` on this host, waiting at most ``timeout`` seconds for each."""
+
+    def __init__(self, budget: Resources, timeout: float, directory: Optional[Path] = None) -> None:
+        self.budget = budget
+        self.timeout = timeout
+        self.directory = directory or STATE_DIRECTORY
+        self._path = self.directory / "admission.json"
+        self._lock = FileLock(str(self.directory / "admission.lock"))
+        # The tickets this process owns, released together when the session finishes.
+        self._tickets: Set[str] = set()
+        self._tickets_lock = threading.Lock()
+
+    def _read(self) -> List[Entry]:
+        try:
+            entries = json.loads(self._path.read_text())
+        except (FileNotFoundError, ValueError):
+            return []
+        return [entry for entry in entries if not gone(entry["owner"])]
+
+    def _write(self, entries: List[Entry]) -> None:
+        tmp = self._path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entries))
+        os.replace(tmp, self._path)
+
+    def acquire(self, name: str, resources: Resources, holder: Optional[str] = None) -> str:
+        """Wait until ``resources`` fit in the budget besides those of the admitted containers.
+
+        Returns the ticket to :meth:`release` when the container is removed. Raises :class:`.ContainerStartError`
+        when the container was not admitted within the timeout. The ticket belongs to the process ``holder``, as
+        identified by :func:`.teardown.owner`, instead of this one when given: :meth:`release_all` leaves it alone,
+        and it is dropped once that process no longer runs.
+        """
+        ticket = uuid.uuid4().hex
+        entry = {
+            "ticket": ticket,
+            "owner": holder or owner(),
+            "name": name,
+            "memory": resources.memory,
+            "cpus": resources.cpus,
+            "admitted": False,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if holder is None:
+            with self._tickets_lock:
+                self._tickets.add(ticket)
+        with self._lock:
+            self._write([*self._read(), entry])
+        deadline = time.monotonic() + self.timeout
+        interval = 0.05
+        try:
+            while not self._admit(entry):
+                if time.monotonic() >= deadline:
+                    raise ContainerStartError(
+                        f"{name}: {resources} did not fit in the budget of {self.budget} within {self.timeout} seconds"
+                    )
+                time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+                interval = min(interval * 2, POLL_INTERVAL)
+        except BaseException:
+            self.release(ticket)
+            raise
+        return ticket
+
+    def _admit(self, entry: Entry) -> bool:
+        with self._lock:
+            entries = self._read()
+            admitted = [other for other in entries if other["admitted"]]
+            waiting = [other for other in entries if not other["admitted"]]
+            ours = next((other for other in waiting if other["ticket"] == entry["ticket"]), None)
+            if ours is None:
+                # Dropped from the ledger, for instance along with a ledger that could not be read: in line again.
+                self._write([*entries, entry])
+                return False
+            used = sum((_resources(other) for other in admitted), Resources())
+            # In order of arrival, so that a large container is not overtaken by small ones forever. A container
+            # that exceeds the budget on its own starts once nothing else runs.
+            if waiting[0] is ours and (not admitted or (used + _resources(ours)).within(self.budget)):
+                ours["admitted"] = True
+            self._write(entries)
+            return ours["admitted"]
+
+    def release(self, ticket: str) -> None:
+        """Give the resources of the ticket back to the budget."""
+        self._release({ticket})
+
+    def release_all(self) -> None:
+        """Give the resources of all tickets this process owns back to the budget."""
+        with self._tickets_lock:
+            tickets = set(self._tickets)
+        self._release(tickets)
+
+    def _release(self, tickets: Set[str]) -> None:
+        with self._tickets_lock:
+            self._tickets -= tickets
+        if not tickets:
+            return
+        with self._lock:
+            self._write([entry for entry in self._read() if entry["ticket"] not in tickets])
+
+
+def _resources(entry: Entry) -> Resources:
+    return Resources(entry["memory"], entry["cpus"])
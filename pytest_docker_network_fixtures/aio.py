@@ -0,0 +1,617 @@
+"""asyncio variants of the container fixtures, for tests that use pytest-asyncio.
+
+Containers are created, probed and removed with :class:`AsyncDockerClient`, a client of the Docker Engine API on
+aiohttp, so that starting containers does not block the event loop. Install the ``asyncio`` extra. The session
+network, and the images and builds, come from the synchronous session, see :mod:`.session`, in a thread.
+
+The plugin registers this module when pytest-asyncio is installed; the asyncio fixtures only work in an event loop
+of pytest-asyncio.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import re
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import urlparse
+
+import pytest
+import pytest_asyncio
+
+from .container import (
+    ASYNC_REGISTRY,
+    REGISTRY,
+    ContainerSpec,
+    ContainerStartError,
+    DockerContainer,
+    container_name,
+    container_spec,
+    create_options,
+    host_config_options,
+    scope_key,
+)
+from .readiness import (
+    DEFAULT_PROBES,
+    DIRECT_TIMEOUT,
+    Backoff,
+    ExecProbe,
+    HealthcheckProbe,
+    HttpProbe,
+    LogProbe,
+    Probe,
+    ProbeTiming,
+    Readiness,
+    TcpProbe,
+)
+from .files import archives
+from .scheduler import DependencyError
+from .timing import timings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from .build import Build
+    from .events import ContainerEvents
+    from .network import DockerNetwork
+    from .resources import Resources
+    from .session import DockerFixtureSession
+
+#: Longest line kept; longer lines are split, like in :mod:`.logs`.
+MAX_LINE = 64 * 1024
+
+#: The Engine API version the request bodies are built for, unless the daemon is older.
+API_VERSION = "1.41"
+
+
+class AsyncDockerError(Exception):
+    """The Docker daemon answered a request with an error."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class AsyncDockerClient:
+    """An asyncio client of the Docker Engine API, for the calls the asyncio fixtures make.
+
+    Connects to ``DOCKER_HOST`` like the Docker SDK: the Unix socket by default, or plain TCP. The connection pool
+    belongs to the event loop the first request runs in; :meth:`close` it before that loop closes.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, max_connections: int = 32) -> None:
+        self.base_url = base_url or os.environ.get("DOCKER_HOST") or "unix:///var/run/docker.sock"
+        self.max_connections = max_connections
+        self.version: Optional[str] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._connecting: Optional[asyncio.Lock] = None
+
+    async def _session(self) -> aiohttp.ClientSession:
+        if self._http is not None:
+            return self._http
+        if self._connecting is None:
+            # Created in the event loop of the first request, which the lock belongs to.
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self._http is None:
+                import aiohttp
+
+                url = urlparse(self.base_url)
+                if url.scheme in ("unix", "http+unix"):
+                    connector: aiohttp.BaseConnector = aiohttp.UnixConnector(url.path, limit=self.max_connections)
+                    root = "http://docker"
+                else:
+                    connector = aiohttp.TCPConnector(limit=self.max_connections)
+                    root = f"http://{url.netloc}"
+                http = aiohttp.ClientSession(root, connector=connector, timeout=aiohttp.ClientTimeout(total=None))
+                try:
+                    async with http.get("/version") as response:
+                        server = (await response.json())["ApiVersion"]
+                except BaseException:
+                    await http.close()
+                    raise
+                self.version = min(server, API_VERSION, key=lambda version: tuple(map(int, version.split("."))))
+                # Published only once the version is known: the paths of all requests start with it.
+                self._http = http
+        return self._http
+
+    async def close(self) -> None:
+        if self._http is not None:
+            http, self._http = self._http, None
+            await http.close()
+
+    async def __aenter__(self) -> AsyncDockerClient:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Mapping[str, str]] = None,
+        body: Any = None,
+        data: Any = None,
+    ) -> Any:
+        """Send a request and return the decoded JSON response, if any; raises :class:`AsyncDockerError`.
+
+        ``body`` is sent as JSON, ``data`` as it is.
+        """
+        http = await self._session()
+        async with http.request(method, f"/v{self.version}{path}", params=params, json=body, data=data) as response:
+            data = await response.read()
+            if response.status >= 400:
+                raise AsyncDockerError(response.status, _message(data))
+        return json.loads(data) if data and response.content_type == "application/json" else None
+
+    async def create_container(
+        self,
+        spec: ContainerSpec,
+        network: DockerNetwork,
+        image: Optional[str] = None,
+        labels: Optional[Mapping[str, str]] = None,
+    ) -> DockerContainer:
+        """Create and start a container for ``spec``, like :func:`.container.create_container`."""
+        from docker.types import ContainerConfig, HostConfig
+
+        await self._session()
+        name = container_name(spec, network)
+        aliases = (spec.name, *spec.aliases)
+        config = ContainerConfig(
+            self.version,
+            image or spec.image,
+            spec.command,
+            ports=list(spec.ports) or None,
+            environment=dict(spec.environment),
+            host_config=HostConfig(self.version, **host_config_options(spec, network)),
+            networking_config={"EndpointsConfig": {network.name: {"Aliases": list(aliases)}}},
+            **create_options(spec, labels),
+        )
+        start = time.monotonic()
+        response = await self.request("POST", "/containers/create", params={"name": name}, body=config)
+        container = DockerContainer(spec=spec, id=response["Id"], name=name, network=network, aliases=aliases)
+        try:
+            for target, source in spec.files.items():
+                await self.inject_files(container.id, source, target)
+            await self.request("POST", f"/containers/{container.id}/start")
+        except BaseException:
+            # Nobody else knows the container yet; removed also when the task was cancelled.
+            await asyncio.shield(self.remove_container(container.id))
+            raise
+        timings.register(container.id, "container", spec.name, name)
+        timings.add(container.id, "create", time.monotonic() - start)
+        return container
+
+    async def inject_files(self, container_id: str, source: Union[str, "os.PathLike[str]"], target: str) -> None:
+        """Copy ``source`` into the directory ``target`` of the container, like :func:`.files.inject`."""
+        archive = await asyncio.to_thread(archives.archive, source)
+        with open(archive, "rb") as data:
+            # Sent from the file in chunks, read in a thread.
+            await self.request("PUT", f"/containers/{container_id}/archive", params={"path": target}, data=data)
+
+    async def inspect_container(self, container_id: str) -> Dict[str, Any]:
+        return await self.request("GET", f"/containers/{container_id}/json")
+
+    async def remove_container(self, container_id: str) -> None:
+        start = time.monotonic()
+        try:
+            await self.request("DELETE", f"/containers/{container_id}", params={"force": "1", "v": "1"})
+            timings.add(container_id, "remove", time.monotonic() - start)
+        except AsyncDockerError as error:
+            if error.status != 404:
+                raise
+
+    async def exec_run(self, container_id: str, command: Union[str, Sequence[str]]) -> int:
+        """Run ``command`` in the container and return its exit code."""
+        from docker.utils import split_command
+
+        cmd = split_command(command) if isinstance(command, str) else list(command)
+        body = {"Cmd": cmd, "AttachStdout": False, "AttachStderr": False}
+        exec_id = (await self.request("POST", f"/containers/{container_id}/exec", body=body))["Id"]
+        # Without attached streams the request returns when the command exits.
+        await self.request("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False})
+        return (await self.request("GET", f"/exec/{exec_id}/json"))["ExitCode"]
+
+    async def follow_lines(
+        self, container_id: str, tty: bool = False, since: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield the output lines of a container written from ``since`` on, until the container stops."""
+        http = await self._session()
+        params = {"follow": "1", "stdout": "1", "stderr": "1"}
+        if since is not None:
+            params["since"] = str(since)
+        async with http.get(f"/v{self.version}/containers/{container_id}/logs", params=params) as response:
+            if response.status >= 400:
+                raise AsyncDockerError(response.status, _message(await response.read()))
+            pending = b""
+            async for chunk in _payloads(response.content, tty):
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                while len(pending) > MAX_LINE:
+                    lines.append(pending[:MAX_LINE])
+                    pending = pending[MAX_LINE:]
+                for line in lines:
+                    yield line.decode("utf-8", "replace")
+            if pending:
+                yield pending.decode("utf-8", "replace")
+
+
+def _message(data: bytes) -> str:
+    try:
+        return json.loads(data)["message"]
+    except (ValueError, KeyError, TypeError):
+        return data.decode("utf-8", "replace")
+
+
+async def _payloads(content: aiohttp.StreamReader, tty: bool) -> AsyncIterator[bytes]:
+    # Without a TTY the daemon multiplexes stdout and stderr in frames: an 8 byte header ending in the size.
+    if tty:
+        async for chunk in content.iter_any():
+            yield chunk
+        return
+    while True:
+        try:
+            header = await content.readexactly(8)
+            yield await content.readexactly(int.from_bytes(header[4:], "big"))
+        except asyncio.IncompleteReadError:
+            return
+
+
+@functools.singledispatch
+async def check(probe: Probe, client: AsyncDockerClient, container: DockerContainer) -> bool:
+    """Whether ``probe`` passes, without blocking the event loop.
+
+    Probes without an asyncio implementation run their ``check`` in a thread, with the synchronous client.
+    """
+    from .client import get_client
+
+    return await asyncio.to_thread(probe.check, get_client(client.max_connections), container)
+
+
+@check.register
+async def _(probe: HealthcheckProbe, client: AsyncDockerClient, container: DockerContainer) -> bool:
+    # Reads only the inspected state, which the monitor of :func:`wait_until_ready` refreshes.
+    return probe.check(None, container)  # type: ignore[arg-type]
+
+
+@check.register
+async def _(probe: TcpProbe, client: AsyncDockerClient, container: DockerContainer) -> bool:
+    # Like TcpProbe.check.
+    direct = probe.direct_address(container)
+    if direct is not None:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(*direct), min(probe.timeout, DIRECT_TIMEOUT))
+        except ConnectionRefusedError:
+            return False
+        except (OSError, asyncio.TimeoutError):
+            probe.unreachable.add(direct[0])
+        else:
+            writer.close()
+            return True
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*container.address(probe.port)), probe.timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        if not probe.published(container):
+            return True
+        return await asyncio.wait_for(reader.read(1), probe.settle) != b""
+    except asyncio.TimeoutError:
+        return True
+    except OSError:
+        return False
+    finally:
+        writer.close()
+
+
+@check.register
+async def _(probe: HttpProbe, client: AsyncDockerClient, container: DockerContainer) -> bool:
+    host, port = container.address(probe.port)
+
+    async def status() -> int:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f"GET {probe.path} HTTP/1.0\r\nHost: {host}:{port}\r\n\r\n".encode())
+            await writer.drain()
+            return int((await reader.readline()).split()[1])
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(status(), probe.timeout) == probe.status
+    except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+        return False
+
+
+@check.register
+async def _(probe: ExecProbe, client: AsyncDockerClient, container: DockerContainer) -> bool:
+    return await client.exec_run(container.id, probe.command) == probe.exit_code
+
+
+async def wait_until_ready(
+    client: AsyncDockerClient, container: DockerContainer, events: Optional[ContainerEvents] = None
+) -> Readiness:
+    """Run the probes of the container as concurrent tasks until all pass; records and returns the timings.
+
+    Meanwhile a monitor inspects the container, to fail as soon as it exits. With the ``events`` of the session,
+    it inspects the container only when its state changes, and wakes the probes that depend on the state.
+    """
+    spec = container.spec
+    readiness = container.readiness = Readiness([ProbeTiming(probe) for probe in spec.probes or DEFAULT_PROBES])
+    start = time.monotonic()
+    seen = events.count(container.id) if events is not None else 0
+    container.attrs = await client.inspect_container(container.id)
+    refreshed = asyncio.Condition()
+    monitor = asyncio.ensure_future(_monitor(client, container, events, seen, refreshed))
+    probes = asyncio.gather(
+        *(_until_passes(client, container, timing, start, refreshed if events else None) for timing in readiness.probes)
+    )
+    try:
+        done, _ = await asyncio.wait(
+            [monitor, probes], timeout=spec.startup_timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            task.result()
+        if not probes.done():
+            pending = [repr(timing.probe) for timing in readiness.probes if timing.seconds is None]
+            raise ContainerStartError(f"{spec.name}: not ready after {spec.startup_timeout} seconds: {pending}")
+    finally:
+        monitor.cancel()
+        probes.cancel()
+    readiness.seconds = time.monotonic() - start
+    timings.add(container.id, "ready", readiness.seconds)
+    return readiness
+
+
+async def _monitor(
+    client: AsyncDockerClient,
+    container: DockerContainer,
+    events: Optional[ContainerEvents],
+    seen: int,
+    refreshed: asyncio.Condition,
+) -> None:
+    for interval in (container.spec.backoff or Backoff()).intervals():
+        state = container.attrs["State"]
+        if not state["Running"] and state["Status"] not in ("created", "restarting"):
+            raise ContainerStartError(f"{container.spec.name}: container {state['Status']} ({state['ExitCode']})")
+        if events is None or events.closed:
+            await asyncio.sleep(interval)
+        else:
+            await events.wait_async(container.id, seen, container.spec.startup_timeout)
+            seen = events.count(container.id)
+        container.attrs = await client.inspect_container(container.id)
+        async with refreshed:
+            refreshed.notify_all()
+
+
+async def _until_passes(
+    client: AsyncDockerClient,
+    container: DockerContainer,
+    timing: ProbeTiming,
+    start: float,
+    refreshed: Optional[asyncio.Condition] = None,
+) -> None:
+    probe = timing.probe
+    if isinstance(probe, LogProbe):
+        # One streaming request, read until the pattern matched often enough.
+        timing.attempts = 1
+        pattern, count = re.compile(probe.pattern), 0
+        tty = container.attrs["Config"].get("Tty", False)
+        async for line in client.follow_lines(container.id, tty, container.started_at):
+            count += bool(pattern.search(line))
+            if count >= probe.occurrences:
+                timing.seconds = time.monotonic() - start
+                return
+        raise ContainerStartError(f"{container.spec.name}: output ended before {probe!r} matched")
+    intervals = (container.spec.backoff or Backoff()).intervals()
+    while True:
+        if container.attrs["State"]["Running"]:
+            timing.attempts += 1
+            if await check(probe, client, container):
+                timing.seconds = time.monotonic() - start
+                return
+        if refreshed is not None and probe.on_events:
+            # Checked again when the monitor inspected the container after an event.
+            async with refreshed:
+                await refreshed.wait()
+        else:
+            await asyncio.sleep(next(intervals))
+
+
+class AsyncFixtureSession:
+    """The asyncio containers started in one event loop.
+
+    All asyncio container fixtures a test uses are started as concurrent tasks when the first of them is set up;
+    a container starts once the asyncio containers in its ``depends_on`` are ready. Containers started for a fixture
+    the test did not get to use are removed when the scope they were started for ends. The client is closed when the
+    last container is released.
+    """
+
+    def __init__(self, session: DockerFixtureSession) -> None:
+        self.session = session
+        self.client = AsyncDockerClient(max_connections=session.settings.api_pool_size)
+        self._tasks: Dict[Tuple[str, str], asyncio.Future[DockerContainer]] = {}
+        # The containers handed to a fixture and not released yet.
+        self._acquired: Set[Tuple[str, str]] = set()
+
+    def _start(self, spec: ContainerSpec, item: pytest.Item, _path: Tuple[str, ...] = ()) -> asyncio.Future:
+        if spec.name in _path:
+            raise DependencyError(f"container fixtures depend on each other: {' -> '.join((*_path, spec.name))}")
+        key = (spec.name, scope_key(item, spec.scope))
+        task = self._tasks.get(key)
+        if task is None:
+            dependencies = [
+                self._start(ASYNC_REGISTRY[name], item, (*_path, spec.name))
+                for name in spec.depends_on
+                if name in ASYNC_REGISTRY
+            ]
+            task = self._tasks[key] = asyncio.ensure_future(self._run(spec, dependencies))
+        return task
+
+    async def _run(self, spec: ContainerSpec, dependencies: List[asyncio.Future]) -> DockerContainer:
+        await asyncio.gather(*dependencies)
+        start = time.monotonic()
+        image = await asyncio.to_thread(self.session.image, spec)
+        waited = time.monotonic() - start
+        network, events = await asyncio.to_thread(lambda: (self.session.network, self.session.events))
+        start = time.monotonic()
+        ticket = await asyncio.to_thread(self.session.admit, spec)
+        queued = time.monotonic() - start
+        try:
+            container = await self.client.create_container(spec, network, image, self.session.labels)
+        except BaseException:
+            self.session.release_ticket(ticket)
+            raise
+        self.session.admitted(container.id, ticket)
+        timings.add(container.id, "image", waited)
+        timings.add(container.id, "queue", queued)
+        try:
+            await wait_until_ready(self.client, container, events)
+        except BaseException:
+            await asyncio.shield(self.client.remove_container(container.id))
+            self.session.dismiss(container.id)
+            raise
+        return container
+
+    async def acquire(self, spec: ContainerSpec, item: pytest.Item) -> DockerContainer:
+        """Return the ready container for ``spec`` in the scope of ``item``, starting it when needed."""
+        for name in item.fixturenames:
+            if name in ASYNC_REGISTRY and name != spec.name:
+                self._start(ASYNC_REGISTRY[name], item)
+        key = (spec.name, scope_key(item, spec.scope))
+        try:
+            container = await self._start(spec, item)
+        except BaseException:
+            # The test does not get to set up the other fixtures it was started for.
+            await self._discard()
+            raise
+        self._acquired.add(key)
+        return container
+
+    async def release(self, container: DockerContainer, item: pytest.Item) -> None:
+        key = (container.spec.name, scope_key(item, container.spec.scope))
+        self._acquired.discard(key)
+        self._tasks.pop(key, None)
+        await self.client.remove_container(container.id)
+        self.session.dismiss(container.id)
+        await self._discard()
+        if not self._tasks:
+            await self.client.close()
+
+    async def _discard(self) -> None:
+        """Remove the containers started ahead for scopes in which no fixture holds a container any more."""
+        held = {scope for _, scope in self._acquired}
+        tasks = [self._tasks.pop(key) for key in list(self._tasks) if key[1] not in held]
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, DockerContainer):
+                await self.client.remove_container(result.id)
+                self.session.dismiss(result.id)
+
+
+_SESSIONS = pytest.StashKey["weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncFixtureSession]"]()
+
+
+def get_async_session(config: pytest.Config) -> AsyncFixtureSession:
+    """The asyncio containers of the running event loop; created on first use."""
+    from .plugin import get_session
+
+    sessions = config.stash.setdefault(_SESSIONS, weakref.WeakKeyDictionary())
+    loop = asyncio.get_running_loop()
+    if loop not in sessions:
+        sessions[loop] = AsyncFixtureSession(get_session(config))
+    return sessions[loop]
+
+
+def async_container_fixture(
+    name: str,
+    image: Optional[str] = None,
+    *,
+    command: Optional[Union[str, Sequence[str]]] = None,
+    environment: Optional[Mapping[str, str]] = None,
+    ports: Optional[Mapping[Union[int, str], Optional[int]]] = None,
+    depends_on: Sequence[str] = (),
+    aliases: Sequence[str] = (),
+    scope: str = "session",
+    loop_scope: Optional[str] = None,
+    startup_timeout: float = 60.0,
+    probes: Sequence[Probe] = (),
+    backoff: Optional[Backoff] = None,
+    create_kwargs: Optional[Mapping[str, Any]] = None,
+    host_config: Optional[Mapping[str, Any]] = None,
+    tmpfs: Optional[Mapping[str, str]] = None,
+    files: Optional[Mapping[str, Union[str, "os.PathLike[str]"]]] = None,
+    build: Optional[Build] = None,
+    resources: Optional[Resources] = None,
+) -> Any:
+    """Create a pytest-asyncio fixture named ``name`` that provides a running :class:`DockerContainer`.
+
+    Takes the options of :func:`.container.container_fixture`, except those for xdist sharing, isolation,
+    snapshots and reuse. ``loop_scope`` is the scope of the event loop the fixture runs in, see pytest-asyncio;
+    the event loop must live at least as long as the fixture. ``depends_on`` may also name synchronous container
+    fixtures.
+    """
+    spec = container_spec(
+        name,
+        image,
+        command=command,
+        environment=environment,
+        ports=ports,
+        depends_on=depends_on,
+        aliases=aliases,
+        scope=scope,
+        startup_timeout=startup_timeout,
+        probes=probes,
+        backoff=backoff,
+        create_kwargs=create_kwargs,
+        host_config=host_config,
+        tmpfs=tmpfs,
+        files=files,
+        build=build,
+        resources=resources,
+    )
+    if ASYNC_REGISTRY.get(spec.name, spec) != spec or spec.name in REGISTRY:
+        raise ValueError(f"container fixture {spec.name!r} is already defined differently")
+    ASYNC_REGISTRY[spec.name] = spec
+
+    async def fixture(request: pytest.FixtureRequest, **dependencies: Any) -> AsyncIterator[DockerContainer]:
+        from .plugin import CURRENT_ITEM
+
+        item = request.config.stash[CURRENT_ITEM]
+        session = get_async_session(request.config)
+        container = await session.acquire(spec, item)
+        yield container
+        await session.release(container, item)
+
+    # The dependencies are arguments rather than requested with getfixturevalue, which cannot set up an asyncio
+    # fixture while the event loop runs.
+    parameters = [inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+    parameters += [inspect.Parameter(dependency, inspect.Parameter.KEYWORD_ONLY) for dependency in spec.depends_on]
+    fixture.__signature__ = inspect.Signature(parameters)  # type: ignore[attr-defined]
+    fixture.__name__ = spec.name
+    fixture.__doc__ = f"Docker container {spec.name!r} from image {spec.image or spec.build!r}, for asyncio tests."
+    return pytest_asyncio.fixture(fixture, scope=spec.scope, loop_scope=loop_scope, name=spec.name)
+
+
+@pytest_asyncio.fixture
+async def docker_async_client(pytestconfig: pytest.Config) -> AsyncIterator[AsyncDockerClient]:
+    """An asyncio Docker client for the test; closed after it."""
+    from .plugin import get_session
+
+    async with AsyncDockerClient(max_connections=get_session(pytestconfig).settings.api_pool_size) as client:
+        yield client
+
+
+@pytest_asyncio.fixture
+async def docker_async_network(pytestconfig: pytest.Config) -> DockerNetwork:
+    """The bridge network shared by all container fixtures, created without blocking the event loop."""
+    from .plugin import get_session
+
+    return await asyncio.to_thread(lambda: get_session(pytestconfig).network)
@@ -0,0 +1,137 @@
+"""Images built from a Dockerfile, cached by content.
+
+The image of a :class:`Build` is tagged with a hash of its build context (honouring ``.dockerignore``), Dockerfile,
+build arguments and target. When an image with that tag exists the build is skipped. The cache keeps the most
+recently used images; older ones are removed at the end of the session. When they were last used is kept in the
+pytest cache, so eviction is least recently used across sessions.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Mapping, Optional, Union
+
+import pytest
+
+from .container import ContainerSpec
+from .files import hash_files
+
+if TYPE_CHECKING:
+    import docker
+
+REPOSITORY = "pytest-dnf-build"
+CACHE_KEY = "docker_network_fixtures/builds"
+
+
+class ImageBuildError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Build:
+    """Build the image of a container fixture from ``dockerfile`` in ``context``."""
+
+    context: Union[str, "os.PathLike[str]"]
+    dockerfile: str = "Dockerfile"
+    args: Mapping[str, str] = field(default_factory=dict)
+    target: Optional[str] = None
+
+
+def build_key(build: Build) -> str:
+    """Hash of everything that goes into the build: the files of the context, build arguments and target."""
+    from docker.utils.build import exclude_paths
+
+    root = Path(build.context)
+    ignore = root / ".dockerignore"
+    lines = ignore.read_text().splitlines() if ignore.exists() else []
+    patterns = [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    digest = hashlib.sha256()
+    options = {"args": dict(build.args), "target": build.target, "dockerfile": build.dockerfile}
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    # exclude_paths gives the files docker sends as build context; the Dockerfile is always among them.
+    hash_files(digest, ((name, root / name) for name in sorted(exclude_paths(str(root), patterns, build.dockerfile))))
+    return digest.hexdigest()
+
+
+class BuildCache:
+    def __init__(
+        self, client: Callable[[], docker.DockerClient], cache: Optional[pytest.Cache], max_images: int
+    ) -> None:
+        self._client = client
+        self._cache = cache
+        self._max_images = max_images
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._used: Dict[str, float] = {}
+        # The tags by fixture name: the context is hashed once per session.
+        self._tags: Dict[str, str] = {}
+
+    def image(self, spec: ContainerSpec) -> str:
+        """The tag of the image of ``spec``, built when there is no image for the current content yet."""
+        from docker.errors import ImageNotFound
+
+        assert spec.build is not None
+        with self._lock:
+            tag = self._tags.get(spec.name)
+        if tag is None:
+            tag = f"{REPOSITORY}:{spec.name}-{build_key(spec.build)[:24]}"
+        with self._lock:
+            tag = self._tags.setdefault(spec.name, tag)
+            lock = self._locks.setdefault(tag, threading.Lock())
+        with lock:
+            if tag not in self._used:
+                try:
+                    self._client().api.inspect_image(tag)
+                except ImageNotFound:
+                    self._build(spec.build, tag)
+            self._used[tag] = time.time()
+        return tag
+
+    def _build(self, build: Build, tag: str) -> None:
+        events = self._client().api.build(
+            path=str(build.context),
+            dockerfile=build.dockerfile,
+            tag=tag,
+            buildargs=dict(build.args) or None,
+            target=build.target,
+            rm=True,
+            decode=True,
+        )
+        for event in events:
+            if "error" in event:
+                raise ImageBuildError(f"building {tag}: {event['error']}")
+
+    @property
+    def used(self) -> Dict[str, float]:
+        """When this process last used the images, by tag."""
+        return dict(self._used)
+
+    def evict(self, used: Optional[Mapping[str, float]] = None) -> None:
+        """Remove the least recently used cached images beyond the limit.
+
+        ``used`` is when the session used the images, by tag: of all pytest-xdist workers, by the last one to
+        finish. By default those this process used.
+        """
+        used = self._used if used is None else used
+        if self._cache is None or not used:
+            return
+        from docker.errors import APIError
+
+        used = {**self._cache.get(CACHE_KEY, {}), **used}
+        images = self._client().api.images(name=REPOSITORY)
+        tags = {tag for image in images for tag in image.get("RepoTags") or [] if tag.startswith(f"{REPOSITORY}:")}
+        # Images the index does not know are the oldest.
+        by_age = sorted(tags, key=lambda tag: used.get(tag, 0.0), reverse=True)
+        for tag in by_age[self._max_images:]:
+            try:
+                self._client().api.remove_image(tag)
+            except APIError:
+                # In use by a container, or removed concurrently; tried again next session.
+                continue
+            tags.discard(tag)
+        self._cache.set(CACHE_KEY, {tag: last_used for tag, last_used in used.items() if tag in tags})
@@ -0,0 +1,153 @@
+"""The Docker API client shared by everything in the process, and the metrics of the calls made through it.
+
+All fixture operations go through one ``docker.DockerClient``: its HTTP connection pool keeps connections to the
+daemon alive between calls and is safe to use from the threads that start containers concurrently. Every response
+is recorded per endpoint, and per container fixture that caused it, see :func:`attribute`.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import docker
+import requests
+from docker.transport import UnixHTTPAdapter
+
+DEFAULT_POOL_SIZE = 32
+
+_VERSION = re.compile(r"^/v[0-9.]+(?=/)")
+_COLLECTIONS = ("containers", "networks", "exec", "volumes", "plugins", "distribution")
+_ACTIONS = frozenset(("create", "json", "prune", "load", "search", "build"))
+
+
+def endpoint(method: str, url: str) -> str:
+    """Normalize a request to its endpoint, e.g. ``GET /containers/{id}/json``."""
+    path = _VERSION.sub("", urlparse(url).path)
+    parts = path.strip("/").split("/")
+    if parts[0] == "images" and len(parts) > 2:
+        # Image names contain slashes: everything between the collection and the action is the name.
+        parts = ["images", "{name}", parts[-1]]
+    elif parts[0] in _COLLECTIONS and len(parts) > 1 and parts[1] not in _ACTIONS:
+        parts[1] = "{id}"
+    return f"{method} /{'/'.join(parts)}"
+
+
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class ApiMetrics:
+    """Call counts and latencies (time until the response headers arrived) by fixture and endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stats: Dict[Tuple[str, str], EndpointStats] = {}
+
+    def record(self, fixture: str, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.stats.setdefault((fixture, endpoint), EndpointStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"fixture": fixture, "endpoint": endpoint, **asdict(stats)}
+                for (fixture, endpoint), stats in self.stats.items()
+            ]
+
+    def merge(self, data: List[Dict[str, Any]]) -> None:
+        """Add the metrics from :meth:`to_json` of another process, i.e. a pytest-xdist worker."""
+        with self._lock:
+            for record in data:
+                stats = self.stats.setdefault((record["fixture"], record["endpoint"]), EndpointStats())
+                stats.calls += record["calls"]
+                stats.seconds += record["seconds"]
+                stats.max_seconds = max(stats.max_seconds, record["max_seconds"])
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(stats.calls for stats in self.stats.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+
+metrics = ApiMetrics()
+
+_attribution = threading.local()
+
+
+def current_attribution() -> str:
+    """The container fixture API calls made by this thread are recorded for; ``"-"`` when none."""
+    return getattr(_attribution, "fixture", "-")
+
+
+@contextmanager
+def attribute(fixture: str) -> Iterator[None]:
+    """Record the API calls made by this thread in the block for the container fixture ``fixture``."""
+    previous = current_attribution()
+    _attribution.fixture = fixture
+    try:
+        yield
+    finally:
+        _attribution.fixture = previous
+
+
+def _record(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+    metrics.record(
+        current_attribution(),
+        endpoint(response.request.method or "", response.request.url or ""),
+        response.elapsed.total_seconds(),
+    )
+
+
+def _share_connection_pool(client: docker.DockerClient) -> None:
+    """Send every request over a Unix socket through one connection pool.
+
+    docker-py keeps a pool per request URL there, so the first call for every container or network, and every
+    call once more than a few URLs were used, opens a new connection to the daemon.
+    """
+    adapter = getattr(client.api, "_custom_adapter", None)
+    if isinstance(adapter, UnixHTTPAdapter):
+        get_connection = adapter.get_connection
+        adapter.get_connection = lambda url, proxies=None: get_connection("http+docker://localhost", proxies)
+
+
+_lock = threading.Lock()
+_client: Optional[docker.DockerClient] = None
+
+
+def get_client(max_pool_size: int = DEFAULT_POOL_SIZE) -> docker.DockerClient:
+    """The client of this process, created from the environment on first use.
+
+    ``max_pool_size`` is the number of connections kept alive; it only applies to the first call.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = docker.from_env(max_pool_size=max_pool_size)
+            _client.api.hooks["response"].append(_record)
+            _share_connection_pool(_client)
+        return _client
+
+
+def close_client() -> None:
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
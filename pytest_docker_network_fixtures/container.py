@@ -0,0 +1,419 @@
+"""Container fixtures: the specification, the running container and the fixture factory.
+
+Conftest files import this module on every pytest run, also when no container is used; the Docker SDK is
+imported only where it is needed.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Mapping, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+import pytest
+
+from .network import DockerNetwork
+from .timing import timings
+
+if TYPE_CHECKING:
+    import docker
+
+    from .build import Build
+    from .readiness import Backoff, Probe, Readiness
+    from .resources import Resources
+    from .snapshot import Snapshot
+
+SCOPES = ("session", "package", "module", "class", "function")
+
+#: All container specifications by fixture name, filled by :func:`container_fixture`.
+REGISTRY: Dict[str, "ContainerSpec"] = {}
+#: The specifications of the asyncio container fixtures, filled by :func:`.aio.async_container_fixture`.
+ASYNC_REGISTRY: Dict[str, "ContainerSpec"] = {}
+
+
+class ContainerStartError(Exception):
+    """A container exited or became unhealthy before it was ready."""
+
+
+@dataclass(frozen=True)
+class ContainerSpec:
+    """Describes a container fixture.
+
+    ``name`` is both the fixture name and the alias of the container on the session network.
+    The container runs ``image``, or, with a ``build``, an image built from a Dockerfile, see :mod:`.build`.
+    ``tmpfs`` mounts directories in memory, by path; the value is the size (``"512m"``) or tmpfs mount options
+    (``"size=512m,uid=999"``). ``files`` are copied into the container before it starts: the value, a file or the
+    content of a directory on the host, into the directory of the key, see :mod:`.files`.
+    ``depends_on`` names other container fixtures that must be ready before this container starts.
+    The container is ready when all ``probes`` pass, polled with ``backoff``; by default when it runs and,
+    when the image defines a HEALTHCHECK, is healthy.
+    A ``shared`` container is started once for all pytest-xdist workers of a test run. An ``isolated``
+    (function scoped) container is not on the session network, but on a network of the test, leased from
+    a pool, see :mod:`.network_pool`.
+    With a ``pool_size`` the fixture hands out containers from a pool of pre-started containers,
+    see :mod:`.pool`. With a ``snapshot`` the container is seeded once and later containers start from a
+    snapshot of the seeded container, see :mod:`.snapshot`.
+    The ``resources`` the container needs count against the budget of the host, see :mod:`.admission`.
+    """
+
+    name: str
+    image: str
+    command: Optional[Union[str, Sequence[str]]] = None
+    environment: Mapping[str, str] = field(default_factory=dict)
+    ports: Mapping[Union[int, str], Optional[int]] = field(default_factory=dict)
+    depends_on: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    scope: str = "session"
+    startup_timeout: float = 60.0
+    probes: Tuple["Probe", ...] = ()
+    backoff: Optional["Backoff"] = None
+    create_kwargs: Mapping[str, Any] = field(default_factory=dict)
+    host_config: Mapping[str, Any] = field(default_factory=dict)
+    tmpfs: Mapping[str, str] = field(default_factory=dict)
+    files: Mapping[str, str] = field(default_factory=dict)
+    shared: bool = False
+    isolated: bool = False
+    pool_size: int = 0
+    reset: Optional[Callable[["DockerContainer"], None]] = None
+    snapshot: Optional["Snapshot"] = None
+    build: Optional["Build"] = None
+    resources: Optional["Resources"] = None
+
+    def __post_init__(self) -> None:
+        if bool(self.image) == (self.build is not None):
+            raise ValueError(f"container fixture {self.name!r} needs either an image or a build")
+        if self.scope not in SCOPES:
+            raise ValueError(f"invalid scope {self.scope!r} for container fixture {self.name!r}")
+        if self.shared and self.scope != "session":
+            raise ValueError(f"shared container fixture {self.name!r} must be session scoped")
+        if self.isolated and (self.scope != "function" or self.shared or self.pool_size):
+            raise ValueError(f"isolated container fixture {self.name!r} must be function scoped, not shared or pooled")
+        if self.pool_size and (self.scope != "function" or self.shared):
+            raise ValueError(f"pooled container fixture {self.name!r} must be function scoped and not shared")
+        if self.name in self.depends_on:
+            raise ValueError(f"container fixture {self.name!r} depends on itself")
+
+
+@dataclass(frozen=True)
+class NetworkInfo:
+    """Where a container can be reached: taken once from ``inspect``, not looked up again for every test."""
+
+    ip_address: str
+    """Address of the container on its network."""
+    aliases: Tuple[str, ...]
+    ports: Mapping[str, Tuple[str, int]]
+    """Host and port every published port, like ``"5432/tcp"``, is reachable on from the test process."""
+
+    @classmethod
+    def from_attrs(cls, attrs: Mapping[str, Any], network: DockerNetwork, aliases: Tuple[str, ...]) -> "NetworkInfo":
+        settings = attrs["NetworkSettings"]
+        endpoint = (settings.get("Networks") or {}).get(network.name) or {}
+        ports = {
+            port: (_published_host(bindings[0]["HostIp"]), int(bindings[0]["HostPort"]))
+            for port, bindings in (settings.get("Ports") or {}).items()
+            if bindings
+        }
+        return cls(endpoint.get("IPAddress", ""), tuple(endpoint.get("Aliases") or aliases), ports)
+
+
+@dataclass
+class DockerContainer:
+    """A started container, attached to the session network.
+
+    ``attrs`` is the last ``inspect`` of the container, made when it became ready; the network attributes are
+    derived from it once. Call :meth:`refresh` when the container restarted, which can change its address and
+    published ports.
+    """
+
+    spec: ContainerSpec
+    id: str
+    name: str
+    network: DockerNetwork
+    aliases: Tuple[str, ...] = ()
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    readiness: Optional["Readiness"] = None
+    _network_info: Optional[Tuple[Dict[str, Any], NetworkInfo]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def hostname(self) -> str:
+        """The name other containers on the session network reach this container by."""
+        return self.aliases[0] if self.aliases else self.name
+
+    @property
+    def network_info(self) -> NetworkInfo:
+        # Derived again only when ``attrs`` was replaced by a new inspect.
+        if self._network_info is None or self._network_info[0] is not self.attrs:
+            self._network_info = (self.attrs, NetworkInfo.from_attrs(self.attrs, self.network, self.aliases))
+        return self._network_info[1]
+
+    @property
+    def ip_address(self) -> str:
+        return self.network_info.ip_address
+
+    @property
+    def ports(self) -> Mapping[str, Tuple[str, int]]:
+        return self.network_info.ports
+
+    @property
+    def started_at(self) -> Optional[float]:
+        """When the container last started, in seconds since the epoch on the Docker host; ``None`` if it never did."""
+        match = re.match(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?Z", self.attrs["State"].get("StartedAt") or "")
+        if match is None or match.group(1).startswith("0001-"):
+            return None
+        started = datetime.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+        return started.timestamp() + float(match.group(2) or 0)
+
+    def address(self, port: Union[int, str]) -> Tuple[str, int]:
+        """Host and port on which the test process reaches ``port`` of the container.
+
+        That is the published port when there is one, else the address of the container on the session network.
+        """
+        key = str(port) if "/" in str(port) else f"{port}/tcp"
+        info = self.network_info
+        return info.ports.get(key) or (info.ip_address, int(key.split("/")[0]))
+
+    def inject_files(self, client: docker.DockerClient, source: Union[str, "os.PathLike[str]"], target: str) -> None:
+        """Copy ``source``, a file or the content of a directory, into the directory ``target``, in one call."""
+        from .files import inject
+
+        inject(client, self.id, source, target)
+
+    def refresh(self, client: docker.DockerClient) -> None:
+        """Inspect the container again, e.g. after a restart."""
+        self.attrs = client.api.inspect_container(self.id)
+
+    def restart(self, client: docker.DockerClient, timeout: int = 10) -> None:
+        """Restart the container and wait until it is ready again, which refreshes its network attributes."""
+        from .readiness import wait_until_ready
+
+        client.api.restart(self.id, timeout=timeout)
+        wait_until_ready(client, self)
+
+
+def _published_host(host_ip: str) -> str:
+    if host_ip not in ("", "0.0.0.0", "::"):
+        return host_ip
+    # Published on all interfaces: of the Docker host, which is this machine unless DOCKER_HOST is remote.
+    docker_host = urlparse(os.environ.get("DOCKER_HOST", ""))
+    if docker_host.scheme in ("tcp", "http", "https") and docker_host.hostname:
+        return docker_host.hostname
+    return "127.0.0.1"
+
+
+def create_container(
+    client: docker.DockerClient,
+    spec: ContainerSpec,
+    network: DockerNetwork,
+    aliases: Optional[Sequence[str]] = None,
+    image: Optional[str] = None,
+    labels: Optional[Mapping[str, str]] = None,
+) -> DockerContainer:
+    """Create and start a container for ``spec``.
+
+    The container gets the fixture name and the ``aliases`` of the spec as network aliases, unless
+    ``aliases`` is given. ``image`` replaces the image of the spec, e.g. by a snapshot. ``labels`` are
+    added to the labels in the ``create_kwargs`` of the spec.
+    """
+    api = client.api
+    name = container_name(spec, network)
+    aliases = (spec.name, *spec.aliases) if aliases is None else tuple(aliases)
+    host_config = api.create_host_config(**host_config_options(spec, network))
+    networking_config = api.create_networking_config(
+        {network.name: api.create_endpoint_config(aliases=list(aliases))}
+    )
+    create_kwargs = create_options(spec, labels)
+    start = time.monotonic()
+    response = api.create_container(
+        image or spec.image,
+        command=spec.command,
+        name=name,
+        environment=dict(spec.environment),
+        ports=list(spec.ports),
+        host_config=host_config,
+        networking_config=networking_config,
+        **create_kwargs,
+    )
+    container = DockerContainer(spec=spec, id=response["Id"], name=name, network=network, aliases=aliases)
+    try:
+        for target, source in spec.files.items():
+            container.inject_files(client, source, target)
+        api.start(container.id)
+    except BaseException:
+        # Nobody else knows the container yet.
+        api.remove_container(container.id, force=True)
+        raise
+    timings.register(container.id, "container", spec.name, name)
+    timings.add(container.id, "create", time.monotonic() - start)
+    return container
+
+
+def container_name(spec: ContainerSpec, network: DockerNetwork) -> str:
+    return f"{network.name}-{spec.name}-{uuid.uuid4().hex[:6]}"
+
+
+def host_config_options(spec: ContainerSpec, network: DockerNetwork) -> Dict[str, Any]:
+    """The ``create_host_config`` arguments for a container of ``spec`` on ``network``."""
+    options = {"network_mode": network.name, **spec.host_config}
+    tmpfs = {**options.pop("tmpfs", {}), **{path: tmpfs_options(value) for path, value in spec.tmpfs.items()}}
+    return {"port_bindings": dict(spec.ports) or None, "tmpfs": tmpfs or None, **options}
+
+
+def create_options(spec: ContainerSpec, labels: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """The ``create_kwargs`` of ``spec`` with ``labels`` added."""
+    create_kwargs = dict(spec.create_kwargs)
+    create_kwargs["labels"] = {**create_kwargs.get("labels", {}), **(labels or {})}
+    return create_kwargs
+
+
+def tmpfs_options(value: str) -> str:
+    """Mount options for a tmpfs given as size (``"512m"``) or as options (``"size=512m,mode=1777"``)."""
+    return value if "=" in value else f"size={value}"
+
+
+def remove_container(client: docker.DockerClient, container: DockerContainer) -> None:
+    from docker.errors import NotFound
+
+    try:
+        with timings.phase(container.id, "remove"):
+            client.api.remove_container(container.id, force=True, v=True)
+    except NotFound:
+        pass
+
+
+def scope_key(item: pytest.Item, scope: str) -> str:
+    """Identify the scope instance a container of the given scope belongs to, for the given test."""
+    if scope == "session":
+        return ""
+    if scope == "function":
+        return item.nodeid
+    node_type = {"package": pytest.Package, "module": pytest.Module, "class": pytest.Class}[scope]
+    node = item.getparent(node_type)
+    if node is None:
+        # Same fallbacks as pytest: a package fixture outside a package is session scoped,
+        # a class fixture outside a class is function scoped.
+        return item.nodeid if scope == "class" else ""
+    return node.nodeid
+
+
+def container_fixture(
+    name: str,
+    image: Optional[str] = None,
+    *,
+    command: Optional[Union[str, Sequence[str]]] = None,
+    environment: Optional[Mapping[str, str]] = None,
+    ports: Optional[Mapping[Union[int, str], Optional[int]]] = None,
+    depends_on: Sequence[str] = (),
+    aliases: Sequence[str] = (),
+    scope: str = "session",
+    startup_timeout: float = 60.0,
+    probes: Sequence["Probe"] = (),
+    backoff: Optional["Backoff"] = None,
+    create_kwargs: Optional[Mapping[str, Any]] = None,
+    host_config: Optional[Mapping[str, Any]] = None,
+    tmpfs: Optional[Mapping[str, str]] = None,
+    files: Optional[Mapping[str, Union[str, "os.PathLike[str]"]]] = None,
+    shared: bool = False,
+    isolated: bool = False,
+    snapshot: Optional["Snapshot"] = None,
+    build: Optional["Build"] = None,
+    resources: Optional["Resources"] = None,
+) -> Any:
+    """Create a pytest fixture named ``name`` that provides a running :class:`DockerContainer`.
+
+    Assign the result to a name in a ``conftest.py`` or test module::
+
+        postgres = container_fixture("postgres", "postgres:16", environment={"POSTGRES_PASSWORD": "test"})
+        app = container_fixture("app", "my/app", depends_on=["postgres"], ports={8080: None})
+
+    All container fixtures a test uses are started concurrently; a container only starts once the
+    containers in its ``depends_on`` are ready.
+
+    With ``shared=True`` the first pytest-xdist worker that needs the container starts it and the other
+    workers attach to it.
+
+    An ``isolated`` container is started on a bridge network of its own for each test, shared only with the
+    other isolated containers of the test; use it to partition services in chaos tests.
+
+    ``files`` maps directories in the container to files or directories on the host that are copied into them
+    before the container starts, e.g. ``{"/docker-entrypoint-initdb.d": "tests/sql"}``.
+
+    Instead of an ``image``, a fixture can have a ``build``: the image is built from a Dockerfile once, and
+    only built again when the build context changes.
+
+    With a ``snapshot`` the first container is seeded and committed to an image; later containers, also in
+    later sessions, start from that image until the seed inputs change.
+
+    With a memory or CPU budget for the host, the container only starts once the ``resources`` it declares fit in
+    the budget, see :mod:`.admission`.
+    """
+    spec = container_spec(
+        name,
+        image,
+        command=command,
+        environment=environment,
+        ports=ports,
+        depends_on=depends_on,
+        aliases=aliases,
+        scope=scope,
+        startup_timeout=startup_timeout,
+        probes=probes,
+        backoff=backoff,
+        create_kwargs=create_kwargs,
+        host_config=host_config,
+        tmpfs=tmpfs,
+        files=files,
+        shared=shared,
+        isolated=isolated,
+        snapshot=snapshot,
+        build=build,
+        resources=resources,
+    )
+    return register(spec)
+
+
+def container_spec(name: str, image: Optional[str] = None, **options: Any) -> ContainerSpec:
+    """The specification of the container fixture ``name``, from the options of :func:`container_fixture`.
+
+    Mappings may be ``None``, sequences any iterable, and the sources of ``files`` path-like.
+    """
+    for key in ("environment", "ports", "create_kwargs", "host_config", "tmpfs"):
+        options[key] = dict(options.get(key) or {})
+    for key in ("depends_on", "aliases", "probes"):
+        options[key] = tuple(options.get(key) or ())
+    options["files"] = {target: os.fspath(source) for target, source in (options.get("files") or {}).items()}
+    return ContainerSpec(name=name, image=image or "", **options)
+
+
+def register(spec: ContainerSpec) -> Any:
+    """Register the specification and return the fixture for it."""
+    if REGISTRY.get(spec.name, spec) != spec or spec.name in ASYNC_REGISTRY:
+        # Container fixture names double as host names on the shared network, so they must be unique.
+        raise ValueError(f"container fixture {spec.name!r} is already defined differently")
+    REGISTRY[spec.name] = spec
+
+    def fixture(request: pytest.FixtureRequest) -> Iterator[DockerContainer]:
+        from .plugin import get_session
+
+        for dependency in spec.depends_on:
+            # Requesting the dependencies lets pytest tear them down after this container.
+            request.getfixturevalue(dependency)
+        session = get_session(request.config)
+        if spec.pool_size:
+            pool = session.pool(spec)
+            container = pool.acquire()
+            yield container
+            pool.release(container)
+            return
+        container = session.acquire(spec)
+        yield container
+        session.release(container)
+
+    fixture.__name__ = spec.name
+    fixture.__doc__ = f"Docker container {spec.name!r} from image {spec.image or spec.build!r}."
+    return pytest.fixture(scope=spec.scope, name=spec.name)(fixture)
@@ -0,0 +1,119 @@
+"""One Docker ``/events`` subscription per session, waking whoever waits for a state change of a container.
+
+Instead of inspecting every starting container in a loop, waiters block until the daemon reports an event for their
+container: it started, died, or its health status changed. The stream is filtered by the session label, see
+:mod:`.teardown`, so it only carries events of the containers of the session.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, DefaultDict, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import docker
+
+Listener = Callable[[str, str], None]
+
+#: The actions of the events that change the state of a container. Others, like the ``exec_create``, ``exec_start``
+#: and ``exec_die`` of every health check run or exec probe, or the ``extract-to-dir`` of a copied file, wake nobody.
+STATE_ACTIONS = frozenset(
+    {"start", "restart", "die", "kill", "stop", "oom", "pause", "unpause", "destroy", "health_status"}
+)
+
+
+class ContainerEvents:
+    """Follows the container events matching ``filters`` in a background thread.
+
+    Every container has a count of the events seen for it. A waiter reads the count, inspects the container, and,
+    when it must wait, passes the count to :meth:`wait` (or :meth:`wait_async`), which returns as soon as the count
+    changed: events between the inspect and the wait are not missed. Only events with one of the :data:`STATE_ACTIONS`
+    count. ``listener`` is called, in the thread, with the container id and the action of every such event. Once the
+    stream ended, ``closed`` is set and waits return at once: waiters have to poll again.
+    """
+
+    def __init__(
+        self, client: docker.DockerClient, filters: Dict[str, Any], listener: Optional[Listener] = None
+    ) -> None:
+        self._listener = listener
+        self._condition = threading.Condition()
+        self._counts: DefaultDict[str, int] = defaultdict(int)
+        self._waiters: DefaultDict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = defaultdict(list)
+        self.closed = False
+        # Subscribed before any container of the session is created, so that no event is missed.
+        self._stream = client.api.events(decode=True, filters={"type": ["container"], **filters})
+        self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for event in self._stream:
+                container_id = event.get("id") or event.get("Actor", {}).get("ID", "")
+                action = event.get("Action") or event.get("status", "")
+                # The action of a health status change carries the status: "health_status: healthy".
+                if action.split(":")[0] not in STATE_ACTIONS:
+                    continue
+                with self._condition:
+                    self._counts[container_id] += 1
+                    waiters = self._waiters.pop(container_id, [])
+                    self._condition.notify_all()
+                for loop, future in waiters:
+                    _wake(loop, future)
+                if self._listener is not None:
+                    self._listener(container_id, action)
+        except Exception:
+            # The stream ends when it is closed, or the daemon went away; waiters fall back to polling.
+            pass
+        finally:
+            with self._condition:
+                self.closed = True
+                waiters = [waiter for waiting in self._waiters.values() for waiter in waiting]
+                self._waiters.clear()
+                self._condition.notify_all()
+            for loop, future in waiters:
+                _wake(loop, future)
+
+    def count(self, container_id: str) -> int:
+        with self._condition:
+            return self._counts[container_id]
+
+    def wait(self, container_id: str, seen: int, timeout: float) -> None:
+        """Wait until there are more than ``seen`` events for the container, at most ``timeout`` seconds."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._counts[container_id] != seen or self.closed, timeout)
+
+    async def wait_async(self, container_id: str, seen: int, timeout: float) -> None:
+        """Like :meth:`wait`, without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._condition:
+            if self._counts[container_id] != seen or self.closed:
+                return
+            self._waiters[container_id].append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._condition:
+                if (loop, future) in self._waiters.get(container_id, []):
+                    self._waiters[container_id].remove((loop, future))
+
+    def forget(self, container_id: str) -> None:
+        with self._condition:
+            self._counts.pop(container_id, None)
+
+    def close(self) -> None:
+        self._stream.close()
+        self._thread.join(timeout=5)
+
+
+def _wake(loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> None:
+    def resolve() -> None:
+        if not future.done():
+            future.set_result(None)
+
+    try:
+        loop.call_soon_threadsafe(resolve)
+    except RuntimeError:
+        # The event loop is closed; nobody waits any more.
+        pass
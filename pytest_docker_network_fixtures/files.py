@@ -0,0 +1,163 @@
+"""Copying files and directories into containers as tar archives, cached by content.
+
+A source, a file or a directory, is packed into a tar archive once, named after a hash of its content, and copied
+into a container with a single ``put_archive`` call: a directory is one call, not one per file. The archive is
+written to the temporary directory and sent from there in chunks, so large fixture data is never held in memory.
+Later copies of the same content, also by other pytest-xdist workers and sessions, reuse the archive. The content
+of a source is only hashed again when the size or modification time of one of its files changed. Archives not used
+for a day are removed when a session that used archives finishes.
+
+The hash of the content also identifies the seed inputs of snapshots and the build contexts of images, see
+:mod:`.snapshot` and :mod:`.build`.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import stat
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+
+from .paths import STATE_DIRECTORY
+
+if TYPE_CHECKING:
+    import docker
+
+Source = Union[str, "os.PathLike[str]"]
+
+DIRECTORY = STATE_DIRECTORY / "archives"
+#: Bytes read from an archive, and sent to the daemon, at a time.
+CHUNK_SIZE = 1 << 20
+#: Seconds an archive is kept after it was last used.
+MAX_AGE = 24 * 60 * 60
+
+_lock = threading.Lock()
+#: The last content key of every source, with the sizes and modification times it was computed for.
+_keys: Dict[str, Tuple[Tuple[Tuple[str, int, int, int], ...], str]] = {}
+
+
+def _members(source: Path) -> List[Tuple[str, Path]]:
+    """The members of the archive of ``source`` by name: the file itself, or what the directory contains."""
+    if not source.is_dir():
+        return [(source.name, source)]
+    members = []
+    for root, directories, files in os.walk(source):
+        directories.sort()
+        for name in sorted([*directories, *files]):
+            path = Path(root, name)
+            members.append((path.relative_to(source).as_posix(), path))
+    return members
+
+
+def hash_files(digest: "hashlib._Hash", members: Iterable[Tuple[str, Path]]) -> None:
+    """Add the names, modes and contents of the files ``members``, pairs of a name and a path, to ``digest``."""
+    for name, member in members:
+        info = os.lstat(member)
+        digest.update(f"\0{name}\0{info.st_mode:o}\0".encode())
+        if stat.S_ISLNK(info.st_mode):
+            digest.update(os.readlink(member).encode())
+        elif stat.S_ISREG(info.st_mode):
+            with open(member, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+
+
+def content_key(source: Source) -> str:
+    """Hash of the names, modes and contents of the files of ``source``."""
+    path = Path(source)
+    members = _members(path)
+    infos = [os.lstat(member) for _, member in members]
+    signature = tuple((name, info.st_mode, info.st_size, info.st_mtime_ns) for (name, _), info in zip(members, infos))
+    with _lock:
+        known = _keys.get(str(path.resolve()))
+    if known is not None and known[0] == signature:
+        return known[1]
+    digest = hashlib.sha256()
+    hash_files(digest, members)
+    key = digest.hexdigest()
+    with _lock:
+        _keys[str(path.resolve())] = (signature, key)
+    return key
+
+
+def files_configuration(files: Mapping[str, Source]) -> Dict[str, Any]:
+    """The content keys of the ``files`` of a container fixture, for the hash of its configuration.
+
+    Empty without files, so that hashes of fixtures without files stayed the same when files were added: the tags of
+    their snapshots, and the configuration their kept containers are reused by.
+    """
+    return {"files": {target: content_key(source) for target, source in files.items()}} if files else {}
+
+
+def _owned_by_root(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    # Like docker cp: the files belong to root in the container, whoever owns them on the host.
+    info.uid = info.gid = 0
+    info.uname = info.gname = "root"
+    return info
+
+
+class ArchiveCache:
+    """The tar archives of sources, by content key, as files in ``directory``.
+
+    The modification time of an archive is when it was last used.
+    """
+
+    def __init__(self, directory: Path = DIRECTORY) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._used = False
+
+    def archive(self, source: Source) -> Path:
+        """The archive of the current content of ``source``; created when there is none yet."""
+        key = content_key(source)
+        path = self.directory / f"{key}.tar"
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+            self._used = True
+        with lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                # Another process may create the same archive: both write a file of their own and rename it.
+                tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                with tarfile.open(tmp, "w") as archive:
+                    for name, member in _members(Path(source)):
+                        archive.add(member, arcname=name, recursive=False, filter=_owned_by_root)
+                os.replace(tmp, path)
+        return path
+
+    def evict(self, max_age: float = MAX_AGE) -> None:
+        """Remove the archives of all processes not used for ``max_age`` seconds, when this process used any."""
+        if not self._used:
+            return
+        oldest = time.time() - max_age
+        # Also what processes that were killed while writing an archive left.
+        for path in self.directory.glob("*"):
+            try:
+                if path.stat().st_mtime < oldest:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+#: The archives of this process.
+archives = ArchiveCache()
+
+
+def chunks(path: Path) -> Iterator[bytes]:
+    """The content of the file, read in chunks while it is sent."""
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+
+def inject(client: docker.DockerClient, container_id: str, source: Source, target: str) -> None:
+    """Copy ``source``, a file or the content of a directory, into the directory ``target`` of the container.
+
+    ``target`` must exist in the container. The container does not have to run.
+    """
+    client.api.put_archive(container_id, target, chunks(archives.archive(source)))
@@ -0,0 +1,93 @@
+"""Pulling the images of container fixtures before the tests need them."""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Set
+
+import docker
+
+from .client import attribute
+
+#: What API calls for pulling images are recorded for, see :mod:`.client`.
+IMAGES = "<images>"
+
+_DEFAULT_PREFIXES = ("docker.io/library/", "index.docker.io/library/", "docker.io/", "index.docker.io/", "library/")
+
+
+class ImagePullError(Exception):
+    pass
+
+
+def normalize(reference: str) -> str:
+    """The canonical form of an image reference, e.g. ``postgres:latest`` for ``docker.io/library/postgres``.
+
+    References with a digest are identified by name and digest only.
+    """
+    name, _, digest = reference.partition("@")
+    for prefix in _DEFAULT_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    # A colon in the last path segment separates the tag; one before it belongs to a registry host:port.
+    repository, tag = name.rsplit(":", 1) if ":" in name.rsplit("/", 1)[-1] else (name, "latest")
+    return f"{repository}@{digest}" if digest else f"{repository}:{tag}"
+
+
+class ImagePuller:
+    """Pulls images concurrently, every image at most once, skipping images that are already present."""
+
+    def __init__(self, client: Callable[[], docker.DockerClient], max_workers: int) -> None:
+        self._client = client
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="docker-pull")
+        self._lock = threading.Lock()
+        self._pulls: Dict[str, "Future[None]"] = {}
+
+    def present(self) -> Set[str]:
+        """The normalized references of all local images, from a single ``images/json`` call."""
+        with attribute(IMAGES):
+            images = self._client().api.images()
+        return {
+            normalize(reference)
+            for image in images
+            for reference in (image.get("RepoTags") or []) + (image.get("RepoDigests") or [])
+        }
+
+    def prepull(self, images: Iterable[str]) -> None:
+        """Start pulling all ``images`` that are not present yet, without waiting for them."""
+        missing = {normalize(image): image for image in images}
+        if not missing:
+            return
+        for reference in self.present():
+            missing.pop(reference, None)
+        for image in missing.values():
+            self._submit(image)
+
+    def pull(self, image: str) -> None:
+        """Pull ``image``, or wait for the pull of it that is already going on."""
+        self._submit(image).result()
+
+    def wait(self, image: str) -> None:
+        """Wait for a pull of ``image`` that was started before, if any."""
+        with self._lock:
+            future = self._pulls.get(normalize(image))
+        if future is not None:
+            future.result()
+
+    def _submit(self, image: str) -> "Future[None]":
+        key = normalize(image)
+        with self._lock:
+            future = self._pulls.get(key)
+            # A failed pull is tried again.
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._pulls[key] = self._executor.submit(self._pull, image)
+            return future
+
+    def _pull(self, image: str) -> None:
+        with attribute(IMAGES):
+            for event in self._client().api.pull(image, stream=True, decode=True):
+                if "error" in event:
+                    raise ImagePullError(f"pulling {image}: {event['error']}")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
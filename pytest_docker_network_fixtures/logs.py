@@ -0,0 +1,86 @@
+"""Incremental reading of container output from a single streaming ``logs?follow=1`` request."""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Iterator, Optional, Pattern
+
+import docker
+import requests
+
+from .client import attribute, current_attribution
+
+#: Longest line kept; longer lines are split, so a container that never writes a newline cannot exhaust memory.
+MAX_LINE = 64 * 1024
+
+
+def follow_lines(client: docker.DockerClient, container_id: str, since: Optional[float] = None) -> Iterator[str]:
+    """Yield the output lines of a container as they are written, until the container stops.
+
+    Only lines written at or after ``since``, in seconds since the epoch, are read: after a restart the output of
+    the earlier run is still in the log. Closing the generator closes the stream.
+    """
+    stream = client.api.logs(container_id, stdout=True, stderr=True, stream=True, follow=True, since=since)
+    pending = b""
+    try:
+        for chunk in stream:
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            while len(pending) > MAX_LINE:
+                lines.append(pending[:MAX_LINE])
+                pending = pending[MAX_LINE:]
+            for line in lines:
+                yield line.decode("utf-8", "replace")
+        if pending:
+            yield pending.decode("utf-8", "replace")
+    finally:
+        stream.close()
+
+
+class LogWatcher:
+    """Follows the output of a container, from ``since``, in a background thread until ``pattern`` matched
+    ``occurrences`` times.
+
+    The stream is closed the moment the pattern matches. ``finished`` is set once the watcher stopped, matched or
+    not. The last ``tail_lines`` lines are kept in ``tail``, to explain a container that never became ready.
+    """
+
+    def __init__(
+        self,
+        client: docker.DockerClient,
+        container_id: str,
+        pattern: Pattern[str],
+        occurrences: int = 1,
+        tail_lines: int = 100,
+        since: Optional[float] = None,
+    ) -> None:
+        self.pattern = pattern
+        self.occurrences = occurrences
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.matched = threading.Event()
+        self.finished = threading.Event()
+        self._lines = follow_lines(client, container_id, since)
+        self._attribution = current_attribution()
+        self._thread = threading.Thread(target=self._run, name=f"logs-{container_id[:12]}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        with attribute(self._attribution):
+            self._follow()
+
+    def _follow(self) -> None:
+        count = 0
+        try:
+            for line in self._lines:
+                self.tail.append(line)
+                if self.pattern.search(line):
+                    count += 1
+                    if count >= self.occurrences:
+                        self.matched.set()
+                        return
+        except (docker.errors.APIError, requests.exceptions.RequestException):
+            # The container is gone; the readiness check reports that.
+            pass
+        finally:
+            self._lines.close()
+            self.finished.set()
@@ -0,0 +1,52 @@
+"""The bridge network shared by all container fixtures of a test session."""
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .timing import timings
+
+if TYPE_CHECKING:
+    import docker
+
+
+class NetworkLeaseError(Exception):
+    """No network of the pool of per-test networks was released in time, see :mod:`.network_pool`."""
+
+
+@dataclass(frozen=True)
+class DockerNetwork:
+    """A Docker bridge network created by the plugin.
+
+    Container fixtures attach to the network by ``name`` or ``id`` without looking it up again.
+    """
+
+    name: str
+    id: str
+
+
+def random_network_name(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:12]}"
+
+
+def create_network(
+    client: docker.DockerClient, name: str, labels: Optional[Dict[str, str]] = None
+) -> DockerNetwork:
+    start = time.monotonic()
+    # The low level API returns the id directly; ``client.networks.create`` would inspect the network again.
+    response = client.api.create_network(name, driver="bridge", labels=labels or {})
+    timings.register(response["Id"], "network", "", name)
+    timings.add(response["Id"], "create", time.monotonic() - start)
+    return DockerNetwork(name=name, id=response["Id"])
+
+
+def remove_network(client: docker.DockerClient, network: DockerNetwork) -> None:
+    from docker.errors import NotFound
+
+    try:
+        with timings.phase(network.id, "remove"):
+            client.api.remove_network(network.id)
+    except NotFound:
+        pass
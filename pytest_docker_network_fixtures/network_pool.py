@@ -0,0 +1,92 @@
+"""A pool of bridge networks, leased to tests that need a network of their own.
+
+Creating and removing a network for every test is slow. The pool creates its networks once, concurrently, when the
+first one is leased; a released network has all containers disconnected and goes back to the pool.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
+
+from .network import DockerNetwork, NetworkLeaseError, create_network, random_network_name
+
+if TYPE_CHECKING:
+    import docker
+
+#: Seconds :meth:`NetworkPool.lease` waits for a network when all are leased.
+LEASE_TIMEOUT = 60.0
+
+
+class NetworkPool:
+    def __init__(
+        self,
+        client: Callable[[], docker.DockerClient],
+        prefix: str,
+        size: int,
+        labels: Optional[Dict[str, str]] = None,
+        timeout: float = LEASE_TIMEOUT,
+    ) -> None:
+        self._client = client
+        self.timeout = timeout
+        self._labels = labels
+        self._prefix = prefix
+        self._size = max(size, 1)
+        self._lock = threading.Lock()
+        self._networks: List[DockerNetwork] = []
+        self._available: "queue.Queue[DockerNetwork]" = queue.Queue()
+
+    def _fill(self) -> None:
+        with ThreadPoolExecutor(max_workers=self._size, thread_name_prefix="docker-networks") as executor:
+            names = [random_network_name(self._prefix) for _ in range(self._size)]
+            self._networks = list(
+                executor.map(lambda name: create_network(self._client(), name, self._labels), names)
+            )
+        for network in self._networks:
+            self._available.put(network)
+
+    def lease(self) -> DockerNetwork:
+        """Take a network from the pool, waiting at most :attr:`timeout` seconds when all are leased."""
+        with self._lock:
+            if not self._networks:
+                self._fill()
+        try:
+            return self._available.get(timeout=self.timeout)
+        except queue.Empty:
+            raise NetworkLeaseError(
+                f"all {self._size} networks of the pool stayed leased for {self.timeout} seconds; a test that leases "
+                "more networks needs a larger --docker-fixtures-network-pool-size"
+            ) from None
+
+    def release(self, network: DockerNetwork) -> None:
+        """Disconnect all containers from a leased network and return it to the pool.
+
+        When that fails, a new network takes its place; the session removes the old one along with its containers.
+        """
+        try:
+            self.disconnect_all(network)
+        except Exception:
+            network = self._replace(network)
+        finally:
+            self._available.put(network)
+
+    def _replace(self, network: DockerNetwork) -> DockerNetwork:
+        replacement = create_network(self._client(), random_network_name(self._prefix), self._labels)
+        with self._lock:
+            self._networks[self._networks.index(network)] = replacement
+        return replacement
+
+    @contextmanager
+    def leased(self) -> Iterator[DockerNetwork]:
+        network = self.lease()
+        try:
+            yield network
+        finally:
+            self.release(network)
+
+    def disconnect_all(self, network: DockerNetwork) -> None:
+        api = self._client().api
+        for container_id in api.inspect_network(network.id).get("Containers") or {}:
+            api.disconnect_container_from_network(container_id, network.id, force=True)
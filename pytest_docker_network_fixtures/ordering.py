@@ -0,0 +1,71 @@
+"""Reordering the tests so that tests using the same container fixture instances run together.
+
+pytest tears a package, module or class scoped fixture down when the next test belongs to another package, module
+or class, and sets it up again when a later test of the same scope needs it. Tests that are interleaved, e.g. by a
+plugin that shuffles them, therefore start the same containers several times. Session scoped containers live
+through the whole session and function scoped containers through one test, whatever the order, so only the other
+scopes count.
+"""
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, List, Sequence, Set, Tuple
+
+import pytest
+
+from .container import ASYNC_REGISTRY, REGISTRY, scope_key
+
+#: An instance of a container fixture: its name and the scope instance it belongs to, see :func:`.scope_key`.
+Instance = Tuple[str, str]
+
+
+def instances(item: pytest.Item) -> FrozenSet[Instance]:
+    """The package, module and class scoped container fixture instances the test uses, also through ``depends_on``."""
+    specs = {**REGISTRY, **ASYNC_REGISTRY}
+    names: Set[str] = set()
+    pending = [name for name in getattr(item, "fixturenames", ()) if name in specs]
+    while pending:
+        name = pending.pop()
+        if name not in names:
+            names.add(name)
+            pending.extend(dependency for dependency in specs[name].depends_on if dependency in specs)
+    return frozenset(
+        (name, scope_key(item, specs[name].scope))
+        for name in names
+        if specs[name].scope not in ("session", "function")
+    )
+
+
+def lifecycles(items: Sequence[pytest.Item]) -> int:
+    """How many times the containers of scoped container fixtures start when the tests run in this order.
+
+    Like pytest, an instance stays alive until a test outside of its scope runs, also when tests in between do not
+    use it.
+    """
+    specs = {**REGISTRY, **ASYNC_REGISTRY}
+    count = 0
+    alive: Set[Instance] = set()
+    for item in items:
+        alive = {(name, key) for name, key in alive if scope_key(item, specs[name].scope) == key}
+        current = instances(item)
+        count += len(current - alive)
+        alive |= current
+    return count
+
+
+def group(items: Sequence[pytest.Item]) -> List[pytest.Item]:
+    """The tests, with the tests that use the same container fixture instances moved together.
+
+    The groups keep the order of their first test, and the tests in a group keep their order. Only the tests with
+    scoped container fixtures move, among their own positions: the other tests stay where they are.
+    """
+    groups: Dict[FrozenSet[Instance], List[pytest.Item]] = {}
+    positions: List[int] = []
+    for position, item in enumerate(items):
+        used = instances(item)
+        if used:
+            groups.setdefault(used, []).append(item)
+            positions.append(position)
+    grouped = list(items)
+    for position, item in zip(positions, (item for members in groups.values() for item in members)):
+        grouped[position] = item
+    return grouped
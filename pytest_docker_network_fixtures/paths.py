@@ -0,0 +1,9 @@
+"""Where the plugin keeps its files on the host."""
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+#: The files all pytest processes on the host share: the pytest-xdist state, the admission ledger, the ports of the
+#: reapers and the archives of copied files, with the locks that guard them.
+STATE_DIRECTORY = Path(tempfile.gettempdir()) / "pytest-docker-network-fixtures"
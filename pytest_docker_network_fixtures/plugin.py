@@ -0,0 +1,228 @@
+"""pytest plugin entry point, registered through the ``pytest11`` entry point.
+
+pytest imports the plugin on every run, including ``--collect-only`` and IDE test discovery, so this module only
+imports what its hooks need: the Docker SDK and the rest of the plugin are loaded when a fixture first needs them.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+import pytest
+
+from .container import ASYNC_REGISTRY, REGISTRY, scope_key
+from .ordering import group, lifecycles
+from .settings import Settings, add_options
+from .timing import PHASES, timings
+
+if TYPE_CHECKING:
+    import docker
+
+    from .network import DockerNetwork
+    from .network_pool import NetworkPool
+    from .session import DockerFixtureSession
+
+SESSION_KEY = pytest.StashKey["DockerFixtureSession"]()
+CURRENT_ITEM = pytest.StashKey[pytest.Item]()
+#: Container starts of scoped container fixtures before and after grouping the tests.
+LIFECYCLES = pytest.StashKey[Tuple[int, int]]()
+
+#: Keys of the timings, the API metrics and the lifecycles of a pytest-xdist worker in its ``workeroutput``.
+WORKER_TIMINGS = "docker_fixtures_timings"
+WORKER_API_STATS = "docker_fixtures_api_stats"
+WORKER_LIFECYCLES = "docker_fixtures_lifecycles"
+
+
+def get_session(config: pytest.Config) -> DockerFixtureSession:
+    """The Docker resources of the session; created on first use."""
+    session = config.stash.get(SESSION_KEY, None)
+    if session is None:
+        from .session import DockerFixtureSession
+        from .xdist import XdistCoordinator
+
+        session = config.stash[SESSION_KEY] = DockerFixtureSession(
+            Settings.from_config(config),
+            XdistCoordinator.from_environment(),
+            getattr(config, "cache", None),
+            config.rootpath,
+        )
+        session.current_item = config.stash.get(CURRENT_ITEM, None)
+    return session
+
+
+def _existing_session(config: pytest.Config) -> Optional[DockerFixtureSession]:
+    return config.stash.get(SESSION_KEY, None)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    add_options(parser)
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    if config.pluginmanager.hasplugin("asyncio"):
+        # The asyncio fixtures need pytest-asyncio, which then is imported already.
+        from . import aio
+
+        config.pluginmanager.register(aio, "docker-network-fixtures-asyncio")
+
+
+def pytest_sessionstart(session: pytest.Session) -> None:
+    config = session.config
+    # Workers leave it to the controller, which starts before them.
+    if os.environ.get("PYTEST_XDIST_WORKER") or not Settings.from_config(config).cleanup_orphans:
+        return
+    containers, networks = get_session(config).remove_orphans()
+    reporter = config.pluginmanager.get_plugin("terminalreporter")
+    if reporter is not None and (containers or networks):
+        reporter.write_line(
+            f"docker-network-fixtures: removed {containers} orphaned containers and {networks} networks"
+        )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session: pytest.Session, config: pytest.Config, items: list) -> None:
+    # Last, so that the tests are grouped after plugins that shuffle them.
+    if not Settings.from_config(config).group_tests:
+        return
+    before = lifecycles(items)
+    grouped = group(items)
+    after = lifecycles(grouped)
+    if after < before:
+        items[:] = grouped
+    config.stash[LIFECYCLES] = (before, min(before, after))
+
+
+def pytest_collection_finish(session: pytest.Session) -> None:
+    # Nothing is pulled when no test will set up its fixtures.
+    option = session.config.option
+    if option.collectonly or getattr(option, "setupplan", False):
+        return
+    if any(name in REGISTRY or name in ASYNC_REGISTRY for item in session.items for name in item.fixturenames):
+        get_session(session.config).prepull(session.items)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item: pytest.Item) -> None:
+    item.config.stash[CURRENT_ITEM] = item
+    session = _existing_session(item.config)
+    if session is not None:
+        session.current_item = item
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item: pytest.Item):
+    yield
+    session = _existing_session(item.config)
+    if session is not None:
+        session.discard_scope(item.nodeid)
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    docker_session = _existing_session(session.config)
+    if docker_session is None and os.environ.get("PYTEST_XDIST_WORKER"):
+        # Also an xdist worker that used no container must check out: it may be the last one, which removes
+        # what the other workers shared.
+        docker_session = get_session(session.config)
+    if docker_session is not None:
+        docker_session.close()
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        # The controller reports the timings and API metrics of all workers.
+        config.workeroutput[WORKER_TIMINGS] = timings.to_json()
+        if docker_session is not None and docker_session.settings.api_stats:
+            from .client import metrics
+
+            config.workeroutput[WORKER_API_STATS] = metrics.to_json()
+        if LIFECYCLES in config.stash:
+            config.workeroutput[WORKER_LIFECYCLES] = list(config.stash[LIFECYCLES])
+        return
+    path = Settings.from_config(config).timings_json
+    if path:
+        with open(path, "w") as file:
+            json.dump(_timings_report(), file, indent=2)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    output = getattr(node, "workeroutput", {})
+    timings.merge(output.get(WORKER_TIMINGS, {}))
+    if WORKER_API_STATS in output:
+        from .client import metrics
+
+        metrics.merge(output[WORKER_API_STATS])
+    if WORKER_LIFECYCLES in output:
+        # All workers collect, and group, the same tests.
+        node.config.stash[LIFECYCLES] = tuple(output[WORKER_LIFECYCLES])
+
+
+def _timings_report() -> dict:
+    return {"resources": [{**asdict(resource), "seconds": resource.seconds} for resource in timings.slowest()]}
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter, config: pytest.Config) -> None:
+    _report_durations(terminalreporter, Settings.from_config(config).durations)
+    _report_api_stats(terminalreporter, config)
+    if LIFECYCLES in config.stash:
+        before, after = config.stash[LIFECYCLES]
+        terminalreporter.write_line(
+            f"docker-network-fixtures: grouping the tests saved an estimated {before - after} container starts"
+            f" ({before} -> {after})"
+        )
+
+
+def _report_durations(terminalreporter: pytest.TerminalReporter, count: Optional[int]) -> None:
+    if count is None or not timings.resources:
+        return
+    slowest = timings.slowest(count)
+    title = "Docker fixture setup and teardown" if not count else f"slowest {len(slowest)} Docker fixture resources"
+    terminalreporter.write_sep("=", title)
+    terminalreporter.write_line(" ".join(f"{phase + ' s':>9}" for phase in ("total", *PHASES)) + "  resource")
+    for resource in slowest:
+        columns = [resource.seconds, *(resource.phases.get(phase) for phase in PHASES)]
+        name = f"{resource.fixture} / {resource.name}" if resource.fixture else f"{resource.kind} {resource.name}"
+        terminalreporter.write_line(
+            " ".join(f"{'':>9}" if seconds is None else f"{seconds:>9.3f}" for seconds in columns) + f"  {name}"
+        )
+
+
+def _report_api_stats(terminalreporter: pytest.TerminalReporter, config: pytest.Config) -> None:
+    # Under pytest-xdist the controller has no session of its own, but the metrics of the workers.
+    if not Settings.from_config(config).api_stats:
+        return
+    from .client import metrics
+
+    if not metrics.stats:
+        return
+    terminalreporter.write_sep("=", f"Docker API calls: {metrics.total_calls()}")
+    terminalreporter.write_line(f"{'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}  fixture / endpoint")
+    for (fixture, endpoint), stats in sorted(metrics.stats.items(), key=lambda item: -item[1].seconds):
+        terminalreporter.write_line(
+            f"{stats.calls:>7} {stats.seconds:>9.3f} {stats.mean_seconds * 1000:>9.1f} {stats.max_seconds * 1000:>9.1f}"
+            f"  {fixture} / {endpoint}"
+        )
+
+
+@pytest.fixture(scope="session")
+def docker_client(pytestconfig: pytest.Config) -> docker.DockerClient:
+    """The Docker client shared by all fixtures of the session."""
+    return get_session(pytestconfig).client
+
+
+@pytest.fixture(scope="session")
+def docker_network(pytestconfig: pytest.Config) -> DockerNetwork:
+    """The bridge network shared by all container fixtures; created once per session."""
+    return get_session(pytestconfig).network
+
+
+@pytest.fixture(scope="session")
+def docker_network_pool(pytestconfig: pytest.Config) -> NetworkPool:
+    """The pool of bridge networks for tests that need more than one network of their own."""
+    return get_session(pytestconfig).network_pool
+
+
+@pytest.fixture
+def docker_isolated_network(request: pytest.FixtureRequest) -> DockerNetwork:
+    """A bridge network of the test, leased from the pool; the network of its ``isolated`` containers."""
+    return get_session(request.config).isolated_network(scope_key(request.node, "function"))
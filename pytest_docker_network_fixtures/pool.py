@@ -0,0 +1,84 @@
+"""Pools of pre-started containers, handed out one per test.
+
+The pool keeps ``pool_size`` containers starting or ready. A test takes a ready container; when the test
+finishes the container is recycled in the background: by the ``reset`` hook of the fixture when there is
+one, or by replacing it with a new container. Container start time is thus off the critical path of tests.
+"""
+from __future__ import annotations
+
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+
+from .container import ContainerSpec, DockerContainer, container_spec, register
+
+
+class ContainerPool:
+    def __init__(
+        self,
+        spec: ContainerSpec,
+        start: Callable[[], DockerContainer],
+        remove: Callable[[DockerContainer], None],
+    ) -> None:
+        self.spec = spec
+        self._start = start
+        self._remove = remove
+        self._executor = ThreadPoolExecutor(max_workers=spec.pool_size, thread_name_prefix=f"pool-{spec.name}")
+        self._available: "queue.Queue[Future[DockerContainer]]" = queue.Queue()
+        for _ in range(spec.pool_size):
+            self._available.put(self._executor.submit(self._start))
+
+    def acquire(self) -> DockerContainer:
+        """Take the next container from the pool, waiting for it to be ready."""
+        future = self._available.get()
+        try:
+            return future.result()
+        except BaseException:
+            # Keep the pool at its size, also when a start failed.
+            self._available.put(self._executor.submit(self._start))
+            raise
+
+    def release(self, container: DockerContainer) -> None:
+        """Return a container taken from the pool; it is reset or replaced in the background."""
+        try:
+            self._available.put(self._executor.submit(self._recycle, container))
+        except RuntimeError:
+            # The pool is closed.
+            self._remove(container)
+
+    def _recycle(self, container: DockerContainer) -> DockerContainer:
+        if self.spec.reset is not None:
+            try:
+                self.spec.reset(container)
+                return container
+            except Exception:
+                pass
+        self._remove(container)
+        return self._start()
+
+    def close(self) -> None:
+        """Stop recycling; the session removes the containers of the pool."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def pooled_container_fixture(
+    name: str,
+    image: Optional[str] = None,
+    *,
+    size: int = 4,
+    reset: Optional[Callable[[DockerContainer], None]] = None,
+    depends_on: Sequence[str] = (),
+    **options: Any,
+) -> Any:
+    """Create a function scoped fixture that hands out containers from a pool of ``size`` pre-started containers.
+
+    ``reset`` is called in the background with a container a test is done with, to make it ready for the next
+    test; when it is not given, or raises, the container is replaced by a new one. The other ``options`` are
+    those of :func:`~.container.container_fixture`, but pooled containers can only depend on session scoped
+    containers. As the pool holds several containers of the fixture, they are not reachable by the fixture
+    name on the network; use :attr:`~.container.DockerContainer.hostname`.
+    """
+    if size < 1:
+        raise ValueError(f"pool size of container fixture {name!r} must be at least 1")
+    spec = container_spec(name, image, scope="function", depends_on=depends_on, pool_size=size, reset=reset, **options)
+    return register(spec)
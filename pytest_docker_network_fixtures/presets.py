@@ -0,0 +1,91 @@
+"""Settings for common database images, tuned for tests rather than durability.
+
+Every preset returns keyword arguments for :func:`~.container.container_fixture` (or
+:func:`~.pool.pooled_container_fixture`): the image, the environment, a command that turns durability off, the data
+directory on a tmpfs of ``tmpfs_size`` (``None`` keeps it on disk) and a readiness probe::
+
+    postgres = container_fixture("postgres", ports={5432: None}, **presets.postgres(tmpfs_size="1g"))
+
+Data does not survive the container, and on a tmpfs it is not part of snapshots, see :mod:`.snapshot`.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .readiness import ExecProbe
+
+
+def _preset(
+    image: str,
+    data_directory: str,
+    tmpfs_size: Optional[str],
+    command: List[str],
+    probe: ExecProbe,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    return {
+        "image": image,
+        "command": command,
+        "tmpfs": {data_directory: tmpfs_size} if tmpfs_size else {},
+        "probes": [probe],
+        **kwargs,
+    }
+
+
+def postgres(version: str = "16", *, password: str = "test", tmpfs_size: Optional[str] = "512m") -> Dict[str, Any]:
+    """PostgreSQL without fsync, synchronous commit and full page writes."""
+    return _preset(
+        f"postgres:{version}",
+        "/var/lib/postgresql/data",
+        tmpfs_size,
+        ["postgres", "-c", "fsync=off", "-c", "synchronous_commit=off", "-c", "full_page_writes=off"],
+        # The entrypoint initializes the database with a server without TCP; this waits for the real one.
+        ExecProbe(["pg_isready", "-h", "127.0.0.1", "-U", "postgres"]),
+        environment={"POSTGRES_PASSWORD": password},
+    )
+
+
+def mysql(version: str = "8.0", *, password: str = "test", tmpfs_size: Optional[str] = "1g") -> Dict[str, Any]:
+    """MySQL without flushing the redo log on commit, binary log and doublewrite buffer."""
+    return _preset(
+        f"mysql:{version}",
+        "/var/lib/mysql",
+        tmpfs_size,
+        ["--innodb-flush-log-at-trx-commit=0", "--sync-binlog=0", "--skip-log-bin", "--innodb-doublewrite=OFF"],
+        ExecProbe(["mysqladmin", "ping", "-h", "127.0.0.1", "-uroot", f"-p{password}"]),
+        environment={"MYSQL_ROOT_PASSWORD": password},
+    )
+
+
+def mariadb(version: str = "11", *, password: str = "test", tmpfs_size: Optional[str] = "1g") -> Dict[str, Any]:
+    """MariaDB without flushing the redo log on commit, binary log and doublewrite buffer."""
+    return _preset(
+        f"mariadb:{version}",
+        "/var/lib/mysql",
+        tmpfs_size,
+        ["--innodb-flush-log-at-trx-commit=0", "--sync-binlog=0", "--skip-log-bin", "--innodb-doublewrite=OFF"],
+        ExecProbe(["healthcheck.sh", "--connect", "--innodb_initialized"]),
+        environment={"MARIADB_ROOT_PASSWORD": password},
+    )
+
+
+def mongo(version: str = "7", *, tmpfs_size: Optional[str] = "512m") -> Dict[str, Any]:
+    """MongoDB without periodic checkpoints; the journal can not be turned off since MongoDB 6.1."""
+    return _preset(
+        f"mongo:{version}",
+        "/data/db",
+        tmpfs_size,
+        ["mongod", "--syncdelay", "0"],
+        ExecProbe(["mongosh", "--quiet", "--eval", "db.adminCommand('ping')"]),
+    )
+
+
+def redis(version: str = "7", *, tmpfs_size: Optional[str] = "256m") -> Dict[str, Any]:
+    """Redis without RDB snapshots and append only file."""
+    return _preset(
+        f"redis:{version}",
+        "/data",
+        tmpfs_size,
+        ["redis-server", "--save", "", "--appendonly", "no"],
+        ExecProbe(["redis-cli", "ping"]),
+    )
@@ -0,0 +1,281 @@
+"""Readiness probes: deciding when a started container is ready for tests.
+
+Probes are polled with exponential backoff and jitter until all of them pass, the container exits or the
+startup timeout of the container expires. How long every probe took is recorded on the container.
+"""
+from __future__ import annotations
+
+import abc
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, ClassVar, Dict, List, Optional, Pattern, Sequence, Set, Tuple, Union
+
+from .container import ContainerStartError, DockerContainer
+from .timing import timings
+
+if TYPE_CHECKING:
+    import docker
+
+    from .events import ContainerEvents
+    from .logs import LogWatcher
+
+Port = Union[int, str]
+
+#: How long :class:`TcpProbe` waits for an answer from the address of a container before it takes it as unreachable.
+DIRECT_TIMEOUT = 0.2
+
+
+class Probe(abc.ABC):
+    """Base class of readiness probes.
+
+    ``check`` returns whether the container is ready as far as the probe is concerned. It is called with
+    ``container.attrs`` freshly inspected, and raises :class:`ContainerStartError` when the container will
+    never become ready.
+    """
+
+    #: Whether the answer only changes with the state of the container; such probes are checked again on a container
+    #: event instead of being polled.
+    on_events: ClassVar[bool] = False
+
+    @abc.abstractmethod
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        ...
+
+    def signal(self, container: DockerContainer) -> Optional[threading.Event]:
+        """An event set when :meth:`check` may pass now or the container exited, waited for instead of polling.
+
+        ``None`` to poll the probe.
+        """
+        return None
+
+
+@dataclass(frozen=True)
+class HealthcheckProbe(Probe):
+    """Ready when the Docker HEALTHCHECK of the container reports healthy; when there is none, when it runs."""
+
+    on_events: ClassVar[bool] = True
+
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        health = container.attrs["State"].get("Health", {}).get("Status")
+        if health == "unhealthy":
+            raise ContainerStartError(f"{container.spec.name}: container is unhealthy")
+        return health in (None, "healthy")
+
+
+@dataclass(frozen=True)
+class TcpProbe(Probe):
+    """Ready when a TCP connection to ``port`` of the container succeeds.
+
+    A published port is served by the userland proxy of Docker, which accepts connections before anything listens in
+    the container, and closes them right away then. So the probe connects to the address of the container on its
+    network when the test process can reach it; else, through the published port, the connection must also receive
+    data or stay open for ``settle`` seconds. For a service that closes the connections it accepts, use
+    :class:`ExecProbe` or :class:`LogProbe` instead.
+    """
+
+    port: Port
+    timeout: float = 1.0
+    settle: float = 0.1
+
+    #: Container addresses the test process cannot connect to, like those in the virtual machine of Docker Desktop.
+    unreachable: ClassVar[Set[str]] = set()
+
+    def published(self, container: DockerContainer) -> bool:
+        return container.address(self.port) != (container.ip_address, int(str(self.port).split("/")[0]))
+
+    def direct_address(self, container: DockerContainer) -> Optional[Tuple[str, int]]:
+        """The address of the container on its network, for a published port, unless known to be unreachable."""
+        if not self.published(container) or not container.ip_address or container.ip_address in self.unreachable:
+            return None
+        return container.ip_address, int(str(self.port).split("/")[0])
+
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        direct = self.direct_address(container)
+        if direct is not None:
+            try:
+                with socket.create_connection(direct, timeout=min(self.timeout, DIRECT_TIMEOUT)):
+                    return True
+            except ConnectionRefusedError:
+                return False
+            except OSError:
+                # No route to the container, or it does not answer: only through the published port.
+                self.unreachable.add(direct[0])
+        try:
+            with socket.create_connection(container.address(self.port), timeout=self.timeout) as connection:
+                return not self.published(container) or _stays_open(connection, self.settle)
+        except OSError:
+            return False
+
+
+def _stays_open(connection: socket.socket, seconds: float) -> bool:
+    connection.settimeout(seconds)
+    try:
+        return connection.recv(1) != b""
+    except socket.timeout:
+        return True
+
+
+@dataclass(frozen=True)
+class HttpProbe(Probe):
+    """Ready when a GET of ``path`` on ``port`` of the container answers with ``status``."""
+
+    port: Port
+    path: str = "/"
+    status: int = 200
+    timeout: float = 1.0
+
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        import http.client
+
+        host, port = container.address(self.port)
+        connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        try:
+            connection.request("GET", self.path)
+            return connection.getresponse().status == self.status
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            connection.close()
+
+
+@dataclass(frozen=True)
+class LogProbe(Probe):
+    """Ready when a line of output of the container matches ``pattern``, ``occurrences`` times.
+
+    The output is read incrementally from a single streaming request per container, see
+    :class:`~.logs.LogWatcher`, instead of fetching the whole log on every attempt.
+    """
+
+    pattern: Union[str, Pattern[str]]
+    occurrences: int = 1
+    _watchers: Dict[str, LogWatcher] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        from .logs import LogWatcher
+
+        with self._lock:
+            watcher = self._watchers.get(container.id)
+            if watcher is None:
+                # Only the output of the current run: a restarted container still has the ready line of the last one.
+                watcher = self._watchers[container.id] = LogWatcher(
+                    client, container.id, re.compile(self.pattern), self.occurrences, since=container.started_at
+                )
+            if watcher.matched.is_set() or watcher.finished.is_set():
+                del self._watchers[container.id]
+        return watcher.matched.is_set()
+
+    def signal(self, container: DockerContainer) -> Optional[threading.Event]:
+        with self._lock:
+            watcher = self._watchers.get(container.id)
+        return watcher.finished if watcher is not None else None
+
+
+@dataclass(frozen=True)
+class ExecProbe(Probe):
+    """Ready when ``command`` run in the container exits with ``exit_code``."""
+
+    command: Union[str, Sequence[str]]
+    exit_code: int = 0
+
+    def check(self, client: docker.DockerClient, container: DockerContainer) -> bool:
+        exec_id = client.api.exec_create(container.id, self.command, stdout=False, stderr=False)["Id"]
+        client.api.exec_start(exec_id)
+        return client.api.exec_inspect(exec_id)["ExitCode"] == self.exit_code
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Intervals between probe attempts: ``initial``, multiplied by ``factor`` up to ``maximum``.
+
+    Every interval is randomly varied by up to ``jitter`` (a fraction) so that containers started together
+    are not probed in lock step.
+    """
+
+    initial: float = 0.05
+    factor: float = 2.0
+    maximum: float = 2.0
+    jitter: float = 0.1
+
+    def intervals(self):
+        interval = self.initial
+        while True:
+            yield interval * (1 + random.uniform(-self.jitter, self.jitter))
+            interval = min(interval * self.factor, self.maximum)
+
+
+@dataclass
+class ProbeTiming:
+    probe: Probe
+    attempts: int = 0
+    seconds: Optional[float] = None
+    """Time from the start of probing until the probe passed; ``None`` when it never passed."""
+
+
+@dataclass
+class Readiness:
+    """How long a container took to become ready, in total and per probe."""
+
+    probes: List[ProbeTiming] = field(default_factory=list)
+    seconds: Optional[float] = None
+
+
+DEFAULT_PROBES: Tuple[Probe, ...] = (HealthcheckProbe(),)
+
+
+def wait_until_ready(
+    client: docker.DockerClient, container: DockerContainer, events: Optional[ContainerEvents] = None
+) -> Readiness:
+    """Poll the probes of the container until all pass; records and returns the timings.
+
+    With the ``events`` of the session, the container is inspected again as soon as its state changes, and only
+    then when all pending probes are :attr:`~Probe.on_events`. A probe with a :meth:`~Probe.signal` is checked again
+    as soon as it is set.
+    """
+    spec = container.spec
+    readiness = container.readiness = Readiness([ProbeTiming(probe) for probe in spec.probes or DEFAULT_PROBES])
+    start = time.monotonic()
+    deadline = start + spec.startup_timeout
+    intervals = (spec.backoff or Backoff()).intervals()
+    while True:
+        seen = events.count(container.id) if events is not None else 0
+        container.attrs = client.api.inspect_container(container.id)
+        state = container.attrs["State"]
+        if not state["Running"] and state["Status"] not in ("created", "restarting"):
+            raise ContainerStartError(f"{spec.name}: container {state['Status']} ({state['ExitCode']})")
+        if state["Running"] and _check(client, container, readiness.probes, start):
+            readiness.seconds = time.monotonic() - start
+            timings.add(container.id, "ready", readiness.seconds)
+            return readiness
+        now = time.monotonic()
+        if now >= deadline:
+            pending = [repr(timing.probe) for timing in readiness.probes if timing.seconds is None]
+            raise ContainerStartError(f"{spec.name}: not ready after {spec.startup_timeout} seconds: {pending}")
+        interval = min(next(intervals), deadline - now)
+        # The probe that did not pass; the later ones were not checked.
+        signal = next(timing.probe for timing in readiness.probes if timing.seconds is None).signal(container)
+        if state["Running"] and signal is not None:
+            signal.wait(deadline - now)
+        elif events is None or events.closed:
+            time.sleep(interval)
+        elif all(timing.probe.on_events for timing in readiness.probes if timing.seconds is None):
+            events.wait(container.id, seen, deadline - now)
+        else:
+            # Still polled, but a container that exits is noticed at once.
+            events.wait(container.id, seen, interval)
+
+
+def _check(client: docker.DockerClient, container: DockerContainer, probes: List[ProbeTiming], start: float) -> bool:
+    # In order, stopping at the first probe that does not pass yet: later probes usually depend on earlier ones.
+    for timing in probes:
+        if timing.seconds is not None:
+            continue
+        timing.attempts += 1
+        if not timing.probe.check(client, container):
+            return False
+        timing.seconds = time.monotonic() - start
+    return True
@@ -0,0 +1,197 @@
+"""Removing the resources of a session in a detached process, so that pytest does not wait for it.
+
+With ``--docker-fixtures-teardown=background`` every pytest process that creates containers or networks holds a
+control connection to a reaper: a process of its own, started on first use, that outlives pytest. When the session
+finishes, pytest tells the reaper to remove everything labelled with the session, see :mod:`.teardown`, and exits
+without waiting. A connection that drops without a word means that pytest was killed: once no process is connected
+any more, the reaper removes the resources all the same.
+
+Under pytest-xdist all workers connect to the reaper of the test run. Workers that finish detach, and the last one
+tells it to reap.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import selectors
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from filelock import FileLock
+
+from .paths import STATE_DIRECTORY
+
+REAP = b"reap"
+DETACH = b"detach"
+#: Seconds to wait for the answer of a running reaper.
+TIMEOUT = 10.0
+#: Seconds a reaper all processes detached from waits for one to connect again, before it exits without reaping.
+IDLE_TIMEOUT = 3600.0
+
+
+class ReaperConnection:
+    """The control connection of this process to the reaper of ``session_id``; starts the reaper when there is none.
+
+    ``max_workers`` is the number of containers the reaper removes concurrently.
+    """
+
+    def __init__(self, session_id: str, max_workers: int, directory: Optional[Path] = None) -> None:
+        self.session_id = session_id
+        self.max_workers = max_workers
+        self.directory = directory or STATE_DIRECTORY
+        self._port_path = self.directory / f"{session_id}.reaper"
+        self._socket: Optional[socket.socket] = self._connect()
+
+    def _connect(self) -> socket.socket:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Under pytest-xdist the workers connect at the same time; only one of them may start the reaper.
+        with FileLock(str(self.directory / f"{self.session_id}.reaper.lock")):
+            connection = self._attach()
+            if connection is not None:
+                return connection
+            # Listening before the reaper runs, so that nothing waits for it to start.
+            with socket.create_server(("127.0.0.1", 0)) as listener:
+                arguments = [self.session_id, str(listener.fileno()), str(self._port_path), str(self.max_workers)]
+                subprocess.Popen(
+                    [sys.executable, "-m", __name__, *arguments],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    pass_fds=(listener.fileno(),),
+                    # Not in the process group of pytest, so that interrupting pytest does not interrupt the reaper.
+                    start_new_session=True,
+                )
+                port = listener.getsockname()[1]
+            temporary = self._port_path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(str(port))
+            os.replace(temporary, self._port_path)
+            connection = socket.create_connection(("127.0.0.1", port))
+            connection.sendall(self.session_id.encode() + b"\n")
+            return connection
+
+    def _attach(self) -> Optional[socket.socket]:
+        """A connection to the running reaper of the session, or ``None`` when there is none."""
+        try:
+            port = int(self._port_path.read_text())
+            connection = socket.create_connection(("127.0.0.1", port), timeout=TIMEOUT)
+        except (OSError, ValueError):
+            return None
+        try:
+            # The port may have been taken over by another process since the reaper that wrote it exited.
+            connection.sendall(self.session_id.encode() + b"\n")
+            if connection.recv(3) == b"ok\n":
+                connection.settimeout(None)
+                return connection
+        except OSError:
+            pass
+        connection.close()
+        return None
+
+    def _close(self, message: bytes) -> None:
+        if self._socket is None:
+            return
+        try:
+            self._socket.sendall(message + b"\n")
+        except OSError:
+            pass
+        finally:
+            self._socket.close()
+            self._socket = None
+
+    def reap(self) -> None:
+        """Have the reaper remove the resources of the session once no other process is connected, and disconnect."""
+        self._close(REAP)
+
+    def detach(self) -> None:
+        """Disconnect without having the resources removed: another process of the session does that."""
+        self._close(DETACH)
+
+
+def serve(session_id: str, listener: socket.socket, port_path: Path, max_workers: int) -> None:
+    """Serve the control connections of the session until no process is attached any more.
+
+    Then the resources of the session are removed, unless all processes detached.
+    """
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    # Open connections with what was received of their current line; attached are those that introduced themselves.
+    connections: Dict[socket.socket, bytes] = {}
+    attached: Set[socket.socket] = set()
+    reap = False
+    while not (reap and not attached):
+        ready = selector.select(None if connections else IDLE_TIMEOUT)
+        if not ready:
+            # Everyone detached and nobody came back.
+            break
+        for key, _ in ready:
+            if key.fileobj is listener:
+                connection, _ = listener.accept()
+                connections[connection] = b""
+                selector.register(connection, selectors.EVENT_READ)
+                continue
+            connection = key.fileobj
+            try:
+                data = connection.recv(4096)
+            except OSError:
+                data = b""
+            lines = (connections[connection] + data).split(b"\n")
+            connections[connection] = lines.pop()
+            open_ = bool(data)
+            for line in lines:
+                if connection not in attached and line == session_id.encode():
+                    attached.add(connection)
+                    connection.sendall(b"ok\n")
+                elif connection in attached and line in (REAP, DETACH):
+                    reap = reap or line == REAP
+                    attached.discard(connection)
+                    open_ = False
+                else:
+                    open_ = False
+            if not open_:
+                if connection in attached:
+                    # Dropped without a word: the process was killed.
+                    reap = True
+                    attached.discard(connection)
+                selector.unregister(connection)
+                del connections[connection]
+                connection.close()
+
+    # Processes of the session that start now get a reaper of their own.
+    selector.close()
+    listener.close()
+    port_path.unlink(missing_ok=True)
+    port_path.with_suffix(".reaper.lock").unlink(missing_ok=True)
+    for connection in connections:
+        connection.close()
+    if reap:
+        _reap(session_id, max_workers)
+
+
+def _reap(session_id: str, max_workers: int) -> None:
+    import docker
+
+    from .client import get_client
+    from .teardown import remove_session
+
+    try:
+        remove_session(get_client(), session_id, max_workers)
+    except docker.errors.DockerException:
+        # Nothing to report to: pytest is gone. Leftovers are removed with --docker-fixtures-cleanup-orphans.
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Remove the containers and networks of a pytest session.")
+    parser.add_argument("session_id")
+    parser.add_argument("listener", type=int, help="file descriptor of the listening socket")
+    parser.add_argument("port_path", type=Path, help="file with the port of the socket, removed when done")
+    parser.add_argument("max_workers", type=int)
+    args = parser.parse_args()
+    serve(args.session_id, socket.socket(fileno=args.listener), args.port_path, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
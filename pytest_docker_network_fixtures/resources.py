@@ -0,0 +1,19 @@
+"""The resources a container fixture declares, for the admission control of :mod:`.admission`."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Resources:
+    """What a container needs: ``memory`` in megabytes and ``cpus`` in cores, which may be fractional."""
+
+    memory: int = 0
+    cpus: float = 0.0
+
+    def __add__(self, other: Resources) -> Resources:
+        return Resources(self.memory + other.memory, self.cpus + other.cpus)
+
+    def within(self, budget: Resources) -> bool:
+        """Whether these resources fit in ``budget``; a budget of 0 does not limit."""
+        return (not budget.memory or self.memory <= budget.memory) and (not budget.cpus or self.cpus <= budget.cpus)
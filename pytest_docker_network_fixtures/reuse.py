@@ -0,0 +1,163 @@
+"""Keeping the network and session scoped containers alive between sessions.
+
+In reuse mode (``--docker-fixtures-reuse`` or ``PYTEST_DOCKER_FIXTURES_REUSE=1``) the session network has a fixed name
+and is not removed, and session scoped containers are labelled with a hash of their configuration and kept running.
+The next session reuses a kept container when the hash matches, and replaces it when the configuration changed.
+
+The network name and the labels include a hash of the root directory of the project, see :func:`project`, so that
+projects on one host keep their containers apart. Sessions of a project look up or create the container of a fixture
+under a file lock, and record in a ledger next to it that they use it: a kept container is only replaced once no
+session that still runs uses it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional
+
+from filelock import FileLock
+
+from .container import ContainerSpec, DockerContainer, remove_container
+from .files import files_configuration
+from .network import DockerNetwork
+from .paths import STATE_DIRECTORY
+from .teardown import gone
+
+if TYPE_CHECKING:
+    import docker
+
+LABEL_FIXTURE = "pytest-dnf.fixture"
+LABEL_NETWORK = "pytest-dnf.network"
+LABEL_CONFIGURATION = "pytest-dnf.configuration"
+LABEL_PROJECT = "pytest-dnf.project"
+
+#: The sessions that use the kept containers of a fixture, by container id.
+Users = Dict[str, List[str]]
+
+
+def project(rootpath: Path) -> str:
+    """Identifies the project with the root directory ``rootpath`` on this host."""
+    return hashlib.sha256(str(rootpath.resolve()).encode()).hexdigest()[:12]
+
+
+def network_name(prefix: str, project: str) -> str:
+    return f"{prefix}-reuse-{project}"
+
+
+def reusable(spec: ContainerSpec) -> bool:
+    return spec.scope == "session" and not spec.pool_size
+
+
+def configuration_hash(spec: ContainerSpec, image_id: str) -> str:
+    """Hash of what the container is created from, including the id of its image."""
+    configuration = {
+        "image": image_id,
+        "command": spec.command,
+        "environment": dict(spec.environment),
+        "ports": {str(port): host_port for port, host_port in spec.ports.items()},
+        "aliases": spec.aliases,
+        "host_config": dict(spec.host_config),
+        "tmpfs": dict(spec.tmpfs),
+        "create_kwargs": dict(spec.create_kwargs),
+    }
+    configuration.update(files_configuration(spec.files))
+    return hashlib.sha256(json.dumps(configuration, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def labels(spec: ContainerSpec, network: DockerNetwork, configuration: str, project: str) -> Dict[str, str]:
+    return {
+        LABEL_FIXTURE: spec.name,
+        LABEL_NETWORK: network.name,
+        LABEL_CONFIGURATION: configuration,
+        LABEL_PROJECT: project,
+    }
+
+
+class ReuseLedger:
+    """The sessions that use the kept containers of ``project``: a JSON file and a file lock per fixture.
+
+    Users are processes, as identified by :func:`.teardown.owner`; those that no longer run are dropped.
+    """
+
+    def __init__(self, project: str, directory: Optional[Path] = None) -> None:
+        self.project = project
+        self.directory = directory or STATE_DIRECTORY
+
+    def lock(self, name: Optional[str] = None) -> FileLock:
+        """The lock of the kept container of fixture ``name``, or of the network."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(self.directory / f"reuse-{self.project}-{name or ''}.lock"))
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"reuse-{self.project}-{name}.json"
+
+    def users(self, name: str) -> Users:
+        """The users of the kept containers of fixture ``name``; read under its :meth:`lock`."""
+        try:
+            users = json.loads(self._path(name).read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        users = {key: [user for user in value if not gone(user)] for key, value in users.items()}
+        return {key: value for key, value in users.items() if value}
+
+    def _write(self, name: str, users: Users) -> None:
+        tmp = self._path(name).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(users))
+        os.replace(tmp, self._path(name))
+
+    def use(self, name: str, container_id: str, user: str) -> None:
+        """Record that ``user`` uses the container; under the :meth:`lock` of the fixture."""
+        users = self.users(name)
+        users[container_id] = sorted({*users.get(container_id, []), user})
+        self._write(name, users)
+
+    def leave(self, name: str, user: str) -> None:
+        """Record that ``user`` no longer uses the kept containers of fixture ``name``."""
+        with self.lock(name):
+            users = self.users(name)
+            self._write(name, {key: [other for other in value if other != user] for key, value in users.items()})
+
+
+def find_network(client: docker.DockerClient, name: str) -> Optional[DockerNetwork]:
+    for network in client.api.networks(names=[name]):
+        # The name filter also matches parts of names.
+        if network["Name"] == name:
+            return DockerNetwork(name=name, id=network["Id"])
+    return None
+
+
+def find_container(
+    client: docker.DockerClient,
+    spec: ContainerSpec,
+    network: DockerNetwork,
+    configuration: str,
+    project: str,
+    users: Mapping[str, List[str]],
+) -> Optional[DockerContainer]:
+    """The kept, running container of ``spec`` with the given configuration hash.
+
+    Kept containers of the fixture with another configuration, or that no longer run, are removed; running ones only
+    when they have no ``users``, see :class:`ReuseLedger`.
+    """
+    found = None
+    filters = {
+        "label": [f"{LABEL_FIXTURE}={spec.name}", f"{LABEL_NETWORK}={network.name}", f"{LABEL_PROJECT}={project}"]
+    }
+    for summary in client.api.containers(all=True, filters=filters):
+        container = DockerContainer(
+            spec=spec,
+            id=summary["Id"],
+            name=summary["Names"][0].lstrip("/"),
+            network=network,
+            aliases=(spec.name, *spec.aliases),
+        )
+        matches = summary["Labels"].get(LABEL_CONFIGURATION) == configuration
+        running = summary["State"] == "running"
+        if found is None and matches and running:
+            found = container
+        elif not running or not users.get(container.id):
+            remove_container(client, container)
+    return found
@@ -0,0 +1,114 @@
+"""Concurrent, dependency aware start of containers."""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Mapping, Tuple
+
+from .container import ContainerSpec, DockerContainer
+
+Key = Tuple[str, str]
+
+
+class DependencyError(Exception):
+    """A container could not start because a container it depends on did not."""
+
+
+class StartScheduler:
+    """Starts containers on a thread pool.
+
+    Containers without a dependency between them are created and waited for concurrently; a container
+    is submitted only after all containers in its ``depends_on`` are ready. Every (fixture name,
+    scope key) pair is started at most once; later requests share the same future.
+    """
+
+    def __init__(self, start: Callable[[ContainerSpec], DockerContainer], max_workers: int) -> None:
+        self._start = start
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker-fixtures")
+        self._lock = threading.Lock()
+        self._futures: Dict[Key, "Future[DockerContainer]"] = {}
+
+    def schedule(
+        self,
+        spec: ContainerSpec,
+        specs: Mapping[str, ContainerSpec],
+        key_of: Callable[[ContainerSpec], str],
+        _path: Tuple[str, ...] = (),
+    ) -> "Future[DockerContainer]":
+        """Schedule ``spec`` and, first, everything it depends on.
+
+        ``specs`` resolves dependency names, ``key_of`` gives the scope key of a specification.
+        """
+        if spec.name in _path:
+            raise ValueError(f"circular container dependency: {' -> '.join(_path + (spec.name,))}")
+        key = (spec.name, key_of(spec))
+        with self._lock:
+            if key in self._futures:
+                return self._futures[key]
+        dependencies = []
+        for name in spec.depends_on:
+            if name not in specs:
+                raise ValueError(f"container fixture {spec.name!r} depends on unknown container fixture {name!r}")
+            dependencies.append(self.schedule(specs[name], specs, key_of, _path + (spec.name,)))
+        with self._lock:
+            if key in self._futures:
+                return self._futures[key]
+            future: "Future[DockerContainer]" = Future()
+            self._futures[key] = future
+        self._when_done(spec, dependencies, future)
+        return future
+
+    def _when_done(self, spec: ContainerSpec, dependencies: list, future: "Future[DockerContainer]") -> None:
+        remaining = [len(dependencies)]
+        lock = threading.Lock()
+
+        def submit() -> None:
+            failed = [name for name, dependency in zip(spec.depends_on, dependencies) if dependency.exception()]
+            if failed:
+                future.set_exception(DependencyError(f"{spec.name}: dependencies failed to start: {failed}"))
+                return
+            try:
+                self._executor.submit(self._run, spec, future)
+            except RuntimeError:
+                # The session is shutting down.
+                future.cancel()
+
+        def on_dependency_done(_: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            submit()
+
+        if not dependencies:
+            submit()
+        for dependency in dependencies:
+            dependency.add_done_callback(on_dependency_done)
+
+    def _run(self, spec: ContainerSpec, future: "Future[DockerContainer]") -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._start(spec))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def forget(self, spec: ContainerSpec, key: str) -> None:
+        with self._lock:
+            self._futures.pop((spec.name, key), None)
+
+    def pop_scope(self, key: str) -> Dict[Key, "Future[DockerContainer]"]:
+        """Remove and return all futures for the given scope key."""
+        with self._lock:
+            popped = {k: f for k, f in self._futures.items() if k[1] == key}
+            for k in popped:
+                del self._futures[k]
+        return popped
+
+    def pop_all(self) -> Dict[Key, "Future[DockerContainer]"]:
+        with self._lock:
+            popped, self._futures = self._futures, {}
+        return popped
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
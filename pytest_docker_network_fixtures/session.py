@@ -0,0 +1,537 @@
+"""Per pytest session state: the Docker client, the shared bridge network and the started containers."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set, Tuple
+
+import docker
+import pytest
+
+from .build import BuildCache
+from .events import ContainerEvents
+from .files import archives
+from .client import attribute, close_client, get_client
+from .container import (
+    ASYNC_REGISTRY,
+    REGISTRY,
+    ContainerSpec,
+    DockerContainer,
+    create_container,
+    remove_container,
+    scope_key,
+)
+from .images import ImagePuller
+from .network import DockerNetwork, create_network, random_network_name
+from .network_pool import NetworkPool
+from .pool import ContainerPool
+from .readiness import wait_until_ready
+from .reaper import ReaperConnection
+from .resources import Resources
+from .reuse import ReuseLedger, configuration_hash, find_container, find_network, network_name, project, reusable
+from .reuse import labels as reuse_labels
+from .scheduler import StartScheduler
+from .settings import Settings
+from .snapshot import SnapshotCache
+from .teardown import (
+    LABEL_OWNER,
+    LABEL_SESSION,
+    owner,
+    remove_containers,
+    remove_orphans,
+    remove_session,
+    session_labels,
+)
+from .timing import timings
+from .xdist import State, XdistCoordinator
+
+if TYPE_CHECKING:
+    from .admission import Admission
+
+#: What API calls for the session network are recorded for, see :mod:`.client`.
+NETWORK = "<network>"
+
+
+class DockerFixtureSession:
+    """Owns the Docker resources of one pytest session.
+
+    Nothing contacts the daemon unless a selected test uses a container fixture: the client, the network and the
+    containers are created on first use, and only the containers the running test depends on are started.
+    The network and the containers are removed once, in bulk, when the session finishes, see :mod:`.teardown`, or
+    after it by a detached process, see :mod:`.reaper`; in reuse mode the network and session scoped containers are
+    kept for the next session, see :mod:`.reuse`.
+    Under pytest-xdist the network and shared containers are created by the first worker that needs
+    them and removed by the last worker to finish.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        xdist: Optional[XdistCoordinator] = None,
+        cache: Optional[pytest.Cache] = None,
+        rootpath: Optional[Path] = None,
+    ) -> None:
+        self.settings = settings
+        self.xdist = xdist
+        # All workers of an xdist test run share the session id, so the last worker can remove everything.
+        self.session_id = xdist.testrun_uid if xdist is not None else uuid.uuid4().hex[:12]
+        # A worker may exit while others still use what it created: the controller owns the resources of the run.
+        self.labels = session_labels(self.session_id, owner(os.getppid()) if xdist is not None else None)
+        self._lock = threading.RLock()
+        self._client: Optional[docker.DockerClient] = None
+        self._events: Optional[ContainerEvents] = None
+        self._reaper: Optional[ReaperConnection] = None
+        budget = Resources(settings.memory_budget, settings.cpu_budget)
+        self.admission: Optional[Admission] = None
+        if budget != Resources():
+            from .admission import Admission
+
+            self.admission = Admission(budget, settings.admission_timeout)
+        # Admission tickets by container id.
+        self._tickets: Dict[str, str] = {}
+        self._network: Optional[DockerNetwork] = None
+        self._containers: Dict[str, DockerContainer] = {}
+        # Containers this session must not remove: shared with other xdist workers, or kept for reuse.
+        self._kept: Set[str] = set()
+        self.project = project(rootpath or Path.cwd())
+        self.reuse_ledger = ReuseLedger(self.project)
+        # The fixtures whose kept containers this session uses.
+        self._reused: Set[str] = set()
+        self._pools: Dict[str, ContainerPool] = {}
+        self._network_pool: Optional[NetworkPool] = None
+        self._leases: Dict[str, DockerNetwork] = {}
+        self._lease_lock = threading.Lock()
+        self.images = ImagePuller(lambda: self.client, max_workers=settings.pull_workers)
+        self.snapshots = SnapshotCache(lambda: self.client, refresh=settings.refresh_snapshots)
+        self.builds = BuildCache(lambda: self.client, cache, max_images=settings.build_cache_size)
+        self.scheduler = StartScheduler(self._start, max_workers=settings.start_workers)
+        self.current_item: Optional[pytest.Item] = None
+        self._prefetched: Optional[pytest.Item] = None
+
+    @property
+    def client(self) -> docker.DockerClient:
+        with self._lock:
+            if self._client is None:
+                self._client = get_client(self.settings.api_pool_size)
+            return self._client
+
+    @property
+    def events(self) -> ContainerEvents:
+        """The events of the containers of the session; subscribed to before the first container is created."""
+        with self._lock:
+            if self._events is None:
+                filters = {"label": [f"{LABEL_SESSION}={self.session_id}"]}
+                with attribute(NETWORK):
+                    self._events = ContainerEvents(self.client, filters, self._on_event)
+            return self._events
+
+    def _on_event(self, container_id: str, action: str) -> None:
+        if action == "destroy":
+            if self._events is not None:
+                self._events.forget(container_id)
+            return
+        container = self._containers.get(container_id)
+        readiness = container.readiness if container is not None else None
+        if action == "start" and readiness is not None and readiness.seconds is not None:
+            # Started again after it was ready: a restart, which can change its address and published ports.
+            try:
+                container.refresh(self.client)
+            except docker.errors.DockerException:
+                pass
+
+    def _attach_reaper(self) -> None:
+        """Connect to the reaper before anything is created that it has to remove; only in background teardown."""
+        if self.settings.teardown == "background" and self._reaper is None:
+            self._reaper = ReaperConnection(self.session_id, self.settings.start_workers)
+
+    @property
+    def network(self) -> DockerNetwork:
+        with self._lock:
+            if self._network is None:
+                self._attach_reaper()
+                if self.xdist is None:
+                    self._network = self._create_network()
+                else:
+                    self._network = self.xdist.network(
+                        self._create_network, lambda network: vars(network), lambda record: DockerNetwork(**record)
+                    )
+            return self._network
+
+    @property
+    def network_pool(self) -> NetworkPool:
+        """Networks for tests that need one of their own; created when the first one is leased."""
+        with self._lock:
+            if self._network_pool is None:
+                self._attach_reaper()
+                self._network_pool = NetworkPool(
+                    lambda: self.client,
+                    f"{self.settings.network_prefix}-isolated",
+                    self.settings.network_pool_size,
+                    self.labels,
+                )
+            return self._network_pool
+
+    def isolated_network(self, key: str) -> DockerNetwork:
+        """The network leased to the scope ``key``, i.e. a test; released when the test is torn down."""
+        # Not under the session lock: leasing waits when all networks are leased.
+        with self._lease_lock:
+            if key not in self._leases:
+                with attribute(NETWORK):
+                    self._leases[key] = self.network_pool.lease()
+            return self._leases[key]
+
+    def _create_network(self) -> DockerNetwork:
+        with attribute(NETWORK):
+            if not self.settings.reuse:
+                name = self.settings.network_name or random_network_name(self.settings.network_prefix)
+                return create_network(self.client, name, self.labels)
+            name = self.settings.network_name or network_name(self.settings.network_prefix, self.project)
+            with self.reuse_ledger.lock():
+                return find_network(self.client, name) or create_network(self.client, name)
+
+    def _key_of(self, spec: ContainerSpec) -> str:
+        assert self.current_item is not None, "container fixtures can only be used by tests"
+        return scope_key(self.current_item, spec.scope)
+
+    def _start(self, spec: ContainerSpec) -> DockerContainer:
+        with attribute(spec.name):
+            return self._start_attributed(spec)
+
+    def _start_attributed(self, spec: ContainerSpec) -> DockerContainer:
+        if not spec.shared or self.xdist is None:
+            return self._start_local(spec)
+
+        def load(record: Dict[str, Any]) -> DockerContainer:
+            container = DockerContainer(
+                spec=spec, id=record["id"], name=record["name"], network=self.network, aliases=tuple(record["aliases"])
+            )
+            wait_until_ready(self.client, container, self.events)
+            return container
+
+        def dump(container: DockerContainer) -> Dict[str, Any]:
+            with self._lock:
+                # Released by the last worker, when it removes the container.
+                ticket = self._tickets.pop(container.id, None)
+            return {"id": container.id, "name": container.name, "aliases": container.aliases, "ticket": ticket}
+
+        container = self.xdist.container(spec.name, lambda: self._start_local(spec), dump, load)
+        with self._lock:
+            # The last worker to finish removes shared containers.
+            self._containers.pop(container.id, None)
+            self._kept.add(container.id)
+        return container
+
+    def _start_local(self, spec: ContainerSpec, aliases: Optional[Tuple[str, ...]] = None) -> DockerContainer:
+        start = time.monotonic()
+        image = self.image(spec)
+        waited = time.monotonic() - start
+        container = self._start_snapshot(spec, image, aliases)
+        timings.add(container.id, "image", waited)
+        return container
+
+    def _start_snapshot(self, spec: ContainerSpec, image: str, aliases: Optional[Tuple[str, ...]]) -> DockerContainer:
+        if spec.snapshot is None:
+            return self._start_image(spec, image, aliases)
+        try:
+            tag = self.snapshots.tag(spec, image)
+        except docker.errors.ImageNotFound:
+            self.images.pull(image)
+            tag = self.snapshots.tag(spec, image)
+        with self.snapshots.lock(tag):
+            if not self.snapshots.available(tag):
+                container = self._start_image(spec, image, aliases)
+                try:
+                    spec.snapshot.seed(container)
+                    self.snapshots.commit(container, tag)
+                except BaseException:
+                    self._remove(container)
+                    raise
+                return container
+        return self._start_image(spec, tag, aliases)
+
+    def image(self, spec: ContainerSpec) -> str:
+        """The image to start ``spec`` from; built when the fixture has a build."""
+        if spec.build is not None:
+            return self.builds.image(spec)
+        self.images.wait(spec.image)
+        return spec.image
+
+    def _start_image(
+        self, spec: ContainerSpec, image: str, aliases: Optional[Tuple[str, ...]] = None
+    ) -> DockerContainer:
+        if not self.settings.reuse or not reusable(spec) or aliases is not None:
+            return self._start_new(spec, image, aliases, self.labels)
+        configuration = configuration_hash(spec, self._image_id(spec, image))
+        # The controller under pytest-xdist: the kept container is in use until the whole run finished.
+        user = self.labels[LABEL_OWNER]
+        # Other sessions of the project, or other workers, wait until the container is found or created.
+        with self.reuse_ledger.lock(spec.name):
+            users = self.reuse_ledger.users(spec.name)
+            found = find_container(self.client, spec, self.network, configuration, self.project, users)
+            if found is None:
+                labels = reuse_labels(spec, self.network, configuration, self.project)
+                container = self._start_new(spec, image, aliases, labels, kept=True)
+            else:
+                container = found
+                with self._lock:
+                    self._kept.add(container.id)
+            self.reuse_ledger.use(spec.name, container.id, user)
+        with self._lock:
+            self._reused.add(spec.name)
+        if found is not None:
+            wait_until_ready(self.client, container)
+        return container
+
+    def _start_new(
+        self,
+        spec: ContainerSpec,
+        image: str,
+        aliases: Optional[Tuple[str, ...]],
+        labels: Dict[str, str],
+        kept: bool = False,
+    ) -> DockerContainer:
+        network = self.isolated_network(self._key_of(spec)) if spec.isolated else self.network
+        # Kept containers have no session label, so no events.
+        events = None if kept else self.events
+        start = time.monotonic()
+        ticket = self.admit(spec)
+        queued = time.monotonic() - start
+        try:
+            container = self._create(spec, network, aliases, image, labels)
+        except BaseException:
+            self.release_ticket(ticket)
+            raise
+        self.admitted(container.id, ticket)
+        timings.add(container.id, "queue", queued)
+        with self._lock:
+            if kept:
+                self._kept.add(container.id)
+            else:
+                self._containers[container.id] = container
+        try:
+            wait_until_ready(self.client, container, events)
+        except BaseException:
+            self._remove(container)
+            raise
+        return container
+
+    def _create(
+        self,
+        spec: ContainerSpec,
+        network: DockerNetwork,
+        aliases: Optional[Tuple[str, ...]],
+        image: str,
+        labels: Dict[str, str],
+    ) -> DockerContainer:
+        try:
+            return create_container(self.client, spec, network, aliases, image, labels)
+        except docker.errors.ImageNotFound:
+            if image != spec.image:
+                raise
+            self.images.pull(image)
+            return create_container(self.client, spec, network, aliases, image, labels)
+
+    def admit(self, spec: ContainerSpec) -> Optional[str]:
+        """Wait until the resources ``spec`` declares fit in the budget of the host, see :mod:`.admission`.
+
+        Returns the ticket to record with :meth:`admitted`; ``None`` without a budget or declared resources.
+        """
+        if self.admission is None or spec.resources is None:
+            return None
+        holder = None
+        if spec.shared and self.xdist is not None:
+            # A shared container outlives the worker that starts it, until the last worker removes it: the
+            # controller of the test run, the parent process of the workers, holds its ticket meanwhile.
+            holder = owner(os.getppid())
+        return self.admission.acquire(spec.name, spec.resources, holder)
+
+    def admitted(self, container_id: str, ticket: Optional[str]) -> None:
+        """Record the ticket of the created container, released by :meth:`dismiss` when it is removed."""
+        if ticket is not None:
+            with self._lock:
+                self._tickets[container_id] = ticket
+
+    def dismiss(self, container_id: str) -> None:
+        """Give the resources of the removed container back to the budget."""
+        with self._lock:
+            ticket = self._tickets.pop(container_id, None)
+        self.release_ticket(ticket)
+
+    def release_ticket(self, ticket: Optional[str]) -> None:
+        if ticket is not None and self.admission is not None:
+            self.admission.release(ticket)
+
+    def _image_id(self, spec: ContainerSpec, image: str) -> str:
+        try:
+            return self.client.api.inspect_image(image)["Id"]
+        except docker.errors.ImageNotFound:
+            if image != spec.image:
+                raise
+            self.images.pull(image)
+            return self.client.api.inspect_image(image)["Id"]
+
+    def _remove_run(self, state: State) -> None:
+        """Remove the shared containers and networks all workers of the xdist test run left; evict built images."""
+        if state["used"] and self.settings.teardown == "background":
+            self._attach_reaper()
+            assert self._reaper is not None
+            self._reaper.reap()
+        elif state["used"]:
+            with attribute(NETWORK):
+                remove_session(self.client, self.session_id, self.settings.start_workers)
+        for record in state["containers"].values():
+            self.release_ticket(record.get("ticket"))
+        self.builds.evict(state["builds"])
+
+    def remove_orphans(self) -> Tuple[int, int]:
+        """Remove the containers and networks of crashed sessions; returns how many of each."""
+        try:
+            with attribute(NETWORK):
+                return remove_orphans(self.client, self.settings.start_workers)
+        except docker.errors.DockerException:
+            # Without a daemon there is nothing to clean up; the fixtures report the error when they need it.
+            return 0, 0
+
+    def _remove(self, container: DockerContainer) -> None:
+        with self._lock:
+            self._containers.pop(container.id, None)
+        with attribute(container.spec.name):
+            remove_container(self.client, container)
+        self.dismiss(container.id)
+
+    def prepull(self, items: Iterable[pytest.Item]) -> None:
+        """Start pulling the missing images of all container fixtures the ``items`` use, directly or indirectly."""
+        if not self.settings.pull_workers:
+            return
+        specs = {**REGISTRY, **ASYNC_REGISTRY}
+        names = {name for item in items for name in item.fixturenames if name in specs}
+        pending = list(names)
+        while pending:
+            for name in specs[pending.pop()].depends_on:
+                if name in specs and name not in names:
+                    names.add(name)
+                    pending.append(name)
+        try:
+            self.images.prepull(specs[name].image for name in names if specs[name].image)
+        except docker.errors.DockerException:
+            # Without a daemon the fixtures fail and report why; a pre-pull is only an optimization.
+            pass
+
+    def _prefetch(self) -> None:
+        """Schedule every container fixture the current test uses, so they start concurrently."""
+        item = self.current_item
+        if item is None or item is self._prefetched:
+            return
+        self._prefetched = item
+        for name in item.fixturenames:
+            spec = REGISTRY.get(name)
+            if spec is None:
+                continue
+            try:
+                if spec.pool_size:
+                    self.pool(spec)
+                else:
+                    self.scheduler.schedule(spec, REGISTRY, self._key_of)
+            except Exception:
+                # Reported by the fixture itself when it is set up, not by the one that happens to prefetch.
+                pass
+
+    def acquire(self, spec: ContainerSpec) -> DockerContainer:
+        """Return the ready container for ``spec`` in the current scope, starting it when needed."""
+        self._prefetch()
+        return self.scheduler.schedule(spec, REGISTRY, self._key_of).result()
+
+    def pool(self, spec: ContainerSpec) -> ContainerPool:
+        """The pool of the pooled container fixture ``spec``; created, and filled, on first use."""
+        with self._lock:
+            if spec.name not in self._pools:
+                for name in spec.depends_on:
+                    if name not in REGISTRY or REGISTRY[name].scope != "session":
+                        raise ValueError(
+                            f"pooled container fixture {spec.name!r} can only depend on session scoped container"
+                            f" fixtures, not on {name!r}"
+                        )
+
+                def start() -> DockerContainer:
+                    for name in spec.depends_on:
+                        self.scheduler.schedule(REGISTRY[name], REGISTRY, lambda _: "").result()
+                    # Several containers of the pool are on the network at the same time, so none gets the alias.
+                    with attribute(spec.name):
+                        return self._start_local(spec, aliases=())
+
+                self._pools[spec.name] = ContainerPool(spec, start, self._remove)
+            return self._pools[spec.name]
+
+    def release(self, container: DockerContainer) -> None:
+        self.scheduler.forget(container.spec, self._key_of(container.spec))
+        # Session scoped containers are removed together, concurrently, when the session finishes.
+        if container.id not in self._kept and container.spec.scope != "session":
+            self._remove(container)
+
+    def discard_scope(self, key: str) -> None:
+        """Remove containers that were started for a scope, but never handed to a fixture, and release its network."""
+        for future in self.scheduler.pop_scope(key).values():
+            if not future.cancel() and not future.exception():
+                self._remove(future.result())
+        with self._lease_lock:
+            network = self._leases.pop(key, None)
+        if network is not None:
+            with attribute(NETWORK):
+                self.network_pool.release(network)
+
+    def close(self) -> None:
+        if self._events is not None:
+            self._events.close()
+            self._events = None
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
+        self.scheduler.shutdown()
+        self.images.shutdown()
+        self.scheduler.pop_all()
+        with self._lock:
+            containers, self._containers = self._containers, {}
+        if self.xdist is not None and containers and self._reaper is None:
+            # The containers of the other workers carry the same session label: only those of this one.
+            remove_containers(self.client, containers, self.settings.start_workers)
+        if self.xdist is None:
+            # Under pytest-xdist once, by the last worker, with the images all workers used: see _remove_run.
+            self.builds.evict()
+        archives.evict()
+        with self._lock:
+            used = self._network is not None or self._network_pool is not None
+            if self.xdist is not None:
+                # Networks are only pruned by the last worker: the others may still use them.
+                self.xdist.finish(self._remove_run, used, self.builds.used)
+            elif used and self._reaper is None:
+                # By label, so that also containers the session lost track of do not keep the networks alive.
+                with attribute(NETWORK):
+                    remove_session(self.client, self.session_id, self.settings.start_workers)
+            if self._reaper is not None:
+                # The reaper removes the containers and networks while pytest exits. Under pytest-xdist the last
+                # worker already told it to, in _remove_run.
+                if self.xdist is None:
+                    self._reaper.reap()
+                else:
+                    self._reaper.detach()
+                self._reaper = None
+            if self.admission is not None:
+                # Once the containers of this process are removed; also the tickets of containers kept for reuse,
+                # or left to the reaper. The last xdist worker released those of the shared containers.
+                self.admission.release_all()
+                self._tickets.clear()
+            if self.xdist is None:
+                # Under pytest-xdist the controller uses the kept containers until the run finished.
+                for name in self._reused:
+                    self.reuse_ledger.leave(name, self.labels[LABEL_OWNER])
+            self._reused.clear()
+            self._network = None
+            self._network_pool = None
+            self._leases.clear()
+            if self._client is not None:
+                close_client()
+                self._client = None
+
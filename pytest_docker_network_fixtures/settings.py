@@ -0,0 +1,124 @@
+"""Command line and ini settings of the plugin."""
+from __future__ import annotations
+
+import os
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pytest
+
+GROUP = "docker-network-fixtures"
+
+
+def _add(parser: pytest.Parser, name: str, help: str, default: str = "", type: str = "string") -> None:
+    """Register a setting both as ``--docker-fixtures-<name>`` and as ini value ``docker_fixtures_<name>``.
+
+    A setting without a default reads as ``""`` when not set: pytest 7 turns a default of ``None`` into ``[]``.
+    """
+    parser.getgroup(GROUP).addoption(
+        f"--docker-fixtures-{name}",
+        dest=f"docker_fixtures_{name.replace('-', '_')}",
+        default=None,
+        help=help,
+    )
+    parser.addini(f"docker_fixtures_{name.replace('-', '_')}", help=help, type=type, default=default)
+
+
+def _add_flag(parser: pytest.Parser, name: str, help: str) -> None:
+    """Register a boolean setting both as flag ``--docker-fixtures-<name>`` and as ini value."""
+    parser.getgroup(GROUP).addoption(
+        f"--docker-fixtures-{name}", dest=f"docker_fixtures_{name.replace('-', '_')}", action="store_true", help=help
+    )
+    parser.addini(f"docker_fixtures_{name.replace('-', '_')}", help=help, type="bool", default=False)
+
+
+def add_options(parser: pytest.Parser) -> None:
+    _add(parser, "network-prefix", "prefix of the name of the session bridge network", default="pytest-dnf")
+    _add(parser, "network-name", "fixed name of the session bridge network (default: prefix plus random suffix)")
+    _add(parser, "network-pool-size", "number of networks in the pool of per-test networks", default="4")
+    _add(parser, "start-workers", "maximum number of containers started concurrently", default="8")
+    _add(parser, "pull-workers", "maximum number of images pulled concurrently at session start (0: none)", default="4")
+    _add(parser, "api-pool-size", "number of connections to the Docker daemon kept alive", default="32")
+    _add(parser, "build-cache-size", "number of images built from Dockerfiles kept between sessions", default="10")
+    _add_flag(parser, "refresh-snapshots", "seed container snapshots again instead of using existing ones")
+    _add_flag(parser, "reuse", "keep the network and session scoped containers for the next session, and reuse them")
+    _add_flag(parser, "api-stats", "report the Docker API calls per container fixture and endpoint")
+    _add(parser, "durations", "show the N slowest containers and networks, by setup and teardown time (0: all)")
+    _add(parser, "timings-json", "write the setup and teardown time of all containers and networks to this file")
+    _add(
+        parser,
+        "teardown",
+        "'wait' for the session containers and networks to be removed, or remove them in the 'background'",
+        default="wait",
+    )
+    _add(parser, "memory-budget", "megabytes of memory the containers on this host may declare together (0: any)")
+    _add(parser, "cpu-budget", "CPUs the containers on this host may declare together (0: any)")
+    _add(parser, "admission-timeout", "seconds a container waits to fit in the budget", default="600")
+    _add_flag(parser, "group-tests", "run tests that use the same package, module or class scoped containers together")
+    _add_flag(parser, "cleanup-orphans", "first remove the containers and networks of crashed sessions on this host")
+
+
+def _get(config: pytest.Config, name: str) -> Any:
+    key = f"docker_fixtures_{name.replace('-', '_')}"
+    value = config.getoption(key, default=None)
+    if value is None or value is False:
+        value = config.getini(key)
+    return value
+
+
+TEARDOWN_MODES = ("wait", "background")
+REUSE_ENVIRONMENT_VARIABLE = "PYTEST_DOCKER_FIXTURES_REUSE"
+
+
+def _truthy(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    network_prefix: str = "pytest-dnf"
+    network_name: Optional[str] = None
+    network_pool_size: int = 4
+    start_workers: int = 8
+    pull_workers: int = 4
+    api_pool_size: int = 32
+    build_cache_size: int = 10
+    api_stats: bool = False
+    cleanup_orphans: bool = False
+    group_tests: bool = False
+    teardown: str = "wait"
+    memory_budget: int = 0
+    cpu_budget: float = 0.0
+    admission_timeout: float = 600.0
+    durations: Optional[int] = None
+    timings_json: Optional[str] = None
+    refresh_snapshots: bool = False
+    reuse: bool = False
+
+    @classmethod
+    def from_config(cls, config: pytest.Config) -> "Settings":
+        teardown = _get(config, "teardown") or cls.teardown
+        if teardown not in TEARDOWN_MODES:
+            raise pytest.UsageError(f"--docker-fixtures-teardown must be one of {', '.join(TEARDOWN_MODES)}")
+        durations = _get(config, "durations")
+        return cls(
+            network_prefix=_get(config, "network-prefix") or cls.network_prefix,
+            network_name=_get(config, "network-name") or None,
+            network_pool_size=int(_get(config, "network-pool-size") or cls.network_pool_size),
+            start_workers=int(_get(config, "start-workers") or cls.start_workers),
+            pull_workers=int(_get(config, "pull-workers") or 0),
+            api_pool_size=int(_get(config, "api-pool-size") or cls.api_pool_size),
+            build_cache_size=int(_get(config, "build-cache-size") or 0),
+            api_stats=bool(_get(config, "api-stats")),
+            cleanup_orphans=bool(_get(config, "cleanup-orphans")),
+            group_tests=bool(_get(config, "group-tests")),
+            teardown=teardown,
+            memory_budget=int(_get(config, "memory-budget") or 0),
+            cpu_budget=float(_get(config, "cpu-budget") or 0),
+            admission_timeout=float(_get(config, "admission-timeout") or cls.admission_timeout),
+            durations=int(durations) if durations else None,
+            timings_json=_get(config, "timings-json") or None,
+            refresh_snapshots=bool(_get(config, "refresh-snapshots")),
+            reuse=bool(_get(config, "reuse")) or _truthy(os.environ.get(REUSE_ENVIRONMENT_VARIABLE, "")),
+        )
@@ -0,0 +1,113 @@
+"""Snapshots of seeded containers.
+
+A container fixture with a :class:`Snapshot` is seeded once: the seeded container is committed to a local image,
+tagged with a hash of everything that determines its content. Later containers of the fixture, also in later
+sessions, start from that image and skip seeding.
+
+``docker commit`` does not include volumes: the data to snapshot must not be in a ``VOLUME`` of the image (for the
+official Postgres image, point ``PGDATA`` to a directory outside ``/var/lib/postgresql/data``), nor on a tmpfs.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Sequence, Set, Union
+
+from .container import ContainerSpec, DockerContainer
+from .files import content_key, files_configuration
+
+if TYPE_CHECKING:
+    import docker
+
+REPOSITORY = "pytest-dnf-snapshot"
+
+SeedInput = Union[str, bytes, "os.PathLike[str]"]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """How to seed a container fixture, and what the seeded content depends on.
+
+    ``seed`` is called with the started, ready container. ``inputs`` are the seed data: paths (``pathlib.Path``,
+    files or directories) are hashed by content, strings and bytes as they are. Change ``version`` to force a new
+    snapshot when something else changes.
+    """
+
+    seed: Callable[[DockerContainer], None]
+    inputs: Sequence[SeedInput] = ()
+    version: str = ""
+
+
+def snapshot_key(spec: ContainerSpec, image_id: str) -> str:
+    """Hash of the base image, the container configuration and the seed inputs of ``spec``."""
+    assert spec.snapshot is not None
+    digest = hashlib.sha256()
+    seed = spec.snapshot.seed
+    configuration = {
+        "image": image_id,
+        "command": spec.command,
+        "environment": dict(spec.environment),
+        "seed": f"{getattr(seed, '__module__', '')}.{getattr(seed, '__qualname__', repr(seed))}",
+        "version": spec.snapshot.version,
+    }
+    configuration.update(files_configuration(spec.files))
+    digest.update(json.dumps(configuration, sort_keys=True, default=str).encode())
+    for value in spec.snapshot.inputs:
+        digest.update(b"\0")
+        if isinstance(value, bytes):
+            digest.update(value)
+        elif isinstance(value, str):
+            digest.update(value.encode())
+        else:
+            digest.update(content_key(value).encode())
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    """Finds, and creates, the snapshot images of container fixtures.
+
+    With ``refresh``, snapshots from earlier sessions are ignored and replaced.
+    """
+
+    def __init__(self, client: Callable[[], docker.DockerClient], refresh: bool = False) -> None:
+        self._client = client
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._tags: Dict[str, str] = {}
+        self._available: Set[str] = set()
+
+    def tag(self, spec: ContainerSpec, image: str) -> str:
+        """The image reference of the snapshot of ``spec``, which runs ``image``."""
+        with self._lock:
+            if spec.name not in self._tags:
+                image_id = self._client().api.inspect_image(image)["Id"]
+                self._tags[spec.name] = f"{REPOSITORY}:{spec.name}-{snapshot_key(spec, image_id)[:24]}"
+            return self._tags[spec.name]
+
+    def lock(self, tag: str) -> threading.Lock:
+        """Held while looking for, or creating, the snapshot ``tag``: concurrent starts seed only once."""
+        with self._lock:
+            return self._locks.setdefault(tag, threading.Lock())
+
+    def available(self, tag: str) -> bool:
+        from docker.errors import ImageNotFound
+
+        if tag in self._available:
+            return True
+        if self._refresh:
+            return False
+        try:
+            self._client().api.inspect_image(tag)
+        except ImageNotFound:
+            return False
+        self._available.add(tag)
+        return True
+
+    def commit(self, container: DockerContainer, tag: str) -> None:
+        repository, _, name = tag.partition(":")
+        self._client().api.commit(container.id, repository=repository, tag=name)
+        self._available.add(tag)
@@ -0,0 +1,103 @@
+"""Removing the containers and networks of a session in bulk.
+
+Every container and network the plugin creates is labelled with the id of its session and the process that owns
+it: pytest, or under pytest-xdist the controller of the test run, which outlives all workers. At the end of the
+session the remaining containers are removed concurrently, and the networks with one label filtered prune.
+Containers and networks kept for reuse have no session label.
+"""
+from __future__ import annotations
+
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .timing import timings
+
+if TYPE_CHECKING:
+    import docker
+
+LABEL_SESSION = "pytest-dnf.session"
+LABEL_OWNER = "pytest-dnf.owner"
+
+
+def owner(pid: Optional[int] = None) -> str:
+    """Identifies this process, or the process ``pid`` on this host: the host name and the process id."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def session_labels(session_id: str, process: Optional[str] = None) -> Dict[str, str]:
+    """The labels of the resources of a session owned by ``process``, see :func:`owner`; by default this process."""
+    return {LABEL_SESSION: session_id, LABEL_OWNER: process or owner()}
+
+
+def remove_containers(client: docker.DockerClient, container_ids: Iterable[str], max_workers: int) -> None:
+    """Remove containers concurrently; ``force`` kills running containers in the same call."""
+    from docker.errors import NotFound
+
+    def remove(container_id: str) -> None:
+        try:
+            with timings.phase(container_id, "remove"):
+                client.api.remove_container(container_id, force=True, v=True)
+        except NotFound:
+            pass
+
+    container_ids = list(container_ids)
+    if not container_ids:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(container_ids)))) as executor:
+        list(executor.map(remove, container_ids))
+
+
+def remove_session(client: docker.DockerClient, session_id: str, max_workers: int) -> None:
+    """Remove every container and network labelled with ``session_id``."""
+    label = {"label": [f"{LABEL_SESSION}={session_id}"]}
+    remove_containers(client, (c["Id"] for c in client.api.containers(all=True, filters=label)), max_workers)
+    # All networks in one call, reported as one resource.
+    prune = f"prune-{session_id}"
+    timings.register(prune, "network", "", "label filtered prune")
+    with timings.phase(prune, "remove"):
+        client.api.prune_networks(filters=label)
+
+
+def _orphaned(labels: Mapping[str, str]) -> bool:
+    """Whether the process that created a resource is gone."""
+    return gone(labels.get(LABEL_OWNER, ""))
+
+
+def gone(process: str) -> bool:
+    """Whether the process, as identified by :func:`owner`, no longer runs; only known for processes on this host."""
+    host, _, pid = process.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    try:
+        # A process that exited but was not waited for yet, like a crashed xdist worker, keeps its pid as a zombie.
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rpartition(")")[2].split()[0] == "Z"
+    except (OSError, IndexError):
+        return False
+
+
+def remove_orphans(client: docker.DockerClient, max_workers: int) -> Tuple[int, int]:
+    """Remove the containers and networks of crashed sessions on this host; returns how many of each."""
+    from docker.errors import APIError
+
+    label = {"label": [LABEL_SESSION]}
+    containers = [c["Id"] for c in client.api.containers(all=True, filters=label) if _orphaned(c["Labels"] or {})]
+    remove_containers(client, containers, max_workers)
+    networks: List[str] = []
+    for network in client.api.networks(filters=label):
+        if _orphaned(network.get("Labels") or {}):
+            try:
+                client.api.remove_network(network["Id"])
+            except APIError:
+                # Still used by a container of someone else.
+                continue
+            networks.append(network["Id"])
+    return len(containers), len(networks)
@@ -0,0 +1,81 @@
+"""Phase level timings of the containers and networks of the session, for the setup cost report.
+
+Every container records how long its image took (waiting for the pull, or the build), waiting to fit in the
+resource budget, creating and starting it, becoming ready and removing it; every network how long creating and
+removing it took. Resources are identified by their Docker id, so phases can be recorded by code that only knows the
+id, like the bulk teardown.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+PHASES = ("image", "queue", "create", "ready", "remove")
+
+
+@dataclass
+class ResourceTimings:
+    kind: str
+    """``container`` or ``network``."""
+    fixture: str
+    name: str
+    phases: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+
+class Timings:
+    """Thread safe store of the timings by resource id."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.resources: Dict[str, ResourceTimings] = {}
+
+    def register(self, resource_id: str, kind: str, fixture: str, name: str) -> None:
+        with self._lock:
+            self.resources.setdefault(resource_id, ResourceTimings(kind, fixture, name))
+
+    def add(self, resource_id: str, phase: str, seconds: float) -> None:
+        """Add ``seconds`` to ``phase`` of the resource; ignored for resources that were not registered."""
+        with self._lock:
+            resource = self.resources.get(resource_id)
+            if resource is not None:
+                resource.phases[phase] = resource.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, resource_id: str, phase: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(resource_id, phase, time.monotonic() - start)
+
+    def slowest(self, count: Optional[int] = None) -> List[ResourceTimings]:
+        """The resources by total time, slowest first; all of them unless ``count`` is given."""
+        with self._lock:
+            resources = sorted(self.resources.values(), key=lambda resource: -resource.seconds)
+        return resources[:count] if count else resources
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            return {resource_id: asdict(resource) for resource_id, resource in self.resources.items()}
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """Add timings from :meth:`to_json` of another process, i.e. a pytest-xdist worker."""
+        for resource_id, record in data.items():
+            self.register(resource_id, record["kind"], record["fixture"], record["name"])
+            for phase, seconds in record["phases"].items():
+                self.add(resource_id, phase, seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.resources.clear()
+
+
+#: The timings of this process.
+timings = Timings()
@@ -0,0 +1,110 @@
+"""Sharing the network and shared containers between pytest-xdist workers.
+
+The first worker that needs a resource creates it and records it in a JSON state file, keyed by the xdist
+testrun uid; the other workers attach to it. The last worker to finish removes everything.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, TypeVar
+
+from filelock import FileLock
+
+from .paths import STATE_DIRECTORY
+
+T = TypeVar("T")
+State = Dict[str, Any]
+
+
+class XdistCoordinator:
+    def __init__(self, testrun_uid: str, worker_id: str, worker_count: int, directory: Optional[Path] = None) -> None:
+        self.testrun_uid = testrun_uid
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.directory = directory or STATE_DIRECTORY
+        self._state_path = self.directory / f"{testrun_uid}.json"
+        self._lock = FileLock(str(self.directory / f"{testrun_uid}.lock"))
+
+    @classmethod
+    def from_environment(cls) -> Optional["XdistCoordinator"]:
+        """The coordinator for this process, or ``None`` when not running as an xdist worker."""
+        worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+        testrun_uid = os.environ.get("PYTEST_XDIST_TESTRUNUID")
+        if not worker_id or not testrun_uid:
+            return None
+        return cls(testrun_uid, worker_id, int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1")))
+
+    def _read(self) -> State:
+        try:
+            return json.loads(self._state_path.read_text())
+        except FileNotFoundError:
+            return {"network": None, "containers": {}, "finished": [], "used": False, "builds": {}}
+
+    def _write(self, state: State) -> None:
+        tmp = self._state_path.with_suffix(f".{self.worker_id}.tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._state_path)
+
+    def _resource(
+        self,
+        section: str,
+        name: Optional[str],
+        create: Callable[[], T],
+        dump: Callable[[T], Any],
+        load: Callable[[Any], T],
+    ) -> T:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # A lock per resource: creating one resource does not block workers waiting for another one.
+        with FileLock(str(self.directory / f"{self.testrun_uid}-{section}-{name or ''}.lock")):
+            with self._lock:
+                state = self._read()
+                record = state[section] if name is None else state[section].get(name)
+            if record is not None:
+                return load(record)
+            resource = create()
+            with self._lock:
+                state = self._read()
+                if name is None:
+                    state[section] = dump(resource)
+                else:
+                    state[section][name] = dump(resource)
+                self._write(state)
+            return resource
+
+    def network(self, create: Callable[[], T], dump: Callable[[T], Any], load: Callable[[Any], T]) -> T:
+        """Create the session network, or load the one another worker created."""
+        return self._resource("network", None, create, dump, load)
+
+    def container(self, name: str, create: Callable[[], T], dump: Callable[[T], Any], load: Callable[[Any], T]) -> T:
+        """Start the shared container ``name``, or attach to the one another worker started."""
+        return self._resource("containers", name, create, dump, load)
+
+    def finish(
+        self, cleanup: Callable[[State], None], used: bool, builds: Optional[Mapping[str, float]] = None
+    ) -> None:
+        """Mark this worker finished; the last worker calls ``cleanup`` with the shared state.
+
+        ``used`` tells whether the worker created anything, so that the cleanup can skip contacting the daemon
+        when no worker did. ``builds`` is when the worker last used the images it built, by tag; the state has
+        those of all workers, see :meth:`.build.BuildCache.evict`.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = self._read()
+            state["used"] = state["used"] or used
+            for tag, last_used in (builds or {}).items():
+                state["builds"][tag] = max(last_used, state["builds"].get(tag, 0.0))
+            if self.worker_id not in state["finished"]:
+                state["finished"].append(self.worker_id)
+            if len(state["finished"]) < self.worker_count:
+                self._write(state)
+                return
+            try:
+                cleanup(state)
+            finally:
+                self._state_path.unlink(missing_ok=True)
+                for path in self.directory.glob(f"{self.testrun_uid}-*.lock"):
+                    path.unlink(missing_ok=True)
+        Path(self._lock.lock_file).unlink(missing_ok=True)
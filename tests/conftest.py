@@ -0,0 +1,36 @@
+"""The tests run the plugin against the stub Docker API of ``benchmarks/fake_docker.py``.
+
+Test projects run with pytester in a fresh interpreter, which finds the stub through ``DOCKER_HOST``, and keeps
+its state directory (see :mod:`pytest_docker_network_fixtures.paths`) in the temporary directory of the test.
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from fake_docker import FakeDocker  # noqa: E402
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def fake_docker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeDocker]:
+    # A Unix socket path is limited to about 100 characters, too short for some temporary paths of pytest.
+    directory = tempfile.mkdtemp(prefix="dnf-")
+    socket_path = f"{directory}/docker.sock"
+    state = tmp_path / "tmp"
+    state.mkdir()
+    monkeypatch.setenv("DOCKER_HOST", f"unix://{socket_path}")
+    monkeypatch.setenv("TMPDIR", str(state))
+    try:
+        with FakeDocker(socket_path) as docker:
+            yield docker
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
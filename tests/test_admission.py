@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from pytest_docker_network_fixtures import ContainerStartError, Resources
+from pytest_docker_network_fixtures.admission import Admission
+from pytest_docker_network_fixtures.teardown import owner
+
+
+def test_resources():
+    assert Resources(512, 1) + Resources(256, 0.5) == Resources(768, 1.5)
+    assert Resources(512, 1).within(Resources(512, 2))
+    assert not Resources(1024, 1).within(Resources(512, 2))
+    # A budget of 0 leaves that resource unlimited.
+    assert Resources(1024, 4).within(Resources(0, 4))
+
+
+def test_admits_what_fits(tmp_path):
+    admission = Admission(Resources(memory=1024), timeout=0.3, directory=tmp_path)
+    admission.acquire("a", Resources(memory=512))
+    admission.acquire("b", Resources(memory=512))
+    with pytest.raises(ContainerStartError, match="did not fit"):
+        admission.acquire("c", Resources(memory=512))
+
+
+def test_admits_a_container_larger_than_the_budget_alone(tmp_path):
+    admission = Admission(Resources(memory=1024), timeout=0.3, directory=tmp_path)
+    ticket = admission.acquire("a", Resources(memory=2048))
+    with pytest.raises(ContainerStartError):
+        admission.acquire("b", Resources(memory=1))
+    admission.release(ticket)
+    admission.acquire("b", Resources(memory=1))
+
+
+def test_in_order_of_arrival(tmp_path):
+    admission = Admission(Resources(memory=1024), timeout=5, directory=tmp_path)
+    ticket = admission.acquire("running", Resources(memory=768))
+    admitted = []
+
+    def acquire(name, memory):
+        admission.acquire(name, Resources(memory=memory))
+        admitted.append(name)
+
+    large = threading.Thread(target=acquire, args=("large", 512))
+    large.start()
+    time.sleep(0.1)
+    # Fits next to the running container, but must not overtake the large one.
+    small = threading.Thread(target=acquire, args=("small", 256))
+    small.start()
+    time.sleep(0.3)
+    assert admitted == []
+    admission.release(ticket)
+    large.join()
+    small.join()
+    assert admitted == ["large", "small"]
+
+
+def test_release_all_leaves_tickets_of_other_holders(tmp_path):
+    admission = Admission(Resources(memory=1024), timeout=0.3, directory=tmp_path)
+    admission.acquire("shared", Resources(memory=768), holder=owner(os.getppid()))
+    admission.acquire("own", Resources(memory=256))
+    admission.release_all()
+    assert [entry["name"] for entry in json.loads((tmp_path / "admission.json").read_text())] == ["shared"]
+
+
+def test_drops_entries_of_processes_that_no_longer_run(tmp_path):
+    process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    crashed = {"ticket": "1", "owner": owner(int(process.stdout)), "name": "crashed", "memory": 1024, "cpus": 0}
+    (tmp_path / "admission.json").write_text(json.dumps([{**crashed, "admitted": True}]))
+    admission = Admission(Resources(memory=1024), timeout=0.3, directory=tmp_path)
+    admission.acquire("next", Resources(memory=1024))
+
+
+def test_gets_back_in_line_when_dropped_from_the_ledger(tmp_path):
+    admission = Admission(Resources(memory=1024), timeout=5, directory=tmp_path)
+    ticket = admission.acquire("running", Resources(memory=1024))
+    waiting = threading.Thread(target=admission.acquire, args=("waiting", Resources(memory=1024)))
+    waiting.start()
+    time.sleep(0.1)
+    (tmp_path / "admission.json").write_text("not json")
+    time.sleep(0.3)
+    admission.release(ticket)
+    waiting.join()
+    assert [entry["name"] for entry in json.loads((tmp_path / "admission.json").read_text())] == ["waiting"]
+
+
+@pytest.mark.parametrize("args", [pytest.param([], id="single"), pytest.param(["-n", "2"], id="xdist")])
+def test_budget_of_a_session(pytester, fake_docker, tmp_path, args):
+    if "-n" in args:
+        pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import Resources, container_fixture
+
+        database = container_fixture("database", "postgres:16", shared=True, resources=Resources(memory=512))
+        app = container_fixture("app", "my/app", scope="function", resources=Resources(memory=512))
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("n", range(4))
+        def test_app(database, app, n):
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess("--docker-fixtures-memory-budget=1536", *args)
+    result.assert_outcomes(passed=4)
+    ledger = tmp_path / "tmp" / "pytest-docker-network-fixtures" / "admission.json"
+    assert json.loads(ledger.read_text()) == []
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("pytest_asyncio")
+pytest.importorskip("aiohttp")
+
+CONFTEST = """
+from pytest_docker_network_fixtures import ExecProbe
+from pytest_docker_network_fixtures.aio import async_container_fixture
+
+one = async_container_fixture("one", "my/app", scope="function", probes=[ExecProbe("true")])
+two = async_container_fixture("two", "my/app", scope="function")
+three = async_container_fixture("three", "my/app", scope="function", depends_on=["one"])
+broken = async_container_fixture("broken", "my/app", scope="function", files={"/etc/app": "missing"})
+"""
+
+INI = """
+[pytest]
+asyncio_default_fixture_loop_scope = session
+"""
+
+
+def test_async_fixtures(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makeini(INI)
+    pytester.makepyfile(
+        """
+        import pytest
+
+        pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+        async def test_concurrent(one, two, three):
+            assert one.readiness.seconds is not None
+            assert {one.network, two.network, three.network} == {one.network}
+
+        # The fixtures are set up in order: the containers of one and two start ahead, along with broken.
+        async def test_broken(broken, one, two):
+            pass
+
+        async def test_after(docker_async_client):
+            assert await docker_async_client.request("GET", "/containers/json", params={"all": "1"}) == []
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=2, errors=1)
+    assert not [call for call in fake_docker.calls if "None" in call]
+    assert fake_docker.containers == {}
+    assert fake_docker.networks == {}
@@ -0,0 +1,64 @@
+import pytest
+
+CONFTEST = """
+from pathlib import Path
+
+from pytest_docker_network_fixtures import Build, container_fixture
+
+app = container_fixture("app", build=Build(Path(__file__).parent / "app"))
+"""
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(4))
+def test_app(app, n):
+    pass
+"""
+
+
+@pytest.fixture
+def project(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    pytester.mkdir("app")
+    (pytester.path / "app" / "Dockerfile").write_text("FROM alpine\nCOPY main.py /\n")
+    (pytester.path / "app" / "main.py").write_text("print('1')\n")
+    (pytester.path / "app" / ".dockerignore").write_text("*.log\n")
+    return pytester
+
+
+def built(fake_docker):
+    return sorted(tag for tag in fake_docker.images if tag.startswith("pytest-dnf-build:app-"))
+
+
+def test_built_once_and_reused(project, fake_docker):
+    project.runpytest_subprocess().assert_outcomes(passed=4)
+    assert fake_docker.calls["POST /build"] == 1
+    assert len(built(fake_docker)) == 1
+    # Ignored files are not part of the content.
+    (project.path / "app" / "build.log").write_text("...")
+    project.runpytest_subprocess().assert_outcomes(passed=4)
+    assert fake_docker.calls["POST /build"] == 1
+
+
+def test_changed_context_is_built_again(project, fake_docker):
+    project.runpytest_subprocess().assert_outcomes(passed=4)
+    (first,) = built(fake_docker)
+    (project.path / "app" / "main.py").write_text("print('2')\n")
+    project.runpytest_subprocess().assert_outcomes(passed=4)
+    assert fake_docker.calls["POST /build"] == 2
+    assert first in built(fake_docker) and len(built(fake_docker)) == 2
+
+
+@pytest.mark.parametrize("args", [pytest.param([], id="single"), pytest.param(["-n", "2"], id="xdist")])
+def test_least_recently_used_images_are_evicted(project, fake_docker, args):
+    if "-n" in args:
+        pytest.importorskip("xdist")
+    tags = []
+    for version in range(3):
+        (project.path / "app" / "main.py").write_text(f"print({version})\n")
+        project.runpytest_subprocess("--docker-fixtures-build-cache-size=2", *args).assert_outcomes(passed=4)
+        tags.append(next(tag for tag in built(fake_docker) if tag not in tags))
+    assert built(fake_docker) == sorted(tags[1:])
+    assert fake_docker.calls["DELETE /images/{id}"] == 1
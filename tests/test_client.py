@@ -0,0 +1,65 @@
+import pytest
+
+from pytest_docker_network_fixtures.client import ApiMetrics, endpoint
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16")
+app = container_fixture("app", "my/app", scope="function", depends_on=["database"])
+"""
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(4))
+def test_app(app, n):
+    pass
+"""
+
+
+def test_endpoint():
+    assert endpoint("GET", "http+docker://localhost/v1.43/containers/abc/json") == "GET /containers/{id}/json"
+    assert endpoint("POST", "http+docker://localhost/v1.43/containers/create?name=x") == "POST /containers/create"
+    assert endpoint("GET", "http+docker://localhost/v1.43/images/my/app:1/json") == "GET /images/{name}/json"
+
+
+def test_merge():
+    metrics, worker = ApiMetrics(), ApiMetrics()
+    metrics.record("app", "POST /containers/create", 0.01)
+    worker.record("app", "POST /containers/create", 0.03)
+    worker.record("-", "GET /_ping", 0.001)
+    metrics.merge(worker.to_json())
+    stats = metrics.stats[("app", "POST /containers/create")]
+    assert (stats.calls, stats.max_seconds) == (2, 0.03)
+    assert stats.seconds == pytest.approx(0.04)
+    assert metrics.total_calls() == 3
+
+
+@pytest.mark.parametrize("args", [pytest.param([], id="single"), pytest.param(["-n", "2"], id="xdist")])
+def test_api_stats(pytester, fake_docker, args):
+    if "-n" in args:
+        pytest.importorskip("xdist")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess("--docker-fixtures-api-stats", *args)
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(["*Docker API calls: *", "*calls*fixture / endpoint"])
+    # Every test starts an app container, whichever worker runs it.
+    result.stdout.fnmatch_lines(["      4 * app / POST /containers/create"])
+
+
+def test_connections_are_kept_alive(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        from pytest_docker_network_fixtures.client import get_client
+
+        def test_client(docker_client):
+            assert docker_client is get_client()
+        """,
+        test_app=TESTS,
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=5)
+    assert fake_docker.connections < sum(fake_docker.calls.values()) / 4
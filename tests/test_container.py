@@ -0,0 +1,42 @@
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+app = container_fixture("app", "my/app", ports={80: None}, aliases=["web"])
+"""
+
+
+def test_network_attributes_without_api_calls(pytester, fake_docker):
+    fake_docker.add_image("my/app")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("n", range(5))
+        def test_app(app, n):
+            assert app.ip_address == "172.30.0.2"
+            assert app.network_info.aliases == ("app", "web")
+            host, port = app.address(80)
+            assert app.ports == {"80/tcp": (host, port)}
+            assert app.address(8080) == ("172.30.0.2", 8080)
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=5)
+    # Once, when the container became ready.
+    assert fake_docker.calls["GET /containers/{id}/json"] == 1
+
+
+def test_restart_updates_the_network_attributes(pytester, fake_docker):
+    fake_docker.add_image("my/app")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        def test_restart(app, docker_client):
+            before = app.address(80)
+            app.restart(docker_client)
+            assert app.address(80) != before
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,47 @@
+def test_healthcheck_is_not_polled(pytester, fake_docker):
+    fake_docker.add_image("my/app")
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        app = container_fixture("app", "my/app", create_kwargs={"healthcheck": {"test": ["CMD", "true"]}})
+        """
+    )
+    pytester.makepyfile(
+        """
+        def test_app(app):
+            assert app.readiness.seconds >= 0.2
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
+    # Healthy after 0.2 seconds: inspected when created, when the health status changed, and again on the start event
+    # when it arrived after the first inspect. Polling with the default backoff would inspect at least four times.
+    assert fake_docker.calls["GET /containers/{id}/json"] <= 3
+    assert fake_docker.calls["GET /events"] == 1
+
+
+def test_restart_by_the_daemon_refreshes_the_network_attributes(pytester, fake_docker):
+    fake_docker.add_image("my/app")
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        app = container_fixture("app", "my/app", ports={80: None})
+        """
+    )
+    pytester.makepyfile(
+        """
+        import time
+
+        def test_restart(app, docker_client):
+            before = app.address(80)
+            docker_client.api.restart(app.id)
+            deadline = time.monotonic() + 5
+            while app.address(80) == before and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert app.address(80) != before
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,61 @@
+import os
+import time
+
+from pytest_docker_network_fixtures.files import ArchiveCache, content_key
+
+
+def test_content_key(tmp_path):
+    (tmp_path / "a.sql").write_text("create table a ();")
+    (tmp_path / "b.sql").write_text("create table b ();")
+    key = content_key(tmp_path)
+    os.utime(tmp_path / "a.sql", (0, 0))
+    assert content_key(tmp_path) == key
+    (tmp_path / "b.sql").write_text("create table c ();")
+    assert content_key(tmp_path) != key
+
+
+def test_unused_archives_are_evicted(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "a.sql").write_text("create table a ();")
+    cache = ArchiveCache(tmp_path / "archives")
+    archive = cache.archive(source)
+    assert cache.archive(source) == archive
+    cache.evict()
+    assert archive.exists()
+    os.utime(archive, (time.time() - 7200,) * 2)
+    cache.evict(max_age=3600)
+    assert not archive.exists()
+
+
+def test_a_directory_is_copied_in_one_call(pytester, fake_docker, tmp_path):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        database = container_fixture(
+            "database", "postgres:16", scope="function", files={"/docker-entrypoint-initdb.d": "sql"}
+        )
+        """
+    )
+    pytester.mkdir("sql")
+    for name in ["1-schema.sql", "2-data.sql", "3-users.sql"]:
+        (pytester.path / "sql" / name).write_text(f"-- {name}")
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("n", range(3))
+        def test_database(database, n):
+            pass
+        """
+    )
+    pytester.runpytest_subprocess().assert_outcomes(passed=3)
+    assert fake_docker.calls["PUT /containers/{id}/archive"] == 3
+    for archives in fake_docker.archives.values():
+        assert archives == [("/docker-entrypoint-initdb.d", ["1-schema.sql", "2-data.sql", "3-users.sql"])]
+    # One archive, also for the next session.
+    directory = tmp_path / "tmp" / "pytest-docker-network-fixtures" / "archives"
+    (archive,) = directory.iterdir()
+    pytester.runpytest_subprocess().assert_outcomes(passed=3)
+    assert list(directory.iterdir()) == [archive]
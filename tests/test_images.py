@@ -0,0 +1,44 @@
+import pytest
+
+from pytest_docker_network_fixtures.images import normalize
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16")
+replica = container_fixture("replica", "docker.io/library/postgres:16")
+app = container_fixture("app", "my/app", scope="function", depends_on=["database"])
+"""
+
+
+@pytest.mark.parametrize(
+    "reference, expected",
+    [
+        ("postgres", "postgres:latest"),
+        ("docker.io/library/postgres:16", "postgres:16"),
+        ("index.docker.io/my/app", "my/app:latest"),
+        ("localhost:5000/app", "localhost:5000/app:latest"),
+        ("postgres:16@sha256:abc", "postgres@sha256:abc"),
+    ],
+)
+def test_normalize(reference, expected):
+    assert normalize(reference) == expected
+
+
+def test_images_are_pulled_once(pytester, fake_docker):
+    fake_docker.add_image("my/app")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("n", range(3))
+        def test_app(app, replica, n):
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=3)
+    # postgres:16 under two names, and my/app is present already.
+    assert fake_docker.calls["POST /images/create"] == 1
+    assert set(fake_docker.images) == {"my/app:latest", "postgres:16"}
@@ -0,0 +1,38 @@
+import pytest
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16")
+cache = container_fixture("cache", "redis:7")
+app = container_fixture("app", "my/app", depends_on=["database"])
+"""
+
+TESTS = """
+def test_plain():
+    pass
+
+def test_app(app):
+    pass
+
+def test_cache(cache):
+    pass
+"""
+
+
+@pytest.mark.parametrize("args", [["-k", "plain"], ["--collect-only"], ["--setup-plan"]])
+def test_nothing_contacts_the_daemon(pytester, fake_docker, args):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess(*args)
+    assert result.ret == 0
+    assert fake_docker.calls == {}
+
+
+def test_only_the_containers_of_selected_tests(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess("-k", "app")
+    result.assert_outcomes(passed=1, deselected=2)
+    assert set(fake_docker.images) == {"postgres:16", "my/app:latest"}
+    assert fake_docker.calls["POST /containers/create"] == 2
@@ -0,0 +1,32 @@
+def test_one_network_for_the_session(pytester, fake_docker):
+    pytester.makepyfile(
+        test_a="""
+        def test_a(docker_network):
+            assert docker_network.name.startswith("ci-")
+        """,
+        test_b="""
+        def test_b(docker_client, docker_network):
+            assert docker_client.api.inspect_network(docker_network.id)["Name"] == docker_network.name
+        """,
+    )
+    result = pytester.runpytest_subprocess("--docker-fixtures-network-prefix=ci")
+    result.assert_outcomes(passed=2)
+    assert fake_docker.calls["POST /networks/create"] == 1
+    assert fake_docker.networks == {}
+
+
+def test_fixed_network_name(pytester, fake_docker):
+    pytester.makeini(
+        """
+        [pytest]
+        docker_fixtures_network_name = fixed
+        """
+    )
+    pytester.makepyfile(
+        """
+        def test_name(docker_network):
+            assert docker_network.name == "fixed"
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,45 @@
+import os
+
+import docker
+import pytest
+
+from pytest_docker_network_fixtures import ContainerSpec, NetworkLeaseError
+from pytest_docker_network_fixtures.container import create_container
+from pytest_docker_network_fixtures.network_pool import NetworkPool
+
+
+@pytest.fixture
+def client(fake_docker):
+    client = docker.DockerClient(base_url=os.environ["DOCKER_HOST"])
+    yield client
+    client.close()
+
+
+def test_lease_and_release(client, fake_docker):
+    fake_docker.add_image("my/app")
+    pool = NetworkPool(lambda: client, "test", size=2)
+    with pool.leased() as network:
+        create_container(client, ContainerSpec("app", "my/app"), network)
+    assert len(fake_docker.networks) == 2
+    assert fake_docker.calls["POST /networks/{id}/disconnect"] == 1
+    assert network in {pool.lease(), pool.lease()}
+
+
+def test_lease_times_out(client):
+    pool = NetworkPool(lambda: client, "test", size=1, timeout=0.1)
+    pool.lease()
+    with pytest.raises(NetworkLeaseError, match="network-pool-size"):
+        pool.lease()
+
+
+def test_release_replaces_a_network_it_cannot_disconnect(client, fake_docker, monkeypatch):
+    pool = NetworkPool(lambda: client, "test", size=1, timeout=0.1)
+    network = pool.lease()
+
+    def fail(network):
+        raise docker.errors.APIError("disconnect failed")
+
+    monkeypatch.setattr(pool, "disconnect_all", fail)
+    pool.release(network)
+    assert pool.lease() != network
+    assert len(fake_docker.networks) == 2
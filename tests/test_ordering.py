@@ -0,0 +1,47 @@
+CONFTEST = """
+import pytest
+
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16", scope="module")
+
+ORDER = ["test_a1", "test_b1", "test_plain", "test_a2", "test_b2"]
+
+# Interleaved, as a plugin that shuffles the tests might.
+def pytest_collection_modifyitems(items):
+    items.sort(key=lambda item: ORDER.index(item.name))
+"""
+
+
+def test_group_tests(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        test_a="""
+        def test_a1(database):
+            pass
+
+        def test_plain():
+            pass
+
+        def test_a2(database):
+            pass
+        """,
+        test_b="""
+        def test_b1(database):
+            pass
+
+        def test_b2(database):
+            pass
+        """,
+    )
+    result = pytester.runpytest_subprocess("--docker-fixtures-group-tests", "--collect-only", "-q")
+    result.stdout.fnmatch_lines(
+        [
+            "test_a.py::test_a1",
+            "test_a.py::test_a2",
+            "test_a.py::test_plain",
+            "test_b.py::test_b1",
+            "test_b.py::test_b2",
+        ],
+        consecutive=True,
+    )
@@ -0,0 +1,10 @@
+import subprocess
+import sys
+
+from import_time import HEAVY, MODULE
+
+
+def test_import_loads_no_fixture_dependencies():
+    code = f"import sys, pytest, {MODULE}; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert set(result.stdout.split()).isdisjoint(HEAVY)
@@ -0,0 +1,70 @@
+def test_options_of_container_fixture(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pathlib import Path
+
+        from pytest_docker_network_fixtures import pooled_container_fixture
+
+        worker = pooled_container_fixture(
+            "worker", "my/worker", size=2, ports=None, environment=None, files={"/etc/worker": Path("config")}
+        )
+        """
+    )
+    pytester.mkdir("config")
+    pytester.makepyfile(
+        """
+        def test_worker(worker):
+            assert worker.spec.files == {"/etc/worker": "config"}
+            assert worker.spec.ports == {}
+            assert worker.spec.scope == "function"
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
+    assert {path for archives in fake_docker.archives.values() for path, _ in archives} == {"/etc/worker"}
+
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(4))
+def test_worker(worker, request, n):
+    (request.config.rootpath / f"test-{n}").write_text(worker.id)
+"""
+
+
+def test_reset_containers_are_handed_out_again(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import pooled_container_fixture
+
+        def reset(container):
+            pass
+
+        worker = pooled_container_fixture("worker", "my/worker", size=2, reset=reset)
+        """
+    )
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=4)
+    assert fake_docker.calls["POST /containers/create"] == 2
+    assert len({path.read_text() for path in pytester.path.glob("test-*")}) == 2
+    assert fake_docker.containers == {}
+
+
+def test_containers_are_replaced_without_reset(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import pooled_container_fixture
+
+        def reset(container):
+            raise RuntimeError("cannot reset")
+
+        worker = pooled_container_fixture("worker", "my/worker", size=2, reset=reset)
+        """
+    )
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=4)
+    assert len({path.read_text() for path in pytester.path.glob("test-*")}) == 4
+    assert fake_docker.containers == {}
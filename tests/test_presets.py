@@ -0,0 +1,29 @@
+import pytest
+
+from pytest_docker_network_fixtures import presets
+
+
+@pytest.mark.parametrize("preset", [presets.postgres, presets.mysql, presets.mariadb])
+def test_data_directory_on_disk(preset):
+    assert preset(tmpfs_size=None)["tmpfs"] == {}
+
+
+def test_postgres_on_a_tmpfs(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture, presets
+
+        postgres = container_fixture("postgres", **presets.postgres(tmpfs_size="1g"))
+        """
+    )
+    pytester.makepyfile(
+        """
+        def test_postgres(postgres, docker_client, docker_network):
+            host = docker_client.api.inspect_container(postgres.id)["HostConfig"]
+            assert host["Tmpfs"] == {"/var/lib/postgresql/data": "size=1g"}
+            assert host["NetworkMode"] == docker_network.name
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
+    assert fake_docker.calls["POST /exec/{id}/start"] >= 1
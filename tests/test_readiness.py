@@ -0,0 +1,205 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+
+import docker
+import pytest
+
+from pytest_docker_network_fixtures import (
+    Backoff,
+    ContainerSpec,
+    ContainerStartError,
+    ExecProbe,
+    HealthcheckProbe,
+    LogProbe,
+    Probe,
+    TcpProbe,
+)
+from pytest_docker_network_fixtures.container import DockerContainer, create_container
+from pytest_docker_network_fixtures.events import ContainerEvents
+from pytest_docker_network_fixtures.network import DockerNetwork, create_network
+from pytest_docker_network_fixtures.readiness import wait_until_ready
+
+HEALTHCHECK = {"healthcheck": {"test": ["CMD", "true"], "interval": 50_000_000}}
+
+
+@pytest.fixture
+def client(fake_docker):
+    client = docker.DockerClient(base_url=os.environ["DOCKER_HOST"])
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def labels():
+    return {"test": uuid.uuid4().hex}
+
+
+@pytest.fixture
+def events(client, labels):
+    events = ContainerEvents(client, {"label": [f"test={labels['test']}"]})
+    yield events
+    events.close()
+
+
+@pytest.fixture
+def start(client, labels, fake_docker):
+    fake_docker.add_image("my/app")
+    network = create_network(client, f"test-{uuid.uuid4().hex[:12]}")
+
+    def start(**options):
+        spec = ContainerSpec("app", "my/app", **options)
+        return create_container(client, spec, network, labels=labels)
+
+    return start
+
+
+def test_probe_must_check():
+    class Incomplete(Probe):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_custom_probe(client, start, events):
+    class Always(Probe):
+        def check(self, client, container):
+            return True
+
+    container = start(probes=(Always(),), startup_timeout=5)
+    assert wait_until_ready(client, container, events).seconds is not None
+
+
+def test_exec_probe(client, start, events):
+    container = start(probes=(ExecProbe("true"),), startup_timeout=5)
+    readiness = wait_until_ready(client, container, events)
+    assert readiness.probes[0].attempts == 1
+
+
+def test_exec_probe_not_ready(client, start, events):
+    container = start(probes=(ExecProbe("false"),), startup_timeout=0.5)
+    with pytest.raises(ContainerStartError, match="not ready"):
+        wait_until_ready(client, container, events)
+
+
+def test_health_checks_do_not_cut_the_backoff_short(client, start, events):
+    # The health checks send exec events every 50 ms; the probe still waits out its growing intervals.
+    backoff = Backoff(initial=0.05, factor=2, maximum=1, jitter=0)
+    container = start(probes=(ExecProbe("false"),), startup_timeout=1, backoff=backoff, create_kwargs=HEALTHCHECK)
+    with pytest.raises(ContainerStartError):
+        wait_until_ready(client, container, events)
+    assert container.readiness.probes[0].attempts <= 6
+
+
+def test_healthy_container_is_noticed_by_its_event(client, start, events, fake_docker):
+    container = start(probes=(HealthcheckProbe(),), startup_timeout=5, create_kwargs=HEALTHCHECK)
+    fake_docker.calls.clear()
+    readiness = wait_until_ready(client, container, events)
+    assert readiness.seconds is not None
+    # Inspected once before the container is healthy, and once more on its health_status event.
+    assert fake_docker.calls["GET /containers/{id}/json"] <= 3
+
+
+def test_log_probe_is_woken_by_the_match(client, start, events):
+    # The stub writes the output 0.2 seconds after the start, long before the next attempt is due.
+    backoff = Backoff(initial=2, jitter=0)
+    container = start(probes=(LogProbe("ready"),), environment={"LOG": "starting\nready"}, backoff=backoff)
+    readiness = wait_until_ready(client, container, events)
+    assert readiness.seconds < 1
+    assert readiness.probes[0].attempts == 2
+
+
+def test_log_probe_notices_a_container_that_exits(client, start, events, fake_docker):
+    container = start(probes=(LogProbe("ready"),), backoff=Backoff(initial=2, jitter=0), startup_timeout=5)
+    threading.Timer(0.2, client.api.remove_container, [container.id], {"force": True}).start()
+    started = time.monotonic()
+    with pytest.raises(docker.errors.NotFound):
+        wait_until_ready(client, container, events)
+    assert time.monotonic() - started < 1
+
+
+def test_restart_waits_for_the_output_of_the_new_run(client, start, events):
+    container = start(probes=(LogProbe("ready"),), environment={"LOG": "ready"}, backoff=Backoff(initial=0.02))
+    wait_until_ready(client, container, events)
+    started = time.monotonic()
+    container.restart(client)
+    # The ready line of the first run is still in the log; the one of the new run is written 0.2 seconds later.
+    assert time.monotonic() - started >= 0.15
+
+
+@pytest.fixture
+def listen():
+    servers = []
+
+    def listen(hold):
+        """A port on which connections are accepted, and held open or closed right away like the Docker proxy does."""
+        server = socket.create_server(("127.0.0.1", 0))
+        servers.append(server)
+
+        def serve():
+            held = []
+            while True:
+                try:
+                    connection, _ = server.accept()
+                except OSError:
+                    break
+                held.append(connection) if hold else connection.close()
+
+        threading.Thread(target=serve, daemon=True).start()
+        return server.getsockname()[1]
+
+    yield listen
+    for server in servers:
+        server.close()
+
+
+def free_port():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        return server.getsockname()[1]
+
+
+def published(ip_address, port, host_port):
+    network = DockerNetwork(name="test", id="test")
+    container = DockerContainer(spec=ContainerSpec("app", "my/app"), id="app", name="app", network=network)
+    container.attrs = {
+        "NetworkSettings": {
+            "Networks": {"test": {"IPAddress": ip_address}},
+            "Ports": {f"{port}/tcp": [{"HostIp": "127.0.0.1", "HostPort": str(host_port)}]},
+        }
+    }
+    return container
+
+
+def tcp_check(probe, container, asynchronous):
+    if not asynchronous:
+        return probe.check(None, container)
+    pytest.importorskip("aiohttp")
+    from pytest_docker_network_fixtures.aio import check
+
+    return asyncio.run(check(probe, None, container))
+
+
+ASYNCHRONOUS = [pytest.param(False, id="sync"), pytest.param(True, id="async")]
+
+
+@pytest.mark.parametrize("asynchronous", ASYNCHRONOUS)
+def test_tcp_probe_prefers_the_container_address(listen, asynchronous):
+    port = listen(hold=True)
+    assert tcp_check(TcpProbe(port), published("127.0.0.1", port, listen(hold=False)), asynchronous)
+    # The proxy accepts the connection, but nothing listens in the container.
+    port = free_port()
+    assert not tcp_check(TcpProbe(port), published("127.0.0.1", port, listen(hold=True)), asynchronous)
+
+
+@pytest.mark.parametrize("asynchronous", ASYNCHRONOUS)
+def test_tcp_probe_through_the_proxy(listen, asynchronous, monkeypatch):
+    # As from outside the virtual machine of Docker Desktop.
+    monkeypatch.setattr(TcpProbe, "unreachable", {"192.0.2.1"})
+    container = published("192.0.2.1", 5432, listen(hold=False))
+    assert not tcp_check(TcpProbe(5432), container, asynchronous)
+    container = published("192.0.2.1", 5432, listen(hold=True))
+    assert tcp_check(TcpProbe(5432), container, asynchronous)
@@ -0,0 +1,88 @@
+import os
+import uuid
+
+import docker
+import pytest
+
+from pytest_docker_network_fixtures import ContainerSpec
+from pytest_docker_network_fixtures.container import create_container
+from pytest_docker_network_fixtures.network import create_network
+from pytest_docker_network_fixtures.reuse import LABEL_FIXTURE, ReuseLedger, find_container, labels
+from pytest_docker_network_fixtures.teardown import owner
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16", environment={{"POSTGRES_DB": "{database}"}})
+"""
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(4))
+def test_database(database, n):
+    pass
+"""
+
+
+def kept(fake_docker):
+    return [container for container in fake_docker.containers.values() if LABEL_FIXTURE in container["Labels"]]
+
+
+def run(pytester, *args):
+    result = pytester.runpytest_subprocess("--docker-fixtures-reuse", *args)
+    result.assert_outcomes(passed=4)
+
+
+def test_reuses_the_container_until_its_configuration_changes(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST.format(database="first"))
+    pytester.makepyfile(TESTS)
+    run(pytester)
+    (first,) = kept(fake_docker)
+    run(pytester)
+    assert kept(fake_docker) == [first]
+    assert fake_docker.calls["POST /containers/create"] == 1
+    pytester.makeconftest(CONFTEST.format(database="second"))
+    run(pytester)
+    (second,) = kept(fake_docker)
+    assert second["Id"] != first["Id"]
+
+
+def test_xdist_workers_agree_on_one_container(pytester, fake_docker):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(CONFTEST.format(database="test"))
+    pytester.makepyfile(TESTS)
+    run(pytester, "-n", "2")
+    assert len(kept(fake_docker)) == 1
+    assert len(fake_docker.networks) == 1
+
+
+def test_projects_keep_their_containers_apart(pytester, fake_docker):
+    for project in ("first", "second"):
+        pytester.mkdir(project)
+        (pytester.path / project / "pytest.ini").write_text("[pytest]\n")
+        (pytester.path / project / "conftest.py").write_text(CONFTEST.format(database="test"))
+        (pytester.path / project / "test_database.py").write_text(TESTS)
+    run(pytester, "first")
+    run(pytester, "second")
+    assert len(kept(fake_docker)) == 2
+    assert len({network["Name"] for network in fake_docker.networks.values()}) == 2
+
+
+def test_leaves_a_container_another_session_uses(fake_docker, tmp_path):
+    client = docker.DockerClient(base_url=os.environ["DOCKER_HOST"])
+    spec = ContainerSpec("database", "postgres:16")
+    fake_docker.add_image(spec.image)
+    network = create_network(client, f"test-{uuid.uuid4().hex[:12]}")
+    container = create_container(client, spec, network, labels=labels(spec, network, "old", "project"))
+    ledger = ReuseLedger("project", tmp_path)
+    with ledger.lock(spec.name):
+        ledger.use(spec.name, container.id, owner())
+        assert find_container(client, spec, network, "new", "project", ledger.users(spec.name)) is None
+    client.api.inspect_container(container.id)
+    ledger.leave(spec.name, owner())
+    with ledger.lock(spec.name):
+        assert find_container(client, spec, network, "new", "project", ledger.users(spec.name)) is None
+    with pytest.raises(docker.errors.NotFound):
+        client.api.inspect_container(container.id)
+    client.close()
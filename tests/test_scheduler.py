@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from pytest_docker_network_fixtures import ContainerSpec, DependencyError
+from pytest_docker_network_fixtures.scheduler import StartScheduler
+
+SPECS = {
+    "database": ContainerSpec("database", "postgres:16"),
+    "cache": ContainerSpec("cache", "redis:7"),
+    "app": ContainerSpec("app", "my/app", depends_on=("database", "cache")),
+}
+
+
+def schedule(scheduler, name, specs=SPECS):
+    return scheduler.schedule(specs[name], specs, lambda spec: "")
+
+
+def test_independent_containers_start_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    scheduler = StartScheduler(lambda spec: barrier.wait(), max_workers=4)
+    # Each start only returns once the other one runs as well; one after the other, the barrier breaks.
+    for future in [schedule(scheduler, "database"), schedule(scheduler, "cache")]:
+        future.result(timeout=10)
+    scheduler.shutdown()
+
+
+def test_dependencies_are_ready_first():
+    events = []
+
+    def start(spec):
+        events.append(f"start {spec.name}")
+        time.sleep(0.05)
+        events.append(f"ready {spec.name}")
+        return spec.name
+
+    scheduler = StartScheduler(start, max_workers=4)
+    assert schedule(scheduler, "app").result(timeout=5) == "app"
+    assert events.index("start app") > max(events.index("ready database"), events.index("ready cache"))
+    scheduler.shutdown()
+
+
+def test_starts_a_container_once_per_scope():
+    started = []
+    scheduler = StartScheduler(lambda spec: started.append(spec.name), max_workers=4)
+    assert schedule(scheduler, "database") is schedule(scheduler, "database")
+    schedule(scheduler, "app").result(timeout=5)
+    assert sorted(started) == ["app", "cache", "database"]
+    scheduler.shutdown()
+
+
+def test_failed_dependency():
+    def start(spec):
+        if spec.name == "database":
+            raise RuntimeError("database did not start")
+        return spec.name
+
+    scheduler = StartScheduler(start, max_workers=4)
+    with pytest.raises(DependencyError, match="database"):
+        schedule(scheduler, "app").result(timeout=5)
+    assert schedule(scheduler, "cache").result(timeout=5) == "cache"
+    scheduler.shutdown()
+
+
+def test_circular_dependency():
+    specs = {
+        "a": ContainerSpec("a", "my/a", depends_on=("b",)),
+        "b": ContainerSpec("b", "my/b", depends_on=("a",)),
+    }
+    scheduler = StartScheduler(lambda spec: spec.name, max_workers=4)
+    with pytest.raises(ValueError, match="a -> b -> a"):
+        schedule(scheduler, "a", specs)
+    scheduler.shutdown()
+
+
+def test_invalid_fixture_does_not_fail_the_others(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        from pytest_docker_network_fixtures import container_fixture, pooled_container_fixture
+
+        app = container_fixture("app", "my/app", scope="function")
+        worker = pooled_container_fixture("worker", "my/worker", depends_on=["app"])
+
+        @pytest.fixture
+        def app_ready(app, request):
+            (request.config.rootpath / "app_ready").touch()
+        """
+    )
+    pytester.makepyfile(
+        """
+        def test_app(app, app_ready, worker):
+            pass
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(["*worker*can only depend on session scoped*"])
+    # Raised when the pool of the worker is set up, not when the app prefetches it.
+    assert (pytester.path / "app_ready").exists()
@@ -0,0 +1,68 @@
+import pytest
+
+from pytest_docker_network_fixtures.settings import Settings
+
+
+def test_defaults(pytester, monkeypatch):
+    monkeypatch.delenv("PYTEST_DOCKER_FIXTURES_REUSE", raising=False)
+    assert Settings.from_config(pytester.parseconfig()) == Settings()
+
+
+def test_settings_without_default_read_as_empty(pytester):
+    # pytest 7 reads a string ini value without a default as [] rather than "".
+    config = pytester.parseconfig()
+    assert config.getini("docker_fixtures_durations") == ""
+    assert config.getini("docker_fixtures_memory_budget") == ""
+
+
+def test_ini(pytester):
+    pytester.makeini(
+        """
+        [pytest]
+        docker_fixtures_durations = 0
+        docker_fixtures_memory_budget = 2048
+        docker_fixtures_group_tests = true
+        docker_fixtures_network_prefix = ci
+        """
+    )
+    settings = Settings.from_config(pytester.parseconfig())
+    assert settings.durations == 0
+    assert settings.memory_budget == 2048
+    assert settings.group_tests
+    assert settings.network_prefix == "ci"
+
+
+def test_command_line_over_ini(pytester):
+    pytester.makeini(
+        """
+        [pytest]
+        docker_fixtures_durations = 0
+        docker_fixtures_teardown = wait
+        """
+    )
+    config = pytester.parseconfig(
+        "--docker-fixtures-durations=5", "--docker-fixtures-teardown=background", "--docker-fixtures-cpu-budget=1.5"
+    )
+    settings = Settings.from_config(config)
+    assert settings.durations == 5
+    assert settings.teardown == "background"
+    assert settings.cpu_budget == 1.5
+
+
+def test_invalid_teardown_mode(pytester):
+    with pytest.raises(pytest.UsageError, match="teardown"):
+        Settings.from_config(pytester.parseconfig("--docker-fixtures-teardown=later"))
+
+
+def test_run_without_settings(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        database = container_fixture("database", "postgres:16")
+        """
+    )
+    pytester.makepyfile("def test_database(database): pass")
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1)
+    assert result.ret == 0
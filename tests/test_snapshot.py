@@ -0,0 +1,65 @@
+CONFTEST = """
+from pathlib import Path
+
+from pytest_docker_network_fixtures import Snapshot, container_fixture
+
+def seed(container):
+    with (Path(__file__).parent / "seeded").open("a") as seeded:
+        seeded.write(container.id + "\\n")
+
+database = container_fixture(
+    "database", "postgres:16", scope="function", snapshot=Snapshot(seed, inputs=[Path(__file__).parent / "seed.sql"])
+)
+"""
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(3))
+def test_database(database, docker_client, request, n):
+    image = docker_client.api.inspect_container(database.id)["Config"]["Image"]
+    (request.config.rootpath / f"image-{n}").write_text(image)
+"""
+
+
+def images(pytester):
+    return sorted(path.read_text() for path in pytester.path.glob("image-*"))
+
+
+def seeded(pytester):
+    path = pytester.path / "seeded"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def test_seeded_once(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makefile(".sql", seed="insert into users values (1);")
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=3)
+    assert seeded(pytester) == 1
+    assert fake_docker.calls["POST /commit"] == 1
+    # The seeded container runs the image, the later ones the snapshot.
+    assert images(pytester).count("postgres:16") == 1
+    tags = [image for image in images(pytester) if image.startswith("pytest-dnf-snapshot:database-")]
+    assert len(tags) == 2 and len(set(tags)) == 1
+
+    # The next session starts from the snapshot.
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=3)
+    assert seeded(pytester) == 1
+    assert fake_docker.calls["POST /commit"] == 1
+    assert set(images(pytester)) == set(tags)
+
+
+def test_changed_inputs_seed_again(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makefile(".sql", seed="insert into users values (1);")
+    pytester.makepyfile(TESTS)
+    pytester.runpytest_subprocess().assert_outcomes(passed=3)
+    pytester.makefile(".sql", seed="insert into users values (2);")
+    pytester.runpytest_subprocess().assert_outcomes(passed=3)
+    assert seeded(pytester) == 2
+    pytester.runpytest_subprocess("--docker-fixtures-refresh-snapshots").assert_outcomes(passed=3)
+    assert seeded(pytester) == 3
+    assert fake_docker.calls["POST /commit"] == 3
@@ -0,0 +1,127 @@
+import signal
+import time
+
+import pytest
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture, pooled_container_fixture
+
+database = container_fixture("database", "postgres:16")
+cache = container_fixture("cache", "redis:7", scope="module", depends_on=["database"])
+app = container_fixture("app", "my/app", scope="function", depends_on=["cache"])
+shared = container_fixture("shared", "my/service", shared=True)
+worker = pooled_container_fixture("worker", "my/worker", size=2)
+isolated = container_fixture("isolated", "my/app", scope="function", isolated=True)
+broken = container_fixture("broken", "my/app", scope="function", files={"/etc/app": "missing"})
+"""
+
+TESTS = """
+def test_app(app, shared):
+    assert app.readiness.seconds is not None
+
+def test_worker(worker, database):
+    pass
+
+def test_isolated(isolated, docker_isolated_network):
+    assert isolated.network == docker_isolated_network
+
+def test_broken(app, broken):
+    pass
+"""
+
+RUNS = [
+    pytest.param([], id="wait"),
+    pytest.param(["--docker-fixtures-teardown=background"], id="background"),
+    pytest.param(["-n", "2"], id="xdist"),
+]
+
+
+@pytest.mark.parametrize("args", RUNS)
+def test_leaves_nothing_behind(pytester, fake_docker, args):
+    if "-n" in args:
+        pytest.importorskip("xdist")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess(*args)
+    result.assert_outcomes(passed=3, errors=1)
+    # In the background the containers and networks are removed after pytest exited.
+    deadline = time.monotonic() + 10
+    while (fake_docker.containers or fake_docker.networks) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fake_docker.containers == {}
+    assert fake_docker.networks == {}
+
+
+def test_failed_start_leaves_no_container(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        def test_broken(broken):
+            pass
+
+        def test_after(docker_client):
+            assert docker_client.api.containers(all=True) == []
+        """
+    )
+    result = pytester.runpytest_subprocess()
+    result.assert_outcomes(passed=1, errors=1)
+
+
+def test_orphan_sweep_leaves_a_running_xdist_session_alone(pytester, fake_docker):
+    pytest.importorskip("xdist")
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        shared = container_fixture("shared", "my/service", shared=True)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import os
+        import time
+
+        from pytest_docker_network_fixtures.teardown import gone, owner, remove_orphans
+
+        def test_first(shared, request):
+            (request.config.rootpath / "first").write_text(str(os.getpid()))
+            # The worker that created the network and the shared container exits while the other one still runs.
+            os._exit(1)
+
+        def test_second(docker_client, request):
+            first = request.config.rootpath / "first"
+            deadline = time.monotonic() + 10
+            while not first.exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            while not gone(owner(int(first.read_text()))) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert gone(owner(int(first.read_text())))
+            shared = request.getfixturevalue("shared")
+            assert remove_orphans(docker_client, 4) == (0, 0)
+            docker_client.api.inspect_container(shared.id)
+            docker_client.api.inspect_network(shared.network.id)
+        """
+    )
+    result = pytester.runpytest_subprocess("-n", "2")
+    result.assert_outcomes(passed=1, failed=1)
+
+
+def test_reaper_removes_the_resources_of_a_killed_session(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(
+        """
+        import os
+        import signal
+
+        def test_killed(app, shared):
+            os.kill(os.getpid(), signal.SIGKILL)
+        """
+    )
+    result = pytester.runpytest_subprocess("--docker-fixtures-teardown=background")
+    assert result.ret == -signal.SIGKILL
+    assert fake_docker.calls["POST /containers/create"] == 4
+    deadline = time.monotonic() + 10
+    while (fake_docker.containers or fake_docker.networks) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fake_docker.containers == {}
+    assert fake_docker.networks == {}
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+CONFTEST = """
+from pytest_docker_network_fixtures import container_fixture
+
+database = container_fixture("database", "postgres:16")
+app = container_fixture("app", "my/app", scope="function", depends_on=["database"])
+"""
+
+TESTS = """
+import pytest
+
+@pytest.mark.parametrize("n", range(4))
+def test_app(app, n):
+    pass
+"""
+
+
+def test_slowest_resources(pytester, fake_docker):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess("--docker-fixtures-durations=2")
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(["*slowest 2 Docker fixture resources*", "*total s*image s*remove s  resource"])
+    assert len([line for line in result.outlines if " / pytest-dnf-" in line]) == 2
+
+
+@pytest.mark.parametrize("args", [pytest.param([], id="single"), pytest.param(["-n", "2"], id="xdist")])
+def test_timings_json(pytester, fake_docker, args):
+    if "-n" in args:
+        pytest.importorskip("xdist")
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(TESTS)
+    result = pytester.runpytest_subprocess("--docker-fixtures-timings-json=timings.json", *args)
+    result.assert_outcomes(passed=4)
+    resources = json.loads((pytester.path / "timings.json").read_text())["resources"]
+    containers = [resource for resource in resources if resource["kind"] == "container"]
+    # Every test starts an app, whichever worker runs it.
+    assert sorted(resource["fixture"] for resource in containers).count("app") == 4
+    assert all({"create", "ready", "remove"} <= set(resource["phases"]) for resource in containers)
+    assert any(resource["kind"] == "network" for resource in resources)
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("xdist")
+
+
+def test_workers_share_the_network_and_shared_containers(pytester, fake_docker):
+    pytester.makeconftest(
+        """
+        from pytest_docker_network_fixtures import container_fixture
+
+        database = container_fixture("database", "postgres:16", shared=True)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import os
+
+        import pytest
+
+        @pytest.mark.parametrize("n", range(8))
+        def test_database(database, docker_network, request, n):
+            assert database.network == docker_network
+            worker = os.environ["PYTEST_XDIST_WORKER"]
+            (request.config.rootpath / f"{worker}-{n}").write_text(database.id)
+        """
+    )
+    result = pytester.runpytest_subprocess("-n", "2")
+    result.assert_outcomes(passed=8)
+    assert fake_docker.calls["POST /networks/create"] == 1
+    assert fake_docker.calls["POST /containers/create"] == 1
+    workers = {path.name.split("-")[0] for path in pytester.path.glob("gw*")}
+    assert workers == {"gw0", "gw1"}
+    assert len({path.read_text() for path in pytester.path.glob("gw*")}) == 1
+    assert fake_docker.containers == {}
+    assert fake_docker.networks == {}